@@ -0,0 +1,235 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import multiprocessing
+import platform
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+import pandas as pd
+from benchmarks.synthetic import add_sentiment_columns, generate_reviews
+from scripts.common.metrics import peak_rss_mb
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+class EchoTranslator:
+    """Offline translator returning its input, so translation cost is our code, not the network."""
+
+    def translate(self, text: str) -> str:
+        return text
+
+@dataclass
+class Benchmark:
+    """A stage to time: setup turns the generated reviews into the stage's input, run processes it.
+
+    max_rows caps the input for stages that are slow per row (a full model
+    pass over 1M reviews takes hours); the rows actually timed are reported.
+    """
+    name: str
+    setup: Callable[[pd.DataFrame], object]
+    run: Callable[[object], None]
+    max_rows: Optional[int] = None
+
+def _preprocess_reviews(df):
+    from scripts.analysis.preprocess_nlp import preprocess_reviews
+    preprocess_reviews(df, backend=EchoTranslator(), amharic_csv=None, rate_per_second=None)
+
+def _preprocess_text(df):
+    from scripts.analysis.preprocess_nlp import preprocess_text
+    for text in df["review"]:
+        preprocess_text(text)
+
+def _vader(df):
+    from scripts.analysis.sentiment_analysis import get_vader_sentiment
+    for text in df["review"]:
+        get_vader_sentiment(text)
+
+def _score_vader(df):
+    from scripts.analysis.sentiment_analysis import score_vader
+    score_vader(df["review"], n_process=max(1, (os.cpu_count() or 1) - 1))
+
+def _distilbert(df):
+    from scripts.analysis.sentiment_analysis import get_distilbert_sentiment
+    for text in df["review"]:
+        get_distilbert_sentiment(text)
+
+def _analyze_sentiment(df):
+    from scripts.analysis.sentiment_analysis import analyze_sentiment
+    analyze_sentiment(df, copy=False)
+
+def _assign_themes(df):
+    from scripts.analysis.thematic_analysis import assign_themes
+    for text, bank in zip(df["review"], df["bank"]):
+        assign_themes(text, bank)
+
+def _thematic_analysis(df):
+    from scripts.analysis.thematic_analysis import thematic_analysis
+    thematic_analysis(df, copy=False)
+
+def _aggregate_sentiment(df):
+    from scripts.analysis.sentiment_analysis import aggregate_sentiment
+    aggregate_sentiment(df)
+
+def _load_reviews_sqlite(df):
+    from scripts.database.loader import connect_sqlite, load_reviews
+    connection = connect_sqlite()
+    load_reviews(connection, df, assign_ids=True)
+    connection.close()
+
+def _near_duplicates(df):
+    from scripts.analysis.near_duplicates import NearDuplicateIndex, flag_near_duplicates
+    index = NearDuplicateIndex(":memory:")
+    flag_near_duplicates(df, index, copy=False)
+    index.close()
+
+def _identity(df):
+    return df
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    benchmark.name: benchmark for benchmark in [
+        Benchmark("preprocess_reviews", _identity, _preprocess_reviews),
+        Benchmark("preprocess_text", _identity, _preprocess_text, max_rows=100_000),
+        Benchmark("get_vader_sentiment", _identity, _vader),
+        Benchmark("score_vader", _identity, _score_vader),
+        Benchmark("get_distilbert_sentiment", _identity, _distilbert, max_rows=10_000),
+        Benchmark("analyze_sentiment", _identity, _analyze_sentiment, max_rows=100_000),
+        Benchmark("assign_themes", _identity, _assign_themes),
+        Benchmark("thematic_analysis", _identity, _thematic_analysis),
+        Benchmark("aggregate_sentiment", add_sentiment_columns, _aggregate_sentiment),
+        Benchmark("near_duplicates", _identity, _near_duplicates),
+        Benchmark("load_reviews_sqlite", _identity, _load_reviews_sqlite),
+    ]
+}
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 2)
+
+def run_benchmark(name: str, n_rows: int, n_banks: int = 20, seed: int = 0, limit: bool = True) -> dict:
+    """Time one stage on generated reviews; run it in a fresh process for a per-stage peak RSS."""
+    benchmark = BENCHMARKS[name]
+    rows = min(n_rows, benchmark.max_rows) if limit and benchmark.max_rows else n_rows
+    data = benchmark.setup(generate_reviews(rows, n_banks=n_banks, seed=seed))
+
+    # Import the stage's modules (and load its models) before the clock starts
+    setup_start = time.perf_counter()
+    benchmark.run(data.head(1).copy())
+    setup_seconds = time.perf_counter() - setup_start
+    rss_before = peak_rss_mb()
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    benchmark.run(data)
+    seconds = time.perf_counter() - start
+    cpu_seconds = time.process_time() - cpu_start
+    return {
+        "stage": name,
+        "dataset_rows": n_rows,
+        "rows": rows,
+        "seconds": round(seconds, 6),
+        "cpu_seconds": round(cpu_seconds, 6),
+        "rows_per_sec": round(rows / seconds, 2) if seconds > 0 else None,
+        "setup_seconds": round(setup_seconds, 6),
+        "peak_rss_mb_before": _round(rss_before),
+        "peak_rss_mb": _round(peak_rss_mb()),
+    }
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(
+    stages: Sequence[str],
+    sizes: Sequence[int],
+    n_banks: int = 20,
+    seed: int = 0,
+    limit: bool = True,
+    isolate: bool = True,
+) -> dict:
+    """Run every (stage, size) pair and return a JSON-serializable report.
+
+    With isolate=True each pair runs in its own spawned process so peak RSS
+    is not inflated by earlier stages or models.
+    """
+    unknown = [name for name in stages if name not in BENCHMARKS]
+    if unknown:
+        raise KeyError(f"Unknown benchmarks: {unknown}")
+    results = []
+    for n_rows in sizes:
+        for name in stages:
+            if isolate:
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                    result = executor.submit(run_benchmark, name, n_rows, n_banks, seed, limit).result()
+            else:
+                result = run_benchmark(name, n_rows, n_banks, seed, limit)
+            print(f"{name:<26} {result['rows']:>9} rows  {result['seconds']:>10.3f}s  "
+                  f"{result['rows_per_sec'] or 0:>12.1f} rows/s  {result['peak_rss_mb'] or 0:>8.1f} MiB", file=sys.stderr)
+            results.append(result)
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": seed,
+            "n_banks": n_banks,
+            "isolated": isolate,
+        },
+        "results": results,
+    }
+
+def compare(baseline: dict, current: dict) -> List[dict]:
+    """Pair results of two reports by (stage, rows) with current/baseline throughput and memory ratios."""
+    previous = {(result["stage"], result["rows"]): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        before = previous.get((result["stage"], result["rows"]))
+        if before is None:
+            continue
+        rows.append({
+            "stage": result["stage"],
+            "rows": result["rows"],
+            "speedup": round(result["rows_per_sec"] / before["rows_per_sec"], 3)
+            if result["rows_per_sec"] and before["rows_per_sec"] else None,
+            "rss_ratio": round(result["peak_rss_mb"] / before["peak_rss_mb"], 3)
+            if result["peak_rss_mb"] and before["peak_rss_mb"] else None,
+        })
+    return rows
+
+def _size(value: str) -> int:
+    return SIZES[value.lower()] if value.lower() in SIZES else int(value)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic reviews.")
+    parser.add_argument("--stages", nargs="+", default=list(BENCHMARKS), choices=list(BENCHMARKS))
+    parser.add_argument("--sizes", nargs="+", type=_size, default=[SIZES["1k"]],
+                        help="Row counts, or 1k/100k/1m (default: 1k)")
+    parser.add_argument("--banks", type=int, default=20, help="Number of banks in the generated data")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-limit", action="store_true", help="Ignore per-stage row caps for slow stages")
+    parser.add_argument("--in-process", action="store_true", help="Run stages in this process (shared peak RSS)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="Report speedups against an earlier JSON report")
+    args = parser.parse_args()
+
+    report = run_suite(args.stages, args.sizes, args.banks, args.seed, not args.no_limit, not args.in_process)
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(json.load(f), report)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,114 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+# The banks with configured themes come first so theme matching has real work to do
+REAL_BANKS = ["Commercial Bank of Ethiopia", "Bank of Abyssinia", "Dashen Bank"]
+
+ENGLISH_OPENERS = [
+    "The app", "This mobile banking app", "Transfer", "My account", "Customer service",
+    "The new update", "Login", "The ATM", "Loan processing", "Online banking",
+]
+ENGLISH_TOPICS = [
+    "login fails every morning", "payment to another bank took two days", "support never answers the call",
+    "withdraw at the atm worked fine", "service fee is too expensive", "internet banking is down again",
+    "loan approval was quick", "branch queue is very long", "digital transfer is fast and easy",
+    "mobile app crashes after the update", "cash deposit was not reflected", "teller at the office was helpful",
+    "send money feature is great", "authentication code never arrives", "credit limit is too low",
+]
+ENGLISH_CLOSERS = [
+    "", "Please fix it.", "Very good!", "Worst experience ever.", "Thank you.", "I love it.",
+    "Not recommended.", "Keep it up.", "Five stars.", "Needs improvement.",
+]
+# Ge'ez-script words (good, app, bank, service, very, thanks, slow, money, transfer, problem)
+GEEZ_WORDS = ["ጥሩ", "መተግበሪያ", "ባንክ", "አገልግሎት", "በጣም", "አመሰግናለሁ", "ቀርፋፋ", "ገንዘብ", "ማስተላለፍ", "ችግር"]
+# Latin-script Amharic, including the keywords preprocess_nlp uses to detect it
+TRANSLITERATED_WORDS = [
+    "selam", "betam", "amasegnallo", "yene", "kefel", "gobez", "konjo", "app", "tiru", "new", "ahun",
+]
+
+LANGUAGES = ("english", "geez", "transliterated")
+DEFAULT_LANGUAGE_MIX = {"english": 0.8, "geez": 0.1, "transliterated": 0.1}
+
+def bank_names(n_banks: int) -> List[str]:
+    """The three real banks followed by numbered synthetic ones."""
+    if n_banks < 1:
+        raise ValueError(f"n_banks must be positive, got {n_banks}")
+    extra = [f"Synthetic Bank {i:03d}" for i in range(1, max(n_banks - len(REAL_BANKS), 0) + 1)]
+    return (REAL_BANKS + extra)[:n_banks]
+
+def _pick(rng: np.random.Generator, pool: List[str], size: int) -> np.ndarray:
+    return np.asarray(pool, dtype=object)[rng.integers(0, len(pool), size=size)]
+
+def _phrases(rng: np.random.Generator, pool: List[str], size: int, min_words: int, max_words: int) -> np.ndarray:
+    lengths = rng.integers(min_words, max_words + 1, size=size)
+    words = _pick(rng, pool, int(lengths.sum()))
+    return np.array([" ".join(chunk) for chunk in np.split(words, np.cumsum(lengths)[:-1])], dtype=object)
+
+def generate_reviews(
+    n_rows: int,
+    n_banks: int = 20,
+    seed: int = 0,
+    language_mix: Optional[Dict[str, float]] = None,
+    duplicate_rate: float = 0.05,
+    start_date: str = "2023-01-01",
+    days: int = 900,
+) -> pd.DataFrame:
+    """Generate raw-format reviews (bank, review, rating, date, source, review_id).
+
+    The same arguments always produce the same DataFrame. language_mix gives
+    the share of English, Ge'ez-script and transliterated-Amharic reviews, and
+    duplicate_rate the share of reviews whose text repeats an earlier one, as
+    store reviews often do.
+    """
+    language_mix = language_mix or DEFAULT_LANGUAGE_MIX
+    unknown = set(language_mix) - set(LANGUAGES)
+    if unknown:
+        raise ValueError(f"Unknown languages in language_mix: {sorted(unknown)}")
+    rng = np.random.default_rng(seed)
+    weights = np.array([language_mix.get(language, 0.0) for language in LANGUAGES], dtype=float)
+    languages = rng.choice(len(LANGUAGES), size=n_rows, p=weights / weights.sum())
+
+    reviews = np.empty(n_rows, dtype=object)
+    english = np.flatnonzero(languages == 0)
+    reviews[english] = (
+        pd.Series(_pick(rng, ENGLISH_OPENERS, len(english))) + ": "
+        + pd.Series(_pick(rng, ENGLISH_TOPICS, len(english))) + ". "
+        + pd.Series(_pick(rng, ENGLISH_CLOSERS, len(english)))
+    ).str.strip().to_numpy()
+    geez = np.flatnonzero(languages == 1)
+    reviews[geez] = _phrases(rng, GEEZ_WORDS, len(geez), 2, 8)
+    transliterated = np.flatnonzero(languages == 2)
+    reviews[transliterated] = _phrases(rng, TRANSLITERATED_WORDS, len(transliterated), 2, 8)
+
+    duplicates = np.flatnonzero(rng.random(n_rows) < duplicate_rate)
+    duplicates = duplicates[duplicates > 0]
+    reviews[duplicates] = reviews[rng.integers(0, duplicates)]
+
+    banks = bank_names(n_banks)
+    offsets = rng.integers(0, days, size=n_rows)
+    return pd.DataFrame({
+        "bank": pd.Categorical.from_codes(rng.integers(0, len(banks), size=n_rows), categories=banks),
+        "review": reviews,
+        "rating": rng.choice(5, size=n_rows, p=[0.25, 0.08, 0.1, 0.12, 0.45]).astype("int8") + 1,
+        "date": pd.Timestamp(start_date) + pd.to_timedelta(offsets, unit="D"),
+        "source": "Google Play",
+        "review_id": [f"synthetic-{seed}-{i}" for i in range(n_rows)],
+    })
+
+def add_sentiment_columns(df: pd.DataFrame, seed: int = 0) -> pd.DataFrame:
+    """Add random VADER/DistilBERT label and score columns, so aggregation can be measured alone."""
+    rng = np.random.default_rng(seed + 1)
+    df = df.copy()
+    vader_scores = rng.uniform(-1.0, 1.0, size=len(df)).round(4)
+    df["vader_label"] = np.where(
+        vader_scores >= 0.05, "positive", np.where(vader_scores <= -0.05, "negative", "neutral")
+    )
+    df["vader_score"] = vader_scores
+    df["distilbert_label"] = np.where(rng.random(len(df)) < 0.5, "positive", "negative")
+    df["distilbert_score"] = rng.uniform(0.5, 1.0, size=len(df)).round(4)
+    return df
@@ -11,5 +11,20 @@ CREATE TABLE reviews (
     rating NUMBER(1) CHECK (rating BETWEEN 1 AND 5),
     review_date DATE,
     created_date DATE DEFAULT SYSDATE,
+    review_fingerprint VARCHAR2(32),
     FOREIGN KEY (bank_id) REFERENCES banks(bank_id)
+);
+
+-- Incremental loads merge on the review fingerprint and look banks up by name
+CREATE UNIQUE INDEX ux_banks_name ON banks (bank_name);
+CREATE UNIQUE INDEX ux_reviews_fingerprint ON reviews (review_fingerprint);
+
+-- Analytics reads filter by bank and date range
+CREATE INDEX ix_reviews_bank_date ON reviews (bank_id, review_date);
+
+-- Latest review date loaded per source, used to skip already-loaded rows
+CREATE TABLE load_watermarks (
+    source VARCHAR2(100) PRIMARY KEY,
+    last_review_date DATE,
+    loaded_at DATE DEFAULT SYSDATE
 );
\ No newline at end of file
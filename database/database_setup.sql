@@ -4,6 +4,7 @@
 -- Drop tables if they exist (for reset purposes)
 DROP TABLE reviews CASCADE CONSTRAINTS;
 DROP TABLE banks CASCADE CONSTRAINTS;
+DROP TABLE load_watermarks CASCADE CONSTRAINTS;
 
 -- Create banks table
 CREATE TABLE banks (
@@ -21,10 +22,25 @@ CREATE TABLE reviews (
     rating NUMBER,
     review_date DATE,
     created_date DATE DEFAULT SYSDATE,
+    review_fingerprint VARCHAR2(32),
     PRIMARY KEY (review_id),
     FOREIGN KEY (bank_id) REFERENCES banks(bank_id)
 );
 
+-- Indexes used by incremental upserts (insert_reviews.py)
+CREATE UNIQUE INDEX ux_banks_name ON banks (bank_name);
+CREATE UNIQUE INDEX ux_reviews_fingerprint ON reviews (review_fingerprint);
+
+-- Index used by bank and date-range reads (scripts/database/reader.py)
+CREATE INDEX ix_reviews_bank_date ON reviews (bank_id, review_date);
+
+-- Create load watermark table
+CREATE TABLE load_watermarks (
+    source VARCHAR2(100) PRIMARY KEY,
+    last_review_date DATE,
+    loaded_at DATE DEFAULT SYSDATE
+);
+
 -- Insert sample bank data
 INSERT INTO banks (bank_name) VALUES ('Commercial Bank of Ethiopia');
 INSERT INTO banks (bank_name) VALUES ('Bank of Abyssinia');
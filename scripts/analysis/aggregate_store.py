@@ -0,0 +1,390 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import argparse
+import hashlib
+import sqlite3
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from scripts.common.metrics import metrics
+from scripts.common.storage import from_arrow
+from scripts.common.hashing import review_hashes
+
+DEFAULT_STORE_PATH = "data/processed/aggregates.sqlite"
+SENTIMENT_MODELS = ("vader", "distilbert")
+LABELS = ("negative", "neutral", "positive")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sentiment_daily (
+    bank TEXT NOT NULL,
+    day TEXT NOT NULL,
+    rating INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    label TEXT NOT NULL,
+    reviews INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    PRIMARY KEY (bank, day, rating, model, label)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_sentiment_daily_day ON sentiment_daily (day);
+CREATE TABLE IF NOT EXISTS theme_daily (
+    bank TEXT NOT NULL,
+    day TEXT NOT NULL,
+    theme TEXT NOT NULL,
+    reviews INTEGER NOT NULL,
+    PRIMARY KEY (bank, day, theme)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_theme_daily_day ON theme_daily (day);
+CREATE TABLE IF NOT EXISTS applied_batches (
+    batch_id TEXT PRIMARY KEY,
+    reviews INTEGER NOT NULL,
+    applied_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS applied_reviews (
+    review_hash INTEGER PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS source_row_groups (
+    path TEXT NOT NULL,
+    row_group INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    batch_id TEXT NOT NULL,
+    PRIMARY KEY (path, row_group)
+) WITHOUT ROWID;
+"""
+SYNC_COLUMNS = ["bank", "review", "date", "rating", "vader_label", "vader_score", "distilbert_label",
+                "distilbert_score", "themes"]
+
+def batch_digest(df: pd.DataFrame) -> str:
+    """Content-derived batch id, so re-merging the same reviews is a no-op."""
+    hashes = pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()
+    return hashlib.blake2b(hashes.tobytes(), digest_size=16).hexdigest()
+
+def row_group_digests(parquet_file: pq.ParquetFile, path: str, columns: List[str]) -> List[str]:
+    """Digest of each row group's stored (compressed) bytes for the given columns, read without decoding."""
+    metadata = parquet_file.metadata
+    digests = []
+    with open(path, "rb") as f:
+        for i in range(metadata.num_row_groups):
+            row_group = metadata.row_group(i)
+            digest = hashlib.blake2b(digest_size=16)
+            for j in range(row_group.num_columns):
+                chunk = row_group.column(j)
+                if chunk.path_in_schema.split(".")[0] not in columns:
+                    continue
+                offset = chunk.data_page_offset
+                if chunk.has_dictionary_page and chunk.dictionary_page_offset is not None:
+                    offset = min(offset, chunk.dictionary_page_offset)
+                f.seek(offset)
+                digest.update(f.read(chunk.total_compressed_size))
+            digests.append(digest.hexdigest())
+    return digests
+
+def _days(dates: pd.Series) -> pd.Series:
+    return pd.to_datetime(dates, format="ISO8601").dt.strftime("%Y-%m-%d")
+
+def review_keys(df: pd.DataFrame) -> np.ndarray:
+    """Signed 64-bit (review, day, bank) hash per row, the same whether dates are strings or timestamps."""
+    keys = pd.DataFrame({
+        "review": df["review"].astype(str).to_numpy(), "date": _days(df["date"]).to_numpy(),
+        "bank": df["bank"].astype(str).to_numpy(),
+    })
+    return review_hashes(keys).view(np.int64)
+
+def daily_sentiment(df: pd.DataFrame) -> pd.DataFrame:
+    """Reviews and score sums per bank, day, rating, model and label for one batch."""
+    base = pd.DataFrame({"bank": df["bank"].astype(str).to_numpy(), "day": _days(df["date"]).to_numpy(),
+                         "rating": df["rating"].astype(int).to_numpy()})
+    frames = []
+    for model in SENTIMENT_MODELS:
+        if f"{model}_label" not in df:
+            continue
+        frames.append(base.assign(
+            model=model, label=df[f"{model}_label"].to_numpy(), score=df[f"{model}_score"].astype(float).to_numpy()
+        ))
+    if not frames:
+        return pd.DataFrame(columns=["bank", "day", "rating", "model", "label", "reviews", "score_sum"])
+    return (
+        pd.concat(frames, ignore_index=True)
+        .dropna(subset=["day", "label"])
+        .groupby(["bank", "day", "rating", "model", "label"], observed=True)["score"]
+        .agg(reviews="count", score_sum="sum")
+        .reset_index()
+    )
+
+def daily_themes(df: pd.DataFrame) -> pd.DataFrame:
+    """Reviews per bank, day and theme for one batch."""
+    exploded = pd.DataFrame({
+        "bank": df["bank"].astype(str).to_numpy(), "day": _days(df["date"]).to_numpy(), "theme": df["themes"].to_numpy()
+    }).explode("theme").dropna(subset=["day", "theme"])
+    return exploded.groupby(["bank", "day", "theme"]).size().reset_index(name="reviews")
+
+class AggregateStore:
+    """Daily sentiment and theme counts in SQLite, merged batch by batch and queried over rolling windows.
+
+    merge() adds a batch's per-day counts and score sums to the stored ones,
+    so the cost of a merge depends on the batch, not the history. Each batch
+    is applied at most once: a batch id that is already recorded is skipped,
+    and so is every review (by its (review, day, bank) hash) already counted
+    by an earlier batch. Re-reading a growing file in chunks therefore only
+    adds its new rows. Queries read only the daily tables, never the reviews.
+
+    Skipping by review hash cannot see new labels or scores for a review that
+    is already counted, so a file that may be rewritten is kept in step with
+    sync(), which rebuilds when earlier rows changed.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    def is_applied(self, batch_id: str) -> bool:
+        return self.connection.execute(
+            "SELECT 1 FROM applied_batches WHERE batch_id = ?", (batch_id,)
+        ).fetchone() is not None
+
+    def _unapplied(self, df: pd.DataFrame) -> np.ndarray:
+        """Mask of rows whose review is not counted yet; those reviews are then recorded as counted."""
+        keys = review_keys(df)
+        new = ~pd.Series(keys).duplicated().to_numpy()
+        self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS batch_reviews (review_hash INTEGER PRIMARY KEY)")
+        self.connection.execute("DELETE FROM batch_reviews")
+        self.connection.executemany("INSERT INTO batch_reviews VALUES (?)", ((int(key),) for key in keys[new]))
+        applied = [row[0] for row in self.connection.execute(
+            "SELECT b.review_hash FROM batch_reviews b JOIN applied_reviews a ON a.review_hash = b.review_hash"
+        )]
+        new &= ~np.isin(keys, np.array(applied, dtype=np.int64))
+        self.connection.executemany("INSERT INTO applied_reviews VALUES (?)", ((int(key),) for key in keys[new]))
+        return new
+
+    def _apply(self, df: pd.DataFrame, batch_id: str) -> bool:
+        """merge() without its transaction, so rebuild() can apply many batches atomically."""
+        with metrics.stage("aggregate_merge", rows_in=len(df)) as stage:
+            if self.is_applied(batch_id):
+                stage.rows_out = 0
+                return False
+            self.connection.execute(
+                "INSERT INTO applied_batches (batch_id, reviews, applied_at) VALUES (?, ?, ?)",
+                (batch_id, len(df), datetime.now(timezone.utc).isoformat(timespec="seconds")),
+            )
+            df = df[self._unapplied(df)]
+            stage.rows_out = len(df)
+            if df.empty:
+                return True
+            sentiment = daily_sentiment(df)
+            self.connection.executemany(
+                """
+                INSERT INTO sentiment_daily (bank, day, rating, model, label, reviews, score_sum)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (bank, day, rating, model, label) DO UPDATE SET
+                    reviews = reviews + excluded.reviews,
+                    score_sum = score_sum + excluded.score_sum
+                """,
+                sentiment.astype(object).itertuples(index=False, name=None),
+            )
+            if "themes" in df:
+                self.connection.executemany(
+                    """
+                    INSERT INTO theme_daily (bank, day, theme, reviews) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (bank, day, theme) DO UPDATE SET reviews = reviews + excluded.reviews
+                    """,
+                    daily_themes(df).astype(object).itertuples(index=False, name=None),
+                )
+        return True
+
+    def merge(self, df: pd.DataFrame, batch_id: Optional[str] = None) -> bool:
+        """Add a batch of scored (and optionally themed) reviews; False if batch_id was already applied.
+
+        The batch needs bank, review, date and rating columns, plus
+        <model>_label and <model>_score columns and/or a themes column.
+        Without a batch_id the batch's content digest is used.
+        """
+        with self.connection:
+            return self._apply(df, batch_id or batch_digest(df))
+
+    def rebuild(self, batches: Iterable[pd.DataFrame]) -> int:
+        """Replace everything with the given batches (e.g. chunks of a rewritten review file).
+
+        Runs as one transaction, so readers keep seeing the old aggregates
+        until the new ones are complete.
+        """
+        with self.connection:
+            for table in ("sentiment_daily", "theme_daily", "applied_batches", "applied_reviews", "source_row_groups"):
+                self.connection.execute(f"DELETE FROM {table}")
+            return sum(self._apply(batch, batch_digest(batch)) for batch in batches)
+
+    def sync(self, path: str, columns: Optional[List[str]] = None) -> int:
+        """Bring the aggregates in line with a Parquet review file; returns the number of batches applied.
+
+        Each row group is compared with the last sync by the digest of its
+        stored bytes, so unchanged groups are never decoded. When only rows
+        were appended (new groups, or a grown last group whose earlier rows
+        are unchanged) just those groups are merged; when any earlier row
+        changed, e.g. the file was rewritten with new labels, everything is
+        rebuilt from the file.
+        """
+        parquet_file = pq.ParquetFile(path)
+        columns = [column for column in columns or SYNC_COLUMNS if column in parquet_file.schema_arrow.names]
+        digests = row_group_digests(parquet_file, path, columns)
+        known = self.connection.execute(
+            "SELECT digest, rows, batch_id FROM source_row_groups WHERE path = ? ORDER BY row_group", (path,)
+        ).fetchall()
+        start = 0
+        while start < min(len(known), len(digests)) and known[start][0] == digests[start]:
+            start += 1
+        tail = None
+        appended = start == len(known)
+        if start == len(known) - 1 and start < len(digests):
+            _, rows, batch_id = known[start]
+            tail = from_arrow(parquet_file.read_row_group(start, columns=columns))
+            appended = len(tail) >= rows and batch_digest(tail.head(rows)) == batch_id
+        if not appended:
+            start, tail = 0, None
+        recorded = []
+
+        def batches():
+            for i in range(start, len(digests)):
+                batch = tail if i == start and tail is not None else from_arrow(
+                    parquet_file.read_row_group(i, columns=columns))
+                recorded.append((path, i, digests[i], len(batch), batch_digest(batch)))
+                yield batch
+
+        applied = sum(self.merge(batch) for batch in batches()) if appended else self.rebuild(batches())
+        with self.connection:
+            self.connection.execute("DELETE FROM source_row_groups WHERE path = ? AND row_group >= ?", (path, start))
+            self.connection.executemany(
+                "INSERT INTO source_row_groups (path, row_group, digest, rows, batch_id) VALUES (?, ?, ?, ?, ?)", recorded
+            )
+        return applied
+
+    def _read(self, sql: str, params: List) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def _daily(self, model: str, banks: Optional[List[str]], start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+        clauses, params = ["model = ?"], [model]
+        if banks:
+            clauses.append(f"bank IN ({', '.join('?' * len(banks))})")
+            params.extend(banks)
+        if start:
+            clauses.append("day >= ?")
+            params.append(start)
+        if end:
+            clauses.append("day <= ?")
+            params.append(end)
+        daily = self._read(
+            f"""
+            SELECT bank, day, label, SUM(reviews) AS reviews, SUM(score_sum) AS score_sum
+            FROM sentiment_daily WHERE {' AND '.join(clauses)}
+            GROUP BY bank, day, label
+            """,
+            params,
+        )
+        counts = daily.pivot_table(index=["bank", "day"], columns="label", values="reviews", aggfunc="sum", fill_value=0)
+        counts = counts.reindex(columns=list(LABELS), fill_value=0)
+        counts["score_sum"] = daily.groupby(["bank", "day"])["score_sum"].sum()
+        return counts
+
+    def last_day(self) -> Optional[str]:
+        (day,) = self.connection.execute("SELECT MAX(day) FROM sentiment_daily").fetchone()
+        return day
+
+    def rolling_sentiment(
+        self,
+        window_days: int = 7,
+        model: str = "distilbert",
+        banks: Optional[List[str]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Trailing window_days sentiment per bank for every day from start to end.
+
+        Each row has the window's reviews, counts per label, net sentiment
+        ((positive - negative) / reviews) and mean score. Days without reviews
+        still get a row, so windows span calendar days rather than active days.
+        """
+        end = end or self.last_day()
+        if end is None:
+            return pd.DataFrame(columns=["bank", "day", "reviews", *LABELS, "net_sentiment", "mean_score"])
+        lookback = None if start is None else (pd.Timestamp(start) - pd.Timedelta(days=window_days - 1)).strftime("%Y-%m-%d")
+        counts = self._daily(model, banks, lookback, end)
+        frames = []
+        for bank, group in counts.groupby(level="bank"):
+            group = group.droplevel("bank")
+            group.index = pd.to_datetime(group.index)
+            days = pd.date_range(pd.Timestamp(start) if start else group.index.min(), pd.Timestamp(end), freq="D")
+            full = group.reindex(pd.date_range(min(days[0], group.index.min()), days[-1], freq="D"), fill_value=0)
+            window = full.rolling(window_days, min_periods=1).sum().reindex(days)
+            frames.append(window.assign(bank=bank))
+        if not frames:
+            return pd.DataFrame(columns=["bank", "day", "reviews", *LABELS, "net_sentiment", "mean_score"])
+        result = pd.concat(frames).rename_axis("day").reset_index()
+        result["reviews"] = result[list(LABELS)].sum(axis=1)
+        result["net_sentiment"] = (result["positive"] - result["negative"]) / result["reviews"].where(result["reviews"] > 0)
+        result["mean_score"] = result["score_sum"] / result["reviews"].where(result["reviews"] > 0)
+        result["day"] = result["day"].dt.strftime("%Y-%m-%d")
+        result[["reviews", *LABELS]] = result[["reviews", *LABELS]].astype(int)
+        return result[["bank", "day", "reviews", *LABELS, "net_sentiment", "mean_score"]]
+
+    def window_summary(self, days: int = 30, model: str = "distilbert", end: Optional[str] = None) -> pd.DataFrame:
+        """Sentiment per bank over the last days days up to end (default: the latest stored day)."""
+        end = end or self.last_day()
+        if end is None:
+            return pd.DataFrame(columns=["bank", "reviews", *LABELS, "net_sentiment", "mean_score"])
+        summary = self.rolling_sentiment(days, model, start=end, end=end)
+        return summary.drop(columns="day")
+
+    def theme_counts(self, days: int = 30, end: Optional[str] = None) -> pd.DataFrame:
+        """Reviews per bank and theme over the last days days up to end."""
+        end = end or self.last_day()
+        if end is None:
+            return pd.DataFrame(columns=["bank", "theme", "reviews"])
+        start = (pd.Timestamp(end) - pd.Timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        return self._read(
+            """
+            SELECT bank, theme, SUM(reviews) AS reviews FROM theme_daily
+            WHERE day BETWEEN ? AND ? GROUP BY bank, theme ORDER BY bank, reviews DESC
+            """,
+            [start, end],
+        )
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        self.connection.close()
+
+if __name__ == "__main__":
+    from scripts.common.storage import iter_reviews
+
+    parser = argparse.ArgumentParser(description="Maintain and query daily sentiment/theme aggregates.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    merge = subcommands.add_parser("merge", help="Merge a file of scored reviews as one or more batches")
+    merge.add_argument("--input", default="data/processed/thematic_reviews.parquet")
+    merge.add_argument("--rebuild", action="store_true", help="Drop stored aggregates first")
+    trend = subcommands.add_parser("trend", help="Print rolling sentiment per bank")
+    trend.add_argument("--window", type=int, default=7, help="Window in days, e.g. 7, 30 or 90")
+    trend.add_argument("--model", choices=SENTIMENT_MODELS, default="distilbert")
+    trend.add_argument("--start")
+    trend.add_argument("--end")
+    for subcommand in (merge, trend):
+        subcommand.add_argument("--store", default=DEFAULT_STORE_PATH)
+    args = parser.parse_args()
+
+    store = AggregateStore(args.store)
+    if args.command == "merge":
+        if args.input.endswith(".parquet") and not args.rebuild:
+            applied = store.sync(args.input)
+        else:
+            chunks = iter_reviews(args.input, columns=SYNC_COLUMNS)
+            applied = store.rebuild(chunks) if args.rebuild else sum(store.merge(chunk) for chunk in chunks)
+        print(f"Applied {applied} new batches to {args.store}")
+        print(f"Metrics written to {metrics.export('aggregate_store')}")
+    else:
+        print(store.rolling_sentiment(args.window, args.model, start=args.start, end=args.end).to_string(index=False))
+    store.close()
@@ -0,0 +1,283 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import argparse
+import functools
+import glob
+import hashlib
+import json
+import re
+import time
+import numpy as np
+from typing import Callable, Dict, List, Optional, Sequence
+
+MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+MODEL_REVISION = "main"
+
+BACKENDS = ("pytorch", "pytorch-int8", "onnx", "onnx-int8")
+BACKEND_ENV = "SENTIMENT_BACKEND"
+MODEL_DIR_ENV = "SENTIMENT_MODEL_DIR"
+DEFAULT_MODEL_DIR = "models/distilbert-sst2"
+
+# Anything called like a transformers text-classification pipeline
+SentimentPipe = Callable[..., List[Dict[str, object]]]
+
+def token_lengths(texts: Sequence[str], tokenizer=None, max_length: Optional[int] = None) -> List[int]:
+    """Tokens per text, capped at max_length: the length a batch containing it is padded to.
+
+    Character counts are a poor proxy for Amharic, emoji or other multi-byte
+    heavy text. Without a tokenizer (e.g. a stand-in pipe), character counts are used.
+    """
+    if tokenizer is None:
+        return [len(text) for text in texts]
+    encoded = tokenizer(list(texts), add_special_tokens=False, truncation=max_length is not None, max_length=max_length)
+    return [len(ids) for ids in encoded["input_ids"]]
+
+def onnx_path(model_dir: str, quantized: bool = False) -> str:
+    """Where export_onnx / quantize_onnx write the fp32 and int8 graphs inside a model directory."""
+    return os.path.join(model_dir, "onnx", "model.int8.onnx" if quantized else "model.onnx")
+
+# Files that define a local model's outputs besides its weights
+MODEL_FILES = ("config.json", "tokenizer.json", "tokenizer_config.json", "special_tokens_map.json", "vocab.txt")
+_file_digests: Dict[tuple, str] = {}
+
+def _file_digest(path: str) -> str:
+    """Content digest of a file, recomputed only when its size or modification time changes."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_digests:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        _file_digests[key] = digest.hexdigest()
+    return _file_digests[key]
+
+def model_fingerprint(model_dir: str, backend: str = "pytorch") -> str:
+    """Digest of the config, tokenizer and weights the backend loads from model_dir."""
+    if backend.startswith("onnx"):
+        weights = [onnx_path(model_dir, quantized=backend == "onnx-int8")]
+    else:
+        weights = sorted(glob.glob(os.path.join(model_dir, "*.safetensors")) + glob.glob(os.path.join(model_dir, "*.bin")))
+    digest = hashlib.blake2b(digest_size=16)
+    for path in [os.path.join(model_dir, name) for name in MODEL_FILES] + weights:
+        if os.path.exists(path):
+            digest.update(f"{os.path.relpath(path, model_dir)}={_file_digest(path)};".encode())
+    return digest.hexdigest()
+
+@functools.lru_cache(maxsize=None)
+def resolve_revision(model_name: str = MODEL_NAME, revision: str = MODEL_REVISION) -> str:
+    """Commit hash a Hub revision (e.g. the main branch) points to; asks the Hub, else the local HF cache."""
+    if re.fullmatch(r"[0-9a-f]{40}", revision):
+        return revision
+    from huggingface_hub import HfApi, snapshot_download
+    try:
+        return HfApi().model_info(model_name, revision=revision).sha
+    except Exception:  # offline; the snapshot transformers would load is the cached one
+        pass
+    try:
+        return os.path.basename(snapshot_download(model_name, revision=revision, local_files_only=True))
+    except Exception:
+        return revision
+
+def cache_revision(backend: str, model_dir: Optional[str] = None, revision: str = MODEL_REVISION) -> str:
+    """Revision used in sentiment cache keys, naming the exact weights that produce the scores.
+
+    A local model_dir is identified by a digest of its config, tokenizer and
+    the weights the backend loads; a Hub model by the commit its revision
+    resolves to. Quantized/exported backends score slightly differently, so
+    they get their own suffix.
+    """
+    weights = model_fingerprint(model_dir, backend) if model_dir else resolve_revision(MODEL_NAME, revision)
+    return weights if backend == "pytorch" else f"{weights}+{backend}"
+
+def download_model(model_dir: str = DEFAULT_MODEL_DIR, model_name: str = MODEL_NAME, revision: str = MODEL_REVISION) -> str:
+    """Fetch config, tokenizer and weights once so every backend can load without network access."""
+    from huggingface_hub import snapshot_download
+    return snapshot_download(
+        repo_id=model_name,
+        revision=revision,
+        local_dir=model_dir,
+        allow_patterns=["*.json", "*.txt", "*.safetensors"],
+    )
+
+def _load_model(model_dir: Optional[str]):
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    source = model_dir or MODEL_NAME
+    local = model_dir is not None
+    kwargs = {"local_files_only": True} if local else {"revision": MODEL_REVISION}
+    model = AutoModelForSequenceClassification.from_pretrained(source, **kwargs)
+    tokenizer = AutoTokenizer.from_pretrained(source, **kwargs)
+    return model.eval(), tokenizer
+
+def load_encoder(model_dir: Optional[str] = None):
+    """The DistilBERT encoder under the sentiment head, with its tokenizer, for sentence embeddings."""
+    from transformers import AutoModel, AutoTokenizer
+    source = model_dir or MODEL_NAME
+    kwargs = {"local_files_only": True} if model_dir is not None else {"revision": MODEL_REVISION}
+    return AutoModel.from_pretrained(source, **kwargs).eval(), AutoTokenizer.from_pretrained(source, **kwargs)
+
+def quantize_torch(model):
+    """Dynamic int8 quantization of a model's Linear layers (weights int8, activations quantized per batch)."""
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def export_onnx(model_dir: str = DEFAULT_MODEL_DIR, opset: int = 17) -> str:
+    """Export the local fp32 model to ONNX with dynamic batch and sequence axes. Returns the graph path."""
+    import torch
+    model, tokenizer = _load_model(model_dir)
+    model.config.return_dict = False
+    sample = tokenizer(["an example review"], return_tensors="pt")
+    path = onnx_path(model_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    torch.onnx.export(
+        model,
+        (sample["input_ids"], sample["attention_mask"]),
+        path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=opset,
+        dynamo=False,
+    )
+    return path
+
+def quantize_onnx(model_dir: str = DEFAULT_MODEL_DIR) -> str:
+    """Write a dynamically int8-quantized copy of the ONNX graph, exporting it first if needed."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    source = onnx_path(model_dir)
+    if not os.path.exists(source):
+        export_onnx(model_dir)
+    target = onnx_path(model_dir, quantized=True)
+    quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+    return target
+
+class OnnxSentimentPipeline:
+    """ONNX Runtime replacement for the transformers sentiment pipeline, with the same call signature."""
+
+    def __init__(self, model_dir: str, quantized: bool = False, num_threads: Optional[int] = None):
+        import onnxruntime
+        from transformers import AutoConfig, AutoTokenizer
+        path = onnx_path(model_dir, quantized)
+        if not os.path.exists(path):
+            command = "quantize" if quantized else "export"
+            raise FileNotFoundError(
+                f"{path} not found; run `python scripts/analysis/inference_backends.py {command} "
+                f"--model-dir {model_dir}` first"
+            )
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir, local_files_only=True)
+        self.labels = AutoConfig.from_pretrained(model_dir, local_files_only=True).id2label
+
+    def __call__(self, texts, batch_size: Optional[int] = None, truncation: bool = True, max_length: int = 512, **kwargs):
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        batch_size = batch_size or len(texts) or 1
+        results = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size], padding=True, truncation=truncation,
+                max_length=max_length, return_tensors="np"
+            )
+            (logits,) = self.session.run(["logits"], {
+                "input_ids": encoded["input_ids"].astype(np.int64),
+                "attention_mask": encoded["attention_mask"].astype(np.int64),
+            })
+            probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probabilities /= probabilities.sum(axis=1, keepdims=True)
+            best = probabilities.argmax(axis=1)
+            results.extend(
+                {"label": self.labels[int(label)], "score": float(probabilities[i, label])}
+                for i, label in enumerate(best)
+            )
+        return results
+
+def load_pipeline(backend: str = "pytorch", model_dir: Optional[str] = None, num_threads: Optional[int] = None) -> SentimentPipe:
+    """Build the DistilBERT sentiment pipe for a backend.
+
+    With model_dir everything loads from that directory with no network access
+    (see download_model); without it the pytorch backends fetch MODEL_NAME from
+    the Hub as before. ONNX backends always need model_dir and an exported graph.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+    if backend.startswith("onnx"):
+        if model_dir is None:
+            raise ValueError(f"The {backend} backend needs a local model_dir (or ${MODEL_DIR_ENV})")
+        return OnnxSentimentPipeline(model_dir, quantized=backend == "onnx-int8", num_threads=num_threads)
+
+    from transformers import pipeline
+    if backend == "pytorch" and model_dir is None:
+        return pipeline("sentiment-analysis", model=MODEL_NAME, revision=MODEL_REVISION)
+    model, tokenizer = _load_model(model_dir)
+    if backend == "pytorch-int8":
+        model = quantize_torch(model)
+    return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+def _positive_probability(result: Dict[str, object]) -> float:
+    score = float(result["score"])
+    return score if str(result["label"]).upper() == "POSITIVE" else 1.0 - score
+
+def _timed(pipe: SentimentPipe, texts: List[str], batch_size: int, max_length: int):
+    start = time.perf_counter()
+    results = []
+    for i in range(0, len(texts), batch_size):
+        batch = texts[i:i + batch_size]
+        results.extend(pipe(batch, batch_size=len(batch), truncation=True, max_length=max_length))
+    return results, time.perf_counter() - start
+
+def parity_check(
+    texts: Sequence[str],
+    candidate: SentimentPipe,
+    reference: SentimentPipe,
+    batch_size: int = 32,
+    max_length: int = 512,
+) -> dict:
+    """Compare a backend against the fp32 reference on texts.
+
+    Reports label agreement, drift of P(positive) and the wall time of each
+    backend on the same batches.
+    """
+    texts = [text for text in texts if isinstance(text, str) and text.strip()]
+    reference_results, reference_seconds = _timed(reference, texts, batch_size, max_length)
+    candidate_results, candidate_seconds = _timed(candidate, texts, batch_size, max_length)
+    agree = [str(a["label"]).lower() == str(b["label"]).lower() for a, b in zip(reference_results, candidate_results)]
+    drift = np.abs(np.array([_positive_probability(r) for r in reference_results])
+                   - np.array([_positive_probability(r) for r in candidate_results]))
+    return {
+        "texts": len(texts),
+        "label_agreement": float(np.mean(agree)) if texts else None,
+        "mean_score_drift": float(drift.mean()) if texts else None,
+        "max_score_drift": float(drift.max()) if texts else None,
+        "reference_seconds": round(reference_seconds, 4),
+        "candidate_seconds": round(candidate_seconds, 4),
+        "speedup": round(reference_seconds / candidate_seconds, 2) if candidate_seconds > 0 else None,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prepare and validate local DistilBERT sentiment backends.")
+    parser.add_argument("command", choices=["download", "export", "quantize", "parity"])
+    parser.add_argument("--backend", choices=BACKENDS, default="onnx-int8")
+    parser.add_argument("--model-dir", default=os.environ.get(MODEL_DIR_ENV, DEFAULT_MODEL_DIR))
+    parser.add_argument("--input", default="data/processed/preprocessed_reviews.parquet", help="Reviews for parity")
+    parser.add_argument("--sample", type=int, default=2000, help="Reviews to compare in the parity check")
+    args = parser.parse_args()
+
+    if args.command == "download":
+        print(f"Model saved to {download_model(args.model_dir)}")
+    elif args.command == "export":
+        print(f"ONNX graph saved to {export_onnx(args.model_dir)}")
+    elif args.command == "quantize":
+        print(f"int8 ONNX graph saved to {quantize_onnx(args.model_dir)}")
+    else:
+        from scripts.common.storage import read_reviews
+        texts = read_reviews(args.input, columns=["review"])["review"].head(args.sample).tolist()
+        report = parity_check(texts, load_pipeline(args.backend, args.model_dir), load_pipeline("pytorch", args.model_dir))
+        print(json.dumps({"backend": args.backend, **report}, indent=2))
@@ -0,0 +1,277 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import argparse
+import re
+import sqlite3
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from scripts.common.metrics import metrics
+from scripts.common.hashing import review_hashes
+
+DEFAULT_INDEX_PATH = "data/cache/near_duplicates.sqlite"
+SHINGLE_SIZE = 5  # characters per shingle
+NUM_PERM = 120  # MinHash functions per signature
+BANDS = 20  # LSH bands of NUM_PERM // BANDS rows; texts with Jaccard >= 0.8 collide in some band >99% of the time
+THRESHOLD = 0.8  # estimated Jaccard similarity needed to join a cluster
+MIN_SHINGLES = 10  # shorter texts ("Good app") are too generic to call copies, so they are never clustered
+_SHINGLE_CHUNK = 50_000  # shingles hashed per NumPy pass, bounding memory to ~100 MB
+
+# SQLite caps the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    """Character shingles of text with case, punctuation and spacing normalized away."""
+    if not isinstance(text, str):
+        return []
+    normalized = " ".join(re.sub(r"[^\w]+", " ", text.lower()).split())
+    if len(normalized) <= size:
+        return [normalized] if normalized else []
+    return [normalized[i:i + size] for i in range(len(normalized) - size + 1)]
+
+def _permutations(num_perm: int, seed: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+    offsets = rng.integers(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+    return multipliers, offsets
+
+_MULTIPLIERS, _OFFSETS = _permutations(NUM_PERM)
+
+def minhash_signatures(texts: Sequence[str], min_shingles: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """MinHash signatures (n x NUM_PERM uint32) and a mask of texts with at least min_shingles shingles.
+
+    Shingles are hashed with pandas' stable 64-bit hash, and each permutation is
+    the multiply-shift hash (a * x + b) >> 32, computed for all shingles at once.
+    """
+    shingle_lists = [shingles(text) for text in texts]
+    lengths = np.array([len(doc) for doc in shingle_lists], dtype=np.int64)
+    valid = lengths >= max(min_shingles, 1)
+    signatures = np.full((len(shingle_lists), NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+    if not valid.any():
+        return signatures, valid
+    hashes = pd.util.hash_array(np.array([s for doc in shingle_lists for s in doc], dtype=object))
+    owners = np.repeat(np.arange(len(shingle_lists)), lengths)
+    with np.errstate(over="ignore"):
+        for start in range(0, len(hashes), _SHINGLE_CHUNK):
+            chunk, chunk_owners = hashes[start:start + _SHINGLE_CHUNK], owners[start:start + _SHINGLE_CHUNK]
+            values = ((chunk[:, None] * _MULTIPLIERS + _OFFSETS) >> np.uint64(32)).astype(np.uint32)
+            firsts = np.flatnonzero(np.r_[True, chunk_owners[1:] != chunk_owners[:-1]])
+            docs = chunk_owners[firsts]
+            signatures[docs] = np.minimum(signatures[docs], np.minimum.reduceat(values, firsts, axis=0))
+    return signatures, valid
+
+def band_keys(signatures: np.ndarray, bands: int = BANDS) -> np.ndarray:
+    """One int64 key per (signature, band): a stable hash of that band's rows."""
+    rows = signatures.shape[1] // bands
+    keys = np.empty((len(signatures), bands), dtype=np.int64)
+    for band in range(bands):
+        frame = pd.DataFrame(signatures[:, band * rows:(band + 1) * rows])
+        keys[:, band] = pd.util.hash_pandas_object(frame, index=False).to_numpy().view(np.int64)
+    return keys
+
+class NearDuplicateIndex:
+    """Persistent MinHash-LSH index that clusters near-identical reviews as batches stream through.
+
+    Each cluster keeps the signature of its first review (the representative)
+    and owns the LSH band keys that review produced. A new review is compared
+    only with the representatives that share one of its band keys, so a batch
+    costs time linear in its size rather than in the size of the corpus.
+    Band keys are mixed with the review's scope (its bank), so clusters never
+    span banks, and texts with fewer than min_shingles shingles are left
+    unclustered. Reviews already in the index keep their cluster, so
+    replaying a batch changes nothing.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, threshold: float = THRESHOLD, min_shingles: int = MIN_SHINGLES):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.threshold = threshold
+        self.min_shingles = min_shingles
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS clusters (
+                cluster INTEGER PRIMARY KEY,
+                representative INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                text TEXT,
+                signature BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS lsh_bands (
+                band INTEGER NOT NULL,
+                key INTEGER NOT NULL,
+                cluster INTEGER NOT NULL,
+                PRIMARY KEY (band, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS members (
+                review INTEGER PRIMARY KEY,
+                cluster INTEGER NOT NULL
+            );
+        """)
+        self.connection.commit()
+
+    def _select(self, sql: str, values: Sequence, prefix: Sequence = ()) -> List[tuple]:
+        rows = []
+        for start in range(0, len(values), _LOOKUP_CHUNK):
+            chunk = list(values[start:start + _LOOKUP_CHUNK])
+            placeholders = ", ".join("?" * len(chunk))
+            rows.extend(self.connection.execute(sql.format(placeholders=placeholders), [*prefix, *chunk]).fetchall())
+        return rows
+
+    def _known_band_keys(self, keys: np.ndarray) -> Dict[Tuple[int, int], int]:
+        found = {}
+        for band in range(keys.shape[1]):
+            unique = np.unique(keys[:, band]).tolist()
+            rows = self._select("SELECT key, cluster FROM lsh_bands WHERE band = ? AND key IN ({placeholders})", unique, [band])
+            found.update({(band, key): cluster for key, cluster in rows})
+        return found
+
+    def assign(
+        self, texts: Sequence[str], review_keys: np.ndarray, scopes: Optional[Sequence[str]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Cluster id (-1 for texts too short to compare) and a near-duplicate flag for each review.
+
+        review_keys identify reviews across batches (see review_hashes), and
+        reviews only cluster with others of the same scope (e.g. bank). The
+        representative of each cluster is not flagged; every other member is.
+        """
+        texts = list(texts)
+        scopes = [""] * len(texts) if scopes is None else [str(scope) for scope in scopes]
+        review_keys = np.asarray(review_keys, dtype=np.uint64).view(np.int64)
+        clusters = np.full(len(texts), -1, dtype=np.int64)
+        known = dict(self._select("SELECT review, cluster FROM members WHERE review IN ({placeholders})",
+                                  np.unique(review_keys).tolist()))
+        pending = []
+        for i, key in enumerate(review_keys.tolist()):
+            if key in known:
+                clusters[i] = known[key]
+            else:
+                pending.append(i)
+
+        signatures, valid = minhash_signatures([texts[i] for i in pending], self.min_shingles)
+        scope_keys = pd.util.hash_array(np.array([scopes[i] for i in pending], dtype=object)).view(np.int64)
+        pending = np.asarray(pending, dtype=np.int64)
+        keys = band_keys(signatures) ^ scope_keys[:, None]
+        band_index = self._known_band_keys(keys[valid])
+        representatives = {
+            cluster: np.frombuffer(signature, dtype=np.uint32)
+            for cluster, signature in self._select(
+                "SELECT cluster, signature FROM clusters WHERE cluster IN ({placeholders})", sorted(set(band_index.values()))
+            )
+        }
+        (next_cluster,) = self.connection.execute("SELECT COALESCE(MAX(cluster), -1) + 1 FROM clusters").fetchone()
+
+        new_clusters, new_bands, grown, new_members = [], [], {}, {}
+        for j, position in enumerate(pending.tolist()):
+            key = int(review_keys[position])
+            if key in new_members:  # the same review twice in one batch
+                clusters[position] = new_members[key]
+                continue
+            if not valid[j]:
+                continue
+            signature = signatures[j]
+            row_keys = [(band, int(band_key)) for band, band_key in enumerate(keys[j].tolist())]
+            best, best_similarity = None, self.threshold
+            for cluster in {band_index[row_key] for row_key in row_keys if row_key in band_index}:
+                similarity = np.count_nonzero(representatives[cluster] == signature) / NUM_PERM
+                if similarity >= best_similarity:
+                    best, best_similarity = cluster, similarity
+            if best is None:
+                best = next_cluster
+                next_cluster += 1
+                representatives[best] = signature
+                new_clusters.append((best, key, 0, texts[position], signature.tobytes()))
+                for row_key in row_keys:
+                    if row_key not in band_index:
+                        band_index[row_key] = best
+                        new_bands.append((*row_key, best))
+            grown[best] = grown.get(best, 0) + 1
+            clusters[position] = best
+            new_members[key] = best
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO clusters (cluster, representative, size, text, signature) VALUES (?, ?, ?, ?, ?)",
+                new_clusters,
+            )
+            self.connection.executemany("UPDATE clusters SET size = size + ? WHERE cluster = ?",
+                                        [(count, cluster) for cluster, count in grown.items()])
+            self.connection.executemany("INSERT OR IGNORE INTO lsh_bands (band, key, cluster) VALUES (?, ?, ?)", new_bands)
+            self.connection.executemany("INSERT OR IGNORE INTO members (review, cluster) VALUES (?, ?)",
+                                        list(new_members.items()))
+
+        representative_of = dict(self._select(
+            "SELECT cluster, representative FROM clusters WHERE cluster IN ({placeholders})",
+            np.unique(clusters[clusters >= 0]).tolist(),
+        ))
+        flags = np.array([
+            cluster >= 0 and representative_of[cluster] != key
+            for cluster, key in zip(clusters.tolist(), review_keys.tolist())
+        ], dtype=bool)
+        return clusters, flags
+
+    def clusters(self, min_size: int = 2) -> pd.DataFrame:
+        """Clusters with at least min_size reviews, largest first, with their representative text."""
+        return pd.read_sql_query(
+            "SELECT cluster, size, text FROM clusters WHERE size >= ? ORDER BY size DESC, cluster",
+            self.connection, params=[min_size],
+        )
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        self.connection.close()
+
+def flag_near_duplicates(
+    df: pd.DataFrame,
+    index: NearDuplicateIndex,
+    text_column: str = "review",
+    scope_column: Optional[str] = "bank",
+    collapse: bool = False,
+    copy: bool = True,
+) -> pd.DataFrame:
+    """Add duplicate_cluster and near_duplicate columns; collapse=True drops the flagged rows instead.
+
+    Rows are identified across batches by their (review, date, bank) hash, so
+    df needs those columns. Clusters are kept within each scope_column value,
+    so the same short praise left for two banks is never merged. Collapsing
+    keeps one review per cluster, so later stages (DistilBERT in particular)
+    score each near-duplicate group once.
+    """
+    with metrics.stage("near_duplicates", rows_in=len(df)) as stage:
+        scopes = df[scope_column].tolist() if scope_column else None
+        clusters, flags = index.assign(df[text_column].tolist(), review_hashes(df), scopes)
+        metrics.increment("near_duplicates_total", int(flags.sum()))
+        if collapse:
+            df = df.loc[~flags].assign(duplicate_cluster=clusters[~flags])
+        else:
+            if copy:
+                df = df.copy()
+            df["duplicate_cluster"] = clusters
+            df["near_duplicate"] = flags
+        stage.rows_out = len(df)
+    return df
+
+if __name__ == "__main__":
+    from scripts.common.storage import ReviewWriter, iter_reviews
+
+    parser = argparse.ArgumentParser(description="Flag or collapse near-duplicate reviews with MinHash LSH.")
+    parser.add_argument("--input", default="data/processed/cleaned_reviews.parquet")
+    parser.add_argument("--output", default="data/processed/deduplicated_reviews.parquet")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--min-shingles", type=int, default=MIN_SHINGLES, help="Shortest text (in shingles) to cluster")
+    parser.add_argument("--collapse", action="store_true", help="Drop near-duplicates instead of flagging them")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    index = NearDuplicateIndex(args.index, args.threshold, args.min_shingles)
+    with ReviewWriter(args.output) as writer:
+        for chunk in iter_reviews(args.input, chunk_size=args.chunk_size):
+            writer.write(flag_near_duplicates(chunk, index, collapse=args.collapse, copy=False))
+    print(f"Saved {writer.rows} reviews to {args.output}")
+    print(f"Largest near-duplicate clusters:\n{index.clusters().head(20).to_string(index=False)}")
+    print(f"Metrics written to {metrics.export('near_duplicates')}")
+    index.close()
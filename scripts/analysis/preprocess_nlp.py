@@ -3,17 +3,39 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 import pandas as pd
-import spacy
 import re
-from deep_translator import GoogleTranslator
-from typing import List, Tuple
+from typing import Iterable, List, Optional, Sequence, Tuple
+from scripts.analysis.translation import TranslationCache, Translator, translate_texts
+from scripts.common.metrics import metrics
+from scripts.common.models import models
+from scripts.common.storage import read_reviews, write_reviews
 
-nlp = spacy.load("en_core_web_sm", disable=["parser", "ner"])
-translator = GoogleTranslator(source='am', target='en')
+def _load_spacy():
+    import spacy
+    return spacy.load("en_core_web_sm", disable=["parser", "ner"])
 
+def _load_translator():
+    from deep_translator import GoogleTranslator
+    return GoogleTranslator(source='am', target='en')
+
+# Loaded on first use, so importing this module stays cheap
+models.register("spacy", _load_spacy)
+models.register("translator", _load_translator)
+_LAZY_GLOBALS = {"nlp": "spacy", "translator": "translator"}
+
+def __getattr__(name: str):
+    """Keep preprocess_nlp.nlp / .translator working; they now load on first access."""
+    if name in _LAZY_GLOBALS:
+        return models.get(_LAZY_GLOBALS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+AMHARIC_CSV = "data/processed/amharic_reviews.csv"
 AMHARIC_REGEX = re.compile(r'[\u1200-\u137F]')  # Ge'ez script range
 TRANSLITERATED_KEYWORDS = ["selam", "betam", "amasegnallo", "yene", "kefel"]  # Common transliterated Amharic
 
+# Components preprocess_text relies on: lemmas need POS tags from tagger/attribute_ruler
+LEMMATIZER_COMPONENTS = ("tok2vec", "tagger", "attribute_ruler", "lemmatizer")
+
 def is_amharic(text: str) -> bool:
     """Detect Amharic script or transliterated Amharic."""
     if not isinstance(text, str):
@@ -27,51 +49,118 @@ def is_amharic(text: str) -> bool:
 def translate_to_english(text: str) -> Tuple[str, bool]:
     """Translate Amharic to English, return translated text and success flag."""
     try:
-        translation = translator.translate(text)
+        translation = models.get("translator").translate(text)
         return translation, True
     except Exception as e:
         print(f"Translation error: {e}")
         return text, False
 
+def _doc_tokens(doc) -> List[str]:
+    return [token.lemma_ for token in doc if token.is_alpha and not token.is_stop]
+
 def preprocess_text(text: str) -> List[str]:
     """Tokenize, remove stopwords, and lemmatize text using Spacy."""
     if not isinstance(text, str) or not text.strip():
         return []
-    doc = nlp(text.lower())
-    return [token.lemma_ for token in doc if token.is_alpha and not token.is_stop]
+    doc = models.get("spacy")(text.lower())
+    return _doc_tokens(doc)
+
+def unused_components() -> List[str]:
+    """Names of loaded pipeline components that preprocess_text does not need."""
+    return [name for name in models.get("spacy").pipe_names if name not in LEMMATIZER_COMPONENTS]
+
+def preprocess_texts(
+    texts: Iterable,
+    batch_size: int = 1000,
+    n_process: int = 1,
+    disable: Optional[Sequence[str]] = None,
+) -> List[List[str]]:
+    """Batch version of preprocess_text built on nlp.pipe.
 
-def preprocess_reviews(df: pd.DataFrame, text_column: str = "review") -> pd.DataFrame:
-    """Apply preprocessing to a DataFrame's text column, handling Amharic."""
-    df = df.copy()
-    amharic_reviews = []
+    Produces the same tokens as calling preprocess_text per text. n_process > 1
+    spreads batches over worker processes; disable lists extra components to
+    skip and defaults to every component the lemmatizer does not depend on.
+    """
+    texts = list(texts)
+    if disable is None:
+        disable = unused_components()
+    tokens: List[List[str]] = [[] for _ in texts]
+    valid = [i for i, text in enumerate(texts) if isinstance(text, str) and text.strip()]
+    docs = models.get("spacy").pipe(
+        (texts[i].lower() for i in valid),
+        batch_size=batch_size,
+        n_process=n_process,
+        disable=list(disable),
+    )
+    for i, doc in zip(valid, docs):
+        tokens[i] = _doc_tokens(doc)
+    return tokens
+
+def preprocess_reviews(
+    df: pd.DataFrame,
+    text_column: str = "review",
+    batch_size: int = 1000,
+    n_process: int = 1,
+    backend: Optional[Translator] = None,
+    translation_cache: Optional[TranslationCache] = None,
+    amharic_csv: Optional[str] = AMHARIC_CSV,
+    amharic_append: bool = False,
+    rate_per_second: Optional[float] = 5.0,
+    copy: bool = True,
+) -> pd.DataFrame:
+    """Apply preprocessing to a DataFrame's text column, handling Amharic.
+
+    Amharic reviews are translated through translate_texts, which deduplicates
+    them, runs requests concurrently and skips anything already in
+    translation_cache, at most rate_per_second requests a second (None for
+    no limit). Pass backend to swap the Google translator out.
+    Reviews that fail translation are saved to amharic_csv (appended to it
+    with amharic_append). copy=False adds columns to df in place.
+    """
+    if copy:
+        df = df.copy()
 
     # Detect and translate Amharic
     df["is_amharic"] = df[text_column].apply(is_amharic)
-    for idx, row in df.iterrows():
-        if row["is_amharic"]:
-            translated_text, success = translate_to_english(row[text_column])
-            if success:
-                df.at[idx, text_column] = translated_text
-            else:
-                amharic_reviews.append(row.to_dict())
-    
+    amharic_texts = df.loc[df["is_amharic"], text_column]
+    with metrics.stage("translate", rows_in=len(amharic_texts)) as stage:
+        translations = translate_texts(
+            amharic_texts.tolist(), backend or models.get("translator"), cache=translation_cache,
+            rate_per_second=rate_per_second
+        )
+        translated = amharic_texts.map(translations)
+        succeeded = translated.notna()
+        stage.rows_out = int(succeeded.sum())
+    df.loc[translated.index[succeeded], text_column] = translated[succeeded]
+    amharic_reviews = df.loc[translated.index[~succeeded]].to_dict("records")
+
     # Save Amharic reviews (failed translations)
-    if amharic_reviews:
-        pd.DataFrame(amharic_reviews).to_csv("data/processed/amharic_reviews.csv", index=False)
-        print(f"Saved {len(amharic_reviews)} Amharic reviews to data/processed/amharic_reviews.csv")
+    if amharic_reviews and amharic_csv:
+        append = amharic_append and os.path.exists(amharic_csv)
+        pd.DataFrame(amharic_reviews).to_csv(
+            amharic_csv, mode="a" if append else "w", header=not append, index=False
+        )
+        print(f"Saved {len(amharic_reviews)} Amharic reviews to {amharic_csv}")
 
     # Fallback: Filter Amharic if no translations
     # df = df[~df["is_amharic"]]  # Uncomment to filter instead of translate
 
     # Preprocess text
-    df["tokens"] = df[text_column].apply(preprocess_text)
-    return df.drop(columns=["is_amharic"])
+    with metrics.stage("tokenize", rows_in=len(df)):
+        df["tokens"] = preprocess_texts(df[text_column], batch_size=batch_size, n_process=n_process)
+    df.drop(columns=["is_amharic"], inplace=True)
+    return df
 
 if __name__ == "__main__":
-    input_csv = "data/processed/cleaned_reviews.csv"
-    output_csv = "data/processed/preprocessed_reviews.csv"
-    df = pd.read_csv(input_csv)  # Full data
-    # df = pd.read_csv(input_csv).head(400)  # Uncomment for testing
-    df = preprocess_reviews(df)
-    df.to_csv(output_csv, index=False)
-    print(f"Preprocessed {len(df)} reviews for banks: {df['bank'].unique().tolist()}, saved to {output_csv}")
\ No newline at end of file
+    input_path = "data/processed/cleaned_reviews.parquet"
+    output_path = "data/processed/preprocessed_reviews.parquet"
+    df = read_reviews(input_path)  # Full data
+    # df = read_reviews(input_path).head(400)  # Uncomment for testing
+    translation_cache = TranslationCache()
+    df = preprocess_reviews(
+        df, n_process=max(1, (os.cpu_count() or 1) - 1), translation_cache=translation_cache
+    )
+    translation_cache.close()
+    write_reviews(df, output_path)
+    print(f"Preprocessed {len(df)} reviews for banks: {df['bank'].unique().tolist()}, saved to {output_path}")
+    metrics.export("preprocess_nlp")
\ No newline at end of file
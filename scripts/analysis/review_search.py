@@ -0,0 +1,393 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import argparse
+import json
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+from scripts.analysis.inference_backends import MODEL_DIR_ENV, load_encoder, token_lengths
+from scripts.common.metrics import metrics
+from scripts.common.models import models
+from scripts.common.hashing import review_hashes
+
+DEFAULT_SEARCH_DIR = "data/search"
+EMBEDDING_DIM = 768  # DistilBERT hidden size
+AUTO_TRAIN_ROWS = 50_000  # below this, exact search is fast enough and there is too little data for good lists
+EXACT_FILTER_ROWS = 20_000  # filtered searches matching at most this many rows score them all
+ENCODE_CONFIG = {"batch_size": 64, "max_length": 128}
+
+# Turns texts into L2-normalized float32 rows; encode_texts by default, injectable for tests
+Encoder = Callable[[Sequence[str]], np.ndarray]
+
+def _load_encoder():
+    return load_encoder(os.environ.get(MODEL_DIR_ENV))
+
+models.register("encoder", _load_encoder)
+
+def encode_texts(texts: Sequence[str], batch_size: Optional[int] = None, max_length: Optional[int] = None) -> np.ndarray:
+    """Mean-pooled, L2-normalized DistilBERT embeddings, one row per text, in token-length-sorted batches."""
+    import torch
+    model, tokenizer = models.get("encoder")
+    batch_size = batch_size or ENCODE_CONFIG["batch_size"]
+    max_length = max_length or ENCODE_CONFIG["max_length"]
+    texts = [text if isinstance(text, str) else "" for text in texts]
+    embeddings = np.zeros((len(texts), model.config.dim), dtype=np.float32)
+    lengths = token_lengths(texts, tokenizer, max_length)
+    order = sorted(range(len(texts)), key=lengths.__getitem__)
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            positions = order[start:start + batch_size]
+            encoded = tokenizer([texts[i] for i in positions], padding=True, truncation=True,
+                                max_length=max_length, return_tensors="pt")
+            hidden = model(**encoded).last_hidden_state
+            mask = encoded["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            embeddings[positions] = torch.nn.functional.normalize(pooled, dim=1).numpy()
+    return embeddings
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+class EmbeddingStore:
+    """Append-only float16 embedding matrix on disk, memory-mapped for reads, keyed by review id.
+
+    Row i of vectors.f16 belongs to line i of ids.txt; bank codes and ratings
+    sit in parallel fixed-width files so filters never touch the vectors.
+    A row count is only trusted up to the shortest of these files, so an
+    interrupted append is ignored rather than misaligning rows.
+    """
+
+    def __init__(self, directory: str = DEFAULT_SEARCH_DIR, dim: int = EMBEDDING_DIM):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.dim = dim
+        banks_path = self._path("banks.json")
+        self.banks: List[str] = []
+        if os.path.exists(banks_path):
+            with open(banks_path) as f:
+                self.banks = json.load(f)
+        with open(self._path("ids.txt"), "a+") as f:
+            f.seek(0)
+            self.ids: List[str] = f.read().splitlines()
+        sizes = self._sizes()
+        rows = min(len(self.ids), sizes[0] // 2, sizes[1], sizes[2] // (2 * dim))
+        if (len(self.ids), *sizes) != (rows, rows * 2, rows, rows * 2 * dim):
+            self._truncate(rows)
+        self.row_of: Dict[str, int] = {review_id: row for row, review_id in enumerate(self.ids)}
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _sizes(self) -> Tuple[int, int, int]:
+        return tuple(
+            os.path.getsize(self._path(name)) if os.path.exists(self._path(name)) else 0
+            for name in ("bank_codes.i2", "ratings.i1", "vectors.f16")
+        )
+
+    def _truncate(self, rows: int):
+        self.ids = self.ids[:rows]
+        with open(self._path("ids.txt"), "w") as f:
+            f.writelines(f"{review_id}\n" for review_id in self.ids)
+        for name, width in (("bank_codes.i2", 2), ("ratings.i1", 1), ("vectors.f16", 2 * self.dim)):
+            with open(self._path(name), "ab") as f:
+                f.truncate(rows * width)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _column(self, name: str, dtype, width: int = 1) -> np.ndarray:
+        """A read-only memmap over one of the row-aligned files, reopened when rows were added."""
+        column = self._columns.get(name)
+        if column is None or len(column) != len(self):
+            shape = (len(self), width) if width > 1 else (len(self),)
+            column = np.memmap(self._path(name), dtype=dtype, mode="r", shape=shape) if len(self) else np.empty(shape, dtype)
+            self._columns[name] = column
+        return column
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """All stored embeddings as a read-only (rows, dim) float16 memmap."""
+        return self._column("vectors.f16", np.float16, self.dim)
+
+    @property
+    def bank_codes(self) -> np.ndarray:
+        return self._column("bank_codes.i2", np.int16)
+
+    @property
+    def ratings(self) -> np.ndarray:
+        return self._column("ratings.i1", np.int8)
+
+    def bank_code(self, bank: str, create: bool = False) -> int:
+        """The code stored for bank, -1 if unknown (or a new code with create=True)."""
+        if bank in self.banks:
+            return self.banks.index(bank)
+        if not create:
+            return -1
+        self.banks.append(bank)
+        with open(self._path("banks.json"), "w") as f:
+            json.dump(self.banks, f)
+        return len(self.banks) - 1
+
+    def new_ids(self, review_ids: Iterable[str]) -> np.ndarray:
+        """Mask of review ids not stored yet (and not repeated earlier in review_ids)."""
+        batch = set()
+        mask = []
+        for review_id in map(str, review_ids):
+            mask.append(review_id not in self.row_of and review_id not in batch)
+            batch.add(review_id)
+        return np.array(mask, dtype=bool)
+
+    def add(self, review_ids: Sequence[str], vectors: np.ndarray, banks: Sequence[str], ratings: Sequence[int]) -> int:
+        """Append rows for review ids not stored yet; returns how many were added."""
+        new = self.new_ids(review_ids)
+        if not new.any():
+            return 0
+        review_ids = [str(review_id) for review_id, is_new in zip(review_ids, new) if is_new]
+        codes = np.array([self.bank_code(str(bank), create=True) for bank in np.asarray(banks, dtype=object)[new]],
+                         dtype=np.int16)
+        with open(self._path("ratings.i1"), "ab") as f:
+            np.asarray(ratings, dtype=np.int8)[new].tofile(f)
+        with open(self._path("bank_codes.i2"), "ab") as f:
+            codes.tofile(f)
+        with open(self._path("vectors.f16"), "ab") as f:
+            _normalize(np.asarray(vectors)[new]).astype(np.float16).tofile(f)
+        with open(self._path("ids.txt"), "a") as f:
+            f.writelines(f"{review_id}\n" for review_id in review_ids)
+        for review_id in review_ids:
+            self.row_of[review_id] = len(self.ids)
+            self.ids.append(review_id)
+        return len(review_ids)
+
+def spherical_kmeans(vectors: np.ndarray, n_lists: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Unit-length centroids maximizing cosine similarity to their members."""
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), size=n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = (vectors @ centroids.T).argmax(axis=1)
+        order = np.argsort(assignments, kind="stable")
+        members, starts = np.unique(assignments[order], return_index=True)
+        sums = np.zeros_like(centroids)
+        sums[members] = np.add.reduceat(vectors[order], starts, axis=0)
+        empty = np.setdiff1d(np.arange(n_lists), members)
+        sums[empty] = vectors[rng.choice(len(vectors), size=len(empty), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+class IVFIndex:
+    """Inverted-file ANN index over an EmbeddingStore: coarse centroids plus one list id per row.
+
+    A query scores only the rows in the nprobe lists whose centroids are
+    closest to it, instead of every row. New rows are assigned to their
+    nearest centroid as they are added. Retrain when the data has drifted
+    far from the centroids. Before the first training, search is exact.
+    """
+
+    def __init__(self, store: EmbeddingStore, nprobe: int = 16, chunk_size: int = 100_000,
+                 exact_filter_rows: int = EXACT_FILTER_ROWS):
+        self.store = store
+        self.nprobe = nprobe
+        self.chunk_size = chunk_size
+        self.exact_filter_rows = exact_filter_rows
+        centroids_path = self._path("centroids.npy")
+        self.centroids: Optional[np.ndarray] = np.load(centroids_path) if os.path.exists(centroids_path) else None
+        self._lists: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def _path(self, name: str) -> str:
+        return self.store._path(name)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def assignments(self) -> np.ndarray:
+        path = self._path("lists.i4")
+        return np.fromfile(path, dtype=np.int32) if os.path.exists(path) else np.empty(0, dtype=np.int32)
+
+    def _assign(self, start: int, stop: int) -> np.ndarray:
+        parts = [
+            (self.store.vectors[i:min(i + self.chunk_size, stop)].astype(np.float32) @ self.centroids.T).argmax(axis=1)
+            for i in range(start, stop, self.chunk_size)
+        ]
+        return np.concatenate(parts).astype(np.int32) if parts else np.empty(0, dtype=np.int32)
+
+    def train(self, n_lists: Optional[int] = None, sample_size: int = 100_000, iterations: int = 10, seed: int = 0):
+        """Fit centroids on a sample of stored rows (default 2 * sqrt(rows) lists) and reassign every row.
+
+        Does nothing on an empty store; search stays exact until rows are added and it is trained.
+        """
+        rows = len(self.store)
+        if rows == 0:
+            return
+        n_lists = n_lists or max(1, min(rows, int(2 * np.sqrt(rows))))
+        sample = np.sort(np.random.default_rng(seed).choice(rows, size=min(rows, max(sample_size, n_lists)), replace=False))
+        self.centroids = spherical_kmeans(self.store.vectors[sample], n_lists, iterations, seed)
+        np.save(self._path("centroids.npy"), self.centroids)
+        self._assign(0, rows).tofile(self._path("lists.i4"))
+        self._lists = None
+
+    def sync(self) -> int:
+        """Assign rows added to the store since the last sync; returns how many."""
+        if not self.is_trained:
+            return 0
+        done = len(self.assignments)
+        with open(self._path("lists.i4"), "ab") as f:
+            self._assign(done, len(self.store)).tofile(f)
+        self._lists = None
+        return len(self.store) - done
+
+    def _inverted_lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._lists is None:
+            assignments = self.assignments
+            order = np.argsort(assignments, kind="stable")
+            bounds = np.searchsorted(assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = (order, bounds)
+        return self._lists
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Rows to score for a query: members of the nprobe nearest lists, or every row if untrained."""
+        if not self.is_trained:
+            return np.arange(len(self.store))
+        order, bounds = self._inverted_lists()
+        probes = np.argsort(-(self.centroids @ query))[:nprobe or self.nprobe]
+        return np.sort(np.concatenate([order[bounds[probe]:bounds[probe + 1]] for probe in probes]))
+
+    def _matching(self, rows: np.ndarray, bank: Optional[str], rating) -> np.ndarray:
+        if bank is not None:
+            rows = rows[self.store.bank_codes[rows] == self.store.bank_code(bank)]
+        if rating is not None:
+            rows = rows[np.isin(self.store.ratings[rows], np.atleast_1d(rating))]
+        return rows
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        bank: Optional[str] = None,
+        rating: Optional[Union[int, Sequence[int]]] = None,
+        nprobe: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and cosine similarities of the k stored embeddings closest to query, best first.
+
+        With a bank or rating filter, matching rows may sit outside the nearest
+        lists. If few rows match (at most exact_filter_rows), all of them are
+        scored; otherwise nprobe doubles until the probed lists hold k matches.
+        """
+        query = _normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        nprobe = nprobe or self.nprobe
+        if not self.is_trained or (bank is None and rating is None):
+            rows = self._matching(self.candidates(query, nprobe), bank, rating)
+        else:
+            rows = self._matching(np.arange(len(self.store)), bank, rating)
+            if len(rows) > self.exact_filter_rows:
+                while True:
+                    rows = self._matching(self.candidates(query, nprobe), bank, rating)
+                    if len(rows) >= k or nprobe >= len(self.centroids):
+                        break
+                    nprobe *= 2
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), self.chunk_size):
+            chunk = rows[start:start + self.chunk_size]
+            scores[start:start + len(chunk)] = self.store.vectors[chunk].astype(np.float32) @ query
+        best = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+        best = best[np.argsort(-scores[best])]
+        return rows[best], scores[best]
+
+def review_keys(df: pd.DataFrame) -> List[str]:
+    """Store key of each review: its review_id, or "h" plus its (review, date, bank) hash when it has none.
+
+    Raises ValueError when a review has no id and df has no date to derive a key from.
+    """
+    ids = df["review_id"] if "review_id" in df else pd.Series(None, index=df.index, dtype=object)
+    missing = (ids.isna() | (ids.astype(str).str.strip() == "")).to_numpy()
+    keys = ids.astype(str).to_numpy(dtype=object)
+    if missing.any():
+        if not {"review", "date", "bank"} <= set(df.columns):
+            raise ValueError(f"{int(missing.sum())} reviews have no review_id, and review/date/bank are needed "
+                             "to derive a stable key for them")
+        rows = df.loc[missing, ["review", "date", "bank"]]
+        rows = rows.assign(date=pd.to_datetime(rows["date"], format="ISO8601").dt.strftime("%Y-%m-%d"),
+                           bank=rows["bank"].astype(str))
+        keys[missing] = [f"h{value:016x}" for value in review_hashes(rows).tolist()]
+    return keys.tolist()
+
+def index_reviews(
+    df: pd.DataFrame,
+    store: EmbeddingStore,
+    index: IVFIndex,
+    encode: Encoder = encode_texts,
+    text_column: str = "review",
+) -> int:
+    """Embed and add reviews whose key (see review_keys) is not stored yet; returns how many were added.
+
+    The IVF index is trained automatically once the store reaches
+    AUTO_TRAIN_ROWS rows, and kept in sync with every later add.
+    """
+    keys = review_keys(df)
+    new = store.new_ids(keys)
+    with metrics.stage("embed", rows_in=int(new.sum())):
+        batch = df[new]
+        added = store.add([key for key, is_new in zip(keys, new) if is_new], encode(batch[text_column].tolist()),
+                          batch["bank"].astype(str).tolist(), batch["rating"].tolist()) if len(batch) else 0
+    if not index.is_trained and len(store) >= AUTO_TRAIN_ROWS:
+        index.train()
+    else:
+        index.sync()
+    return added
+
+def search_reviews(
+    query: str,
+    index: IVFIndex,
+    k: int = 10,
+    bank: Optional[str] = None,
+    rating: Optional[Union[int, Sequence[int]]] = None,
+    encode: Encoder = encode_texts,
+) -> pd.DataFrame:
+    """The k stored reviews most similar to a free-text query, optionally only for a bank and rating(s)."""
+    with metrics.timer("search_seconds"):
+        rows, scores = index.search(encode([query])[0], k=k, bank=bank, rating=rating)
+    store = index.store
+    return pd.DataFrame({
+        "review_id": [store.ids[row] for row in rows],
+        "bank": [store.banks[code] for code in store.bank_codes[rows]],
+        "rating": store.ratings[rows],
+        "score": scores,
+    })
+
+if __name__ == "__main__":
+    from scripts.common.storage import iter_reviews, read_reviews
+
+    parser = argparse.ArgumentParser(description="Build and query the semantic review search index.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    add = subcommands.add_parser("index", help="Embed reviews not indexed yet")
+    add.add_argument("--input", default="data/processed/cleaned_reviews.parquet")
+    add.add_argument("--retrain", action="store_true", help="Refit the IVF centroids after adding")
+    query = subcommands.add_parser("search", help="Find reviews similar to a query")
+    query.add_argument("query")
+    query.add_argument("-k", type=int, default=10)
+    query.add_argument("--bank")
+    query.add_argument("--rating", type=int, nargs="+")
+    query.add_argument("--reviews", default="data/processed/cleaned_reviews.parquet", help="Where to look up review text")
+    for subcommand in (add, query):
+        subcommand.add_argument("--dir", default=DEFAULT_SEARCH_DIR)
+    args = parser.parse_args()
+
+    index = IVFIndex(EmbeddingStore(args.dir))
+    if args.command == "index":
+        added = sum(index_reviews(chunk, index.store, index)
+                    for chunk in iter_reviews(args.input, columns=["review_id", "review", "bank", "rating", "date"]))
+        if args.retrain:
+            index.train()
+        print(f"Indexed {added} new reviews; {len(index.store)} in {args.dir}")
+        print(f"Metrics written to {metrics.export('review_search')}")
+    else:
+        results = search_reviews(args.query, index, k=args.k, bank=args.bank, rating=args.rating)
+        reviews = read_reviews(args.reviews, columns=["review_id", "review", "bank", "date"])
+        reviews = reviews.assign(review_id=review_keys(reviews))[["review_id", "review"]]
+        print(results.merge(reviews, on="review_id", how="left").to_string(index=False))
@@ -2,19 +2,93 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import version
+import numpy as np
 import pandas as pd
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from transformers import pipeline
-from typing import Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from scripts.analysis.inference_backends import (
+    BACKEND_ENV, BACKENDS, MODEL_DIR_ENV, MODEL_NAME, MODEL_REVISION, cache_revision, load_pipeline, token_lengths
+)
+from scripts.analysis.sentiment_cache import SentimentCache
+from scripts.common.metrics import metrics
+from scripts.common.models import models
+from scripts.common.storage import read_reviews, write_reviews
 
-analyzer = SentimentIntensityAnalyzer()
-pipe = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
+VADER_MODEL_NAME = "vader"
+VADER_REVISION = version("vaderSentiment")
+
+# VADER label codes returned by score_vader index into this array
+VADER_LABELS = np.array(["negative", "neutral", "positive"], dtype=object)
+VADER_NEGATIVE, VADER_NEUTRAL, VADER_POSITIVE = 0, 1, 2
+
+# Throughput knobs for batched DistilBERT inference (see configure_inference)
+INFERENCE_CONFIG = {
+    "batch_size": 32,
+    "max_length": 512,
+    "num_threads": None,
+    "backend": os.environ.get(BACKEND_ENV, "pytorch"),  # pytorch, pytorch-int8, onnx or onnx-int8
+    "model_dir": os.environ.get(MODEL_DIR_ENV),  # local model directory; None fetches MODEL_NAME from the Hub
+}
+
+def _load_distilbert():
+    return load_pipeline(
+        INFERENCE_CONFIG["backend"], INFERENCE_CONFIG["model_dir"], num_threads=INFERENCE_CONFIG["num_threads"]
+    )
+
+# Loaded on first use, so aggregation and tests that never score text start instantly
+models.register("vader", SentimentIntensityAnalyzer)
+models.register("distilbert", _load_distilbert)
+_LAZY_GLOBALS = {"analyzer": "vader", "pipe": "distilbert"}
+
+def __getattr__(name: str):
+    """Keep sentiment_analysis.analyzer / .pipe working; they now load on first access."""
+    if name in _LAZY_GLOBALS:
+        return models.get(_LAZY_GLOBALS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def configure_inference(
+    batch_size: Optional[int] = None,
+    max_length: Optional[int] = None,
+    num_threads: Optional[int] = None,
+    backend: Optional[str] = None,
+    model_dir: Optional[str] = None,
+) -> dict:
+    """Update batch size, max sequence length and torch thread count for inference.
+
+    Changing backend or model_dir unloads the DistilBERT pipe so its next use
+    loads the new one, e.g.
+    configure_inference(backend="onnx-int8", model_dir="models/distilbert-sst2").
+    """
+    if batch_size is not None:
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+        INFERENCE_CONFIG["batch_size"] = batch_size
+    if max_length is not None:
+        if max_length < 1:
+            raise ValueError(f"max_length must be positive, got {max_length}")
+        INFERENCE_CONFIG["max_length"] = max_length
+    if num_threads is not None:
+        import torch
+        torch.set_num_threads(num_threads)
+        INFERENCE_CONFIG["num_threads"] = num_threads
+    if backend is not None and backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+    selected = (backend or INFERENCE_CONFIG["backend"], model_dir or INFERENCE_CONFIG["model_dir"])
+    if selected != (INFERENCE_CONFIG["backend"], INFERENCE_CONFIG["model_dir"]):
+        INFERENCE_CONFIG["backend"], INFERENCE_CONFIG["model_dir"] = selected
+        models.unload("distilbert")
+    return dict(INFERENCE_CONFIG)
 
 def get_vader_sentiment(text: str) -> Tuple[str, float]:
     """Compute VADER sentiment label and score."""
     if not isinstance(text, str) or not text.strip():
         return "neutral", 0.0
-    scores = analyzer.polarity_scores(text)
+    scores = models.get("vader").polarity_scores(text)
     compound = scores["compound"]
     if compound >= 0.05:
         return "positive", compound
@@ -26,25 +100,181 @@ def get_distilbert_sentiment(text: str) -> Tuple[str, float]:
     """Compute DistilBERT sentiment label and score."""
     if not isinstance(text, str) or not text.strip():
         return "neutral", 0.0
-    result = pipe(text, truncation=True, max_length=512)[0]
+    with metrics.timer("inference_seconds", model=MODEL_NAME, backend=INFERENCE_CONFIG["backend"]):
+        result = models.get("distilbert")(text, truncation=True, max_length=INFERENCE_CONFIG["max_length"])[0]
     label = result["label"].lower()
     score = result["score"]
     return label, score
 
-def analyze_sentiment(df: pd.DataFrame, text_column: str = "review") -> pd.DataFrame:
-    """Apply VADER and DistilBERT sentiment analysis to DataFrame."""
-    df = df.copy()
-    df[["vader_label", "vader_score"]] = df[text_column].apply(
-        lambda x: pd.Series(get_vader_sentiment(x))
+def iter_distilbert_sentiment(
+    texts: Sequence,
+    batch_size: Optional[int] = None,
+    max_length: Optional[int] = None,
+) -> Iterator[Tuple[List[int], List[Tuple[str, float]]]]:
+    """Yield (positions, results) per DistilBERT batch, shortest texts first.
+
+    Texts are sorted by tokenized length (the pipe's tokenizer, when it has
+    one) so each batch pads to a similar sequence length.
+    Empty or non-string texts are yielded first as ("neutral", 0.0) without
+    touching the model, matching get_distilbert_sentiment.
+    """
+    batch_size = batch_size or INFERENCE_CONFIG["batch_size"]
+    max_length = max_length or INFERENCE_CONFIG["max_length"]
+    valid = [i for i, text in enumerate(texts) if isinstance(text, str) and text.strip()]
+    skipped = sorted(set(range(len(texts))) - set(valid))
+    if skipped:
+        yield skipped, [("neutral", 0.0)] * len(skipped)
+
+    if valid:
+        tokenizer = getattr(models.get("distilbert"), "tokenizer", None)
+        lengths = token_lengths([texts[i] for i in valid], tokenizer, max_length)
+        valid = [valid[j] for j in sorted(range(len(valid)), key=lengths.__getitem__)]
+    for start in range(0, len(valid), batch_size):
+        positions = valid[start:start + batch_size]
+        batch = [texts[i] for i in positions]
+        with metrics.timer("inference_batch_seconds", model=MODEL_NAME, backend=INFERENCE_CONFIG["backend"]):
+            results = models.get("distilbert")(batch, batch_size=len(batch), truncation=True, max_length=max_length)
+        yield positions, [(r["label"].lower(), r["score"]) for r in results]
+
+def get_distilbert_sentiment_batch(
+    texts: Iterable,
+    batch_size: Optional[int] = None,
+    max_length: Optional[int] = None,
+) -> List[Tuple[str, float]]:
+    """Compute DistilBERT sentiment for many texts with length-sorted batching."""
+    texts = list(texts)
+    output: List[Tuple[str, float]] = [("neutral", 0.0)] * len(texts)
+    for positions, results in iter_distilbert_sentiment(texts, batch_size, max_length):
+        for position, result in zip(positions, results):
+            output[position] = result
+    return output
+
+def vader_label_codes(compounds: np.ndarray) -> np.ndarray:
+    """Map compound scores to VADER_LABELS codes with the usual +/-0.05 thresholds."""
+    codes = np.full(len(compounds), VADER_NEUTRAL, dtype=np.int8)
+    codes[compounds >= 0.05] = VADER_POSITIVE
+    codes[compounds <= -0.05] = VADER_NEGATIVE
+    return codes
+
+def _vader_compounds(texts: List[str]) -> np.ndarray:
+    """Compound scores for non-empty texts; in a pool worker this uses the worker's own analyzer."""
+    analyzer = models.get("vader")
+    return np.fromiter((analyzer.polarity_scores(text)["compound"] for text in texts), dtype=float, count=len(texts))
+
+# VADER worker pools by size, kept for the life of the process and shut down at exit
+_vader_pools: Dict[int, ProcessPoolExecutor] = {}
+_vader_pools_lock = threading.Lock()
+
+def _vader_pool(n_process: int) -> ProcessPoolExecutor:
+    """Worker pool kept for the life of the process, so streaming chunks do not pay worker start-up."""
+    with _vader_pools_lock:
+        if n_process not in _vader_pools:
+            # spawn keeps workers shared-nothing: no inherited torch threads, locks or loaded models
+            _vader_pools[n_process] = ProcessPoolExecutor(n_process, mp_context=multiprocessing.get_context("spawn"))
+        return _vader_pools[n_process]
+
+@atexit.register
+def shutdown_vader_pools():
+    """Stop the VADER worker processes; the next parallel score_vader call starts new ones."""
+    with _vader_pools_lock:
+        pools = list(_vader_pools.values())
+        _vader_pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+def score_vader(
+    texts: Iterable,
+    n_process: int = 1,
+    chunk_size: int = 10_000,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Score many texts with VADER, returning (compound scores, VADER_LABELS codes) arrays.
+
+    Each distinct text is scored once. With n_process > 1 and more than
+    chunk_size distinct texts, chunks are spread over a pool of worker
+    processes, each with its own SentimentIntensityAnalyzer. Empty or
+    non-string texts score 0.0 / neutral, like get_vader_sentiment.
+    """
+    texts = pd.Series(list(texts), dtype=object)
+    compounds = np.zeros(len(texts), dtype=float)
+    valid = texts.map(lambda text: isinstance(text, str) and bool(text.strip())).to_numpy(dtype=bool)
+    codes, unique_texts = pd.factorize(texts[valid])
+    unique_texts = unique_texts.tolist()
+
+    if n_process > 1 and len(unique_texts) > chunk_size:
+        chunks = [unique_texts[start:start + chunk_size] for start in range(0, len(unique_texts), chunk_size)]
+        unique_compounds = np.concatenate(list(_vader_pool(n_process).map(_vader_compounds, chunks)))
+    else:
+        unique_compounds = _vader_compounds(unique_texts)
+    compounds[valid] = unique_compounds[codes]
+    return compounds, vader_label_codes(compounds)
+
+def iter_vader_sentiment(texts: Sequence, n_process: int = 1) -> Iterator[Tuple[List[int], List[Tuple[str, float]]]]:
+    """Yield (positions, results) for VADER in the same shape as iter_distilbert_sentiment."""
+    compounds, codes = score_vader(texts, n_process=n_process)
+    yield list(range(len(texts))), list(zip(VADER_LABELS[codes].tolist(), compounds.tolist()))
+
+def _score_texts(
+    texts: List,
+    score_batches: Callable[[Sequence], Iterator[Tuple[List[int], List[Tuple[str, float]]]]],
+    model: str,
+    revision: str,
+    cache: Optional[SentimentCache] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Score texts into label/score arrays, serving cached results and caching new ones."""
+    with metrics.stage("sentiment", rows_in=len(texts), model=model):
+        labels = np.full(len(texts), "neutral", dtype=object)
+        scores = np.zeros(len(texts), dtype=float)
+        pending = [i for i, text in enumerate(texts) if isinstance(text, str) and text.strip()]
+
+        if cache is not None and pending:
+            cached = cache.lookup([texts[i] for i in pending], model, revision)
+            for position, result in zip(pending, cached):
+                if result is not None:
+                    labels[position], scores[position] = result
+            pending = [position for position, result in zip(pending, cached) if result is None]
+
+        pending_texts = [texts[i] for i in pending]
+        for batch_positions, results in score_batches(pending_texts):
+            positions = [pending[i] for i in batch_positions]
+            labels[positions] = [label for label, _ in results]
+            scores[positions] = [score for _, score in results]
+            if cache is not None:
+                cache.store([pending_texts[i] for i in batch_positions], results, model, revision)
+    return labels, scores
+
+def analyze_sentiment(
+    df: pd.DataFrame,
+    text_column: str = "review",
+    batch_size: Optional[int] = None,
+    max_length: Optional[int] = None,
+    cache: Optional[SentimentCache] = None,
+    n_process: int = 1,
+    copy: bool = True,
+) -> pd.DataFrame:
+    """Apply VADER and DistilBERT sentiment analysis to DataFrame.
+
+    When a SentimentCache is given, only texts missing from it are scored and
+    the new results are written back. n_process > 1 spreads VADER over worker
+    processes. copy=False adds columns to df in place.
+    """
+    if copy:
+        df = df.copy()
+    texts = df[text_column].tolist()
+    df["vader_label"], df["vader_score"] = _score_texts(
+        texts, lambda batch: iter_vader_sentiment(batch, n_process), VADER_MODEL_NAME, VADER_REVISION, cache
     )
-    df[["distilbert_label", "distilbert_score"]] = df[text_column].apply(
-        lambda x: pd.Series(get_distilbert_sentiment(x))
+    df["distilbert_label"], df["distilbert_score"] = _score_texts(
+        texts,
+        lambda batch: iter_distilbert_sentiment(batch, batch_size, max_length),
+        MODEL_NAME,
+        cache_revision(INFERENCE_CONFIG["backend"], INFERENCE_CONFIG["model_dir"]),
+        cache,
     )
     return df
 
 def aggregate_sentiment(df: pd.DataFrame) -> pd.DataFrame:
     """Aggregate sentiment by bank and rating."""
-    return df.groupby(["bank", "rating"]).agg({
+    return df.groupby(["bank", "rating"], observed=True).agg({
         "vader_label": lambda x: x.value_counts().to_dict(),
         "distilbert_label": lambda x: x.value_counts().to_dict(),
         "vader_score": ["mean", "count"],
@@ -52,14 +282,18 @@ def aggregate_sentiment(df: pd.DataFrame) -> pd.DataFrame:
     }).reset_index()
 
 if __name__ == "__main__":
-    input_csv = "data/processed/preprocessed_reviews.csv"
-    output_reviews_csv = "data/processed/sentiment_reviews.csv"
+    input_path = "data/processed/preprocessed_reviews.parquet"
+    output_reviews_path = "data/processed/sentiment_reviews.parquet"
     output_aggregates_csv = "data/processed/sentiment_aggregates.csv"
-    df = pd.read_csv(input_csv)  # Full data
-    # df = pd.read_csv(input_csv).head(400)  # Uncomment for testing
-    df = analyze_sentiment(df)
-    df.to_csv(output_reviews_csv, index=False)
-    print(f"Saved sentiment analysis for banks: {df['bank'].unique().tolist()} to {output_reviews_csv}")
+    df = read_reviews(input_path)  # Full data
+    # df = read_reviews(input_path).head(400)  # Uncomment for testing
+    cache = SentimentCache()
+    df = analyze_sentiment(df, cache=cache)
+    print(f"Sentiment cache: {cache.stats()}")
+    cache.close()
+    write_reviews(df, output_reviews_path)
+    print(f"Saved sentiment analysis for banks: {df['bank'].unique().tolist()} to {output_reviews_path}")
     aggregates = aggregate_sentiment(df)
     aggregates.to_csv(output_aggregates_csv, index=False)
-    print(f"Saved sentiment aggregates to {output_aggregates_csv}")
\ No newline at end of file
+    print(f"Saved sentiment aggregates to {output_aggregates_csv}")
+    metrics.export("sentiment_analysis")
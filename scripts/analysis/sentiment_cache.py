@@ -0,0 +1,141 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import hashlib
+import sqlite3
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Tuple
+from scripts.common.metrics import metrics
+
+DEFAULT_CACHE_PATH = "data/cache/sentiment_cache.sqlite"
+
+# SQLite caps the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+def normalize_text(text: str) -> str:
+    """Normalize unicode form and whitespace so trivial edits share a cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def cache_key(text: str, model: str, revision: str) -> bytes:
+    """Hash (normalized text, model name, model revision) into a fixed-size key."""
+    payload = "\x1f".join([model, revision, normalize_text(text)])
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+class SentimentCache:
+    """Disk-backed, size-bounded LRU cache of sentiment results in SQLite.
+
+    Entries are keyed by cache_key(), so a review is only re-scored when its
+    text, the model or the model revision changes. Once the cache holds more
+    than max_entries rows, the least recently used ones are evicted.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 2_000_000):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS sentiment_cache (
+                key BLOB PRIMARY KEY,
+                label TEXT NOT NULL,
+                score REAL NOT NULL,
+                last_used INTEGER NOT NULL
+            )
+        """)
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sentiment_cache_last_used ON sentiment_cache (last_used)"
+        )
+        self.connection.commit()
+        # Upper bound on the row count, so store() only runs COUNT(*) when eviction may be due
+        (self._entries_bound,) = self.connection.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()
+        # Logical clock for LRU order; survives restarts and never ties like wall time can
+        (self._clock,) = self.connection.execute(
+            "SELECT COALESCE(MAX(last_used), 0) FROM sentiment_cache"
+        ).fetchone()
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def lookup(self, texts: Sequence[str], model: str, revision: str) -> List[Optional[Tuple[str, float]]]:
+        """Return cached (label, score) per text, or None where the text is not cached."""
+        keys = [cache_key(text, model, revision) for text in texts]
+        found: Dict[bytes, Tuple[str, float]] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), _LOOKUP_CHUNK):
+            chunk = unique_keys[start:start + _LOOKUP_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = self.connection.execute(
+                f"SELECT key, label, score FROM sentiment_cache WHERE key IN ({placeholders})",
+                chunk,
+            ).fetchall()
+            found.update({row[0]: (row[1], row[2]) for row in rows})
+
+        if found:
+            now = self._tick()
+            self.connection.executemany(
+                "UPDATE sentiment_cache SET last_used = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+            self.connection.commit()
+
+        results = [found.get(key) for key in keys]
+        hits = sum(result is not None for result in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+        metrics.increment("sentiment_cache_hits_total", hits, model=model)
+        metrics.increment("sentiment_cache_misses_total", len(results) - hits, model=model)
+        return results
+
+    def store(self, texts: Sequence[str], results: Sequence[Tuple[str, float]], model: str, revision: str):
+        """Insert or refresh results for texts, then evict down to max_entries."""
+        now = self._tick()
+        rows = [
+            (cache_key(text, model, revision), label, float(score), now)
+            for text, (label, score) in zip(texts, results)
+        ]
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO sentiment_cache (key, label, score, last_used) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        self._entries_bound += len(rows)
+        if self._entries_bound > self.max_entries:
+            self.evict()
+        self.connection.commit()
+
+    def evict(self) -> int:
+        """Drop least recently used entries beyond max_entries, returning the number removed."""
+        (count,) = self.connection.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()
+        excess = count - self.max_entries
+        self._entries_bound = min(count, self.max_entries)
+        if excess <= 0:
+            return 0
+        self.connection.execute(
+            """
+            DELETE FROM sentiment_cache WHERE key IN (
+                SELECT key FROM sentiment_cache ORDER BY last_used ASC LIMIT ?
+            )
+            """,
+            (excess,),
+        )
+        return excess
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the current number of cached entries."""
+        (entries,) = self.connection.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+        }
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        self.connection.close()
@@ -2,10 +2,12 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
+import re
+import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from typing import List, Dict
-from scripts.analysis.preprocess_nlp import preprocess_reviews
+from typing import Dict, Iterable, List, Optional
+from scripts.common.metrics import metrics
+from scripts.common.storage import read_reviews, write_reviews
 
 themes: Dict[str, List[Dict[str, str]]] = {
     "Commercial Bank of Ethiopia": [
@@ -25,36 +27,112 @@ themes: Dict[str, List[Dict[str, str]]] = {
     ]
 }
 
+def _trie_pattern(node: dict) -> str:
+    """Render a character trie as a regex whose size grows with shared prefixes, not keyword count."""
+    optional = "" in node
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if optional:
+        return ("(?:" + body + ")?") if len(branches) == 1 and len(body) > 1 else body + "?"
+    return body
+
+def keyword_pattern(keywords: Iterable[str], word_boundary: bool = False) -> "re.Pattern":
+    """Compile keywords into one prefix-factored regex, optionally anchored on word boundaries."""
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    if not trie:
+        return re.compile(r"(?!)")  # no keywords: never match
+    pattern = _trie_pattern(trie)
+    if word_boundary:
+        pattern = rf"\b(?:{pattern})\b"
+    return re.compile(pattern)
+
+class ThemeIndex:
+    """Per-bank theme patterns compiled once from a themes dict and applied to whole columns.
+
+    With word_boundary=False a keyword matches anywhere in the lowercased text,
+    exactly like the original substring scan; with word_boundary=True it must
+    match a whole word.
+    """
+
+    def __init__(self, themes_by_bank: Dict[str, List[Dict[str, str]]], word_boundary: bool = False):
+        self.word_boundary = word_boundary
+        self.patterns = {
+            bank: [(theme["name"], keyword_pattern(theme["keywords"], word_boundary)) for theme in bank_themes]
+            for bank, bank_themes in themes_by_bank.items()
+        }
+
+    def match_text(self, text: str, bank: str) -> List[str]:
+        """Themes for a single review, using the same rules as match_column."""
+        if not isinstance(text, str) or not text.strip():
+            return []
+        lowered = text.lower()
+        assigned = [name for name, pattern in self.patterns.get(bank, []) if pattern.search(lowered)]
+        return assigned if assigned else ["General"]
+
+    def match_column(self, texts: pd.Series, banks: pd.Series) -> List[List[str]]:
+        """Themes for every review, running each bank's theme patterns over its reviews in bulk."""
+        texts = texts.reset_index(drop=True)
+        banks = banks.reset_index(drop=True)
+        valid = texts.map(lambda text: isinstance(text, str) and bool(text.strip())).to_numpy(dtype=bool)
+        results: List[List[str]] = [["General"] if is_valid else [] for is_valid in valid]
+
+        lowered = texts[valid].str.lower()
+        for bank, group in lowered.groupby(banks[valid], sort=False, observed=True):
+            bank_patterns = self.patterns.get(bank, [])
+            if not bank_patterns:
+                continue
+            names = np.array([name for name, _ in bank_patterns], dtype=object)
+            hits = np.column_stack([
+                group.str.contains(pattern, regex=True).to_numpy(dtype=bool)
+                for _, pattern in bank_patterns
+            ])
+            for position, row in zip(group.index, hits):
+                if row.any():
+                    results[position] = names[row].tolist()
+        return results
+
+theme_index = ThemeIndex(themes)
+
 def assign_themes(text: str, bank: str) -> List[str]:
     """Assign themes based on keywords for a specific bank."""
-    if not isinstance(text, str) or not text.strip():
-        return []
-    assigned_themes = []
-    bank_themes = themes.get(bank, [])
-    for theme in bank_themes:
-        if any(keyword in text.lower() for keyword in theme["keywords"]):
-            assigned_themes.append(theme["name"])
-    return assigned_themes if assigned_themes else ["General"]
-
-def thematic_analysis(df: pd.DataFrame, text_column: str = "review") -> pd.DataFrame:
-    """Apply thematic analysis to DataFrame."""
-    df = df.copy()
-    df["themes"] = df.apply(lambda x: assign_themes(x[text_column], x["bank"]), axis=1)
+    return theme_index.match_text(text, bank)
+
+def thematic_analysis(
+    df: pd.DataFrame,
+    text_column: str = "review",
+    word_boundary: bool = False,
+    index: Optional[ThemeIndex] = None,
+    copy: bool = True,
+) -> pd.DataFrame:
+    """Apply thematic analysis to DataFrame; copy=False adds the themes column in place."""
+    if copy:
+        df = df.copy()
+    index = index or ThemeIndex(themes, word_boundary=word_boundary)
+    with metrics.stage("themes", rows_in=len(df)):
+        df["themes"] = index.match_column(df[text_column], df["bank"])
     return df
 
 def aggregate_themes(df: pd.DataFrame) -> pd.DataFrame:
     """Aggregate themes by bank."""
     exploded = df.explode("themes")
-    return exploded.groupby(["bank", "themes"]).size().reset_index(name="count")
+    return exploded.groupby(["bank", "themes"], observed=True).size().reset_index(name="count")
 
 if __name__ == "__main__":
-    input_csv = "data/processed/sentiment_reviews.csv"
-    output_csv = "data/processed/thematic_reviews.csv"
-    df = pd.read_csv(input_csv)  # Full data
-    # df = pd.read_csv(input_csv).head(400)  # Uncomment for testing
+    input_path = "data/processed/sentiment_reviews.parquet"
+    output_path = "data/processed/thematic_reviews.parquet"
+    df = read_reviews(input_path)  # Full data
+    # df = read_reviews(input_path).head(400)  # Uncomment for testing
     df = thematic_analysis(df)
-    df.to_csv(output_csv, index=False)
-    print(f"Saved thematic analysis for banks: {df['bank'].unique().tolist()} to {output_csv}")
+    write_reviews(df, output_path)
+    print(f"Saved thematic analysis for banks: {df['bank'].unique().tolist()} to {output_path}")
     aggregates = aggregate_themes(df)
     aggregates.to_csv("data/processed/theme_aggregates.csv", index=False)
-    print(f"Saved theme aggregates to data/processed/theme_aggregates.csv")
\ No newline at end of file
+    print(f"Saved theme aggregates to data/processed/theme_aggregates.csv")
+    metrics.export("thematic_analysis")
\ No newline at end of file
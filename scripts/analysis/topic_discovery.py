@@ -0,0 +1,213 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import argparse
+import math
+import pickle
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from scripts.common.metrics import metrics
+from scripts.common.storage import from_arrow, iter_reviews
+from scripts.common.hashing import SeenHashes, review_hashes
+
+N_TOPICS = 12
+N_FEATURES = 2 ** 18  # hashed token space; collisions are rare at this size for review vocabularies
+FIT_BATCH = 4096  # reviews per k-means update
+TOPIC_STATE = "data/processed/topic_model.pkl"
+TOPIC_TERMS_CSV = "data/processed/topic_terms.csv"
+
+def _identity(tokens: List[str]) -> List[str]:
+    return tokens
+
+def _token_lists(values: pd.Series) -> List[List[str]]:
+    return [list(tokens) if isinstance(tokens, (list, tuple, np.ndarray)) else [] for tokens in values]
+
+class TopicModel:
+    """Topics discovered by online k-means over hashed review tokens, updated from new reviews only.
+
+    Token lists are hashed into a fixed feature space, so there is no
+    vocabulary to refit. Each partial_fit moves the cluster centres using
+    reviews not seen before. It also adds their terms to running per-bank
+    document counts. top_terms ranks each topic's terms from those counts.
+    Before the first fit, reviews are held back until there are at least
+    n_topics of them.
+
+    Reviews are new when dated after the watermark (the latest review date
+    folded in), or on that date and not among its recorded hashes. Only the
+    latest date's hashes are kept once the model is saved, so the state
+    stays small; reviews that arrive dated before the watermark are ignored.
+    """
+
+    def __init__(self, n_topics: int = N_TOPICS, n_features: int = N_FEATURES, seed: int = 0):
+        self.n_topics = n_topics
+        self.n_features = n_features
+        self.seed = seed
+        self.kmeans = None
+        self.watermark: Optional[pd.Timestamp] = None  # latest review date folded in as of the last save
+        self.seen = SeenHashes(None)  # hashes of reviews folded in dated on or after the watermark
+        self.latest: Optional[pd.Timestamp] = None  # latest review date folded in so far
+        self.latest_hashes: Set[int] = set()  # hashes of the reviews folded in dated on latest
+        self.pending: List[Tuple[str, List[str]]] = []
+        self.reviews: Counter = Counter()  # bank -> reviews fitted
+        self.doc_freq: Dict[str, Counter] = {}  # bank -> term -> reviews containing it
+        self.topic_reviews: Counter = Counter()  # (bank, topic) -> reviews
+        self.topic_freq: Dict[Tuple[str, int], Counter] = {}  # (bank, topic) -> term -> reviews containing it
+
+    def _vectorize(self, token_lists: List[List[str]]):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        vectorizer = HashingVectorizer(n_features=self.n_features, analyzer=_identity, alternate_sign=False)
+        return vectorizer.transform(token_lists)
+
+    def partial_fit(self, df: pd.DataFrame) -> int:
+        """Update topics from reviews (bank, review, date, tokens) not seen before; returns reviews fitted."""
+        dates = pd.to_datetime(df["date"], format="ISO8601").dt.normalize()
+        if self.watermark is not None:
+            keep = (dates >= self.watermark).to_numpy()  # earlier reviews were folded in by earlier runs
+            df, dates = df[keep], dates[keep]
+        hashes = review_hashes(df.assign(date=dates.dt.strftime("%Y-%m-%d")))
+        new = self.seen.add_new(hashes)
+        latest = dates[new].max()
+        if pd.notna(latest):
+            if self.latest is None or latest > self.latest:
+                self.latest, self.latest_hashes = latest, set()
+            self.latest_hashes.update(hashes[new & (dates == self.latest).to_numpy()].tolist())
+        rows = self.pending + [
+            (bank, tokens)
+            for bank, tokens in zip(df["bank"].astype(str)[new], _token_lists(df["tokens"][new]))
+            if tokens
+        ]
+        if self.kmeans is None and len(rows) < self.n_topics:
+            self.pending = rows
+            return 0
+        self.pending = []
+        if self.kmeans is None:
+            from sklearn.cluster import MiniBatchKMeans
+            self.kmeans = MiniBatchKMeans(n_clusters=self.n_topics, random_state=self.seed)
+
+        vectors = self._vectorize([tokens for _, tokens in rows])
+        for start in range(0, len(rows), FIT_BATCH):
+            self.kmeans.partial_fit(vectors[start:start + FIT_BATCH])
+        topics = self.kmeans.predict(vectors)
+
+        for (bank, tokens), topic in zip(rows, topics.tolist()):
+            terms = set(tokens)
+            self.reviews[bank] += 1
+            self.doc_freq.setdefault(bank, Counter()).update(terms)
+            self.topic_reviews[(bank, topic)] += 1
+            self.topic_freq.setdefault((bank, topic), Counter()).update(terms)
+        return len(rows)
+
+    def predict(self, tokens: pd.Series) -> np.ndarray:
+        """Topic of each token list; -1 for empty lists or before the first fit."""
+        token_lists = _token_lists(tokens)
+        topics = np.full(len(token_lists), -1, dtype=np.int16)
+        valid = np.array([bool(tokens) for tokens in token_lists], dtype=bool)
+        if self.kmeans is not None and valid.any():
+            topics[valid] = self.kmeans.predict(self._vectorize([t for t in token_lists if t]))
+        return topics
+
+    def top_terms(self, n_terms: int = 10) -> pd.DataFrame:
+        """Per bank and topic: reviews, share of the bank's reviews and the most distinctive terms.
+
+        Terms are ranked by reviews in the topic containing them, weighted by
+        their inverse document frequency within the bank, so words common to
+        every topic ("app", "bank") do not crowd out the ones that tell topics apart.
+        """
+        rows = []
+        for (bank, topic), counts in self.topic_freq.items():
+            n_reviews = self.reviews[bank]
+            doc_freq = self.doc_freq[bank]
+            scores = {
+                term: count * math.log((1 + n_reviews) / (1 + doc_freq[term]))
+                for term, count in counts.items()
+            }
+            terms = sorted(scores, key=lambda term: (-scores[term], term))[:n_terms]
+            rows.append({
+                "bank": bank,
+                "topic": topic,
+                "reviews": self.topic_reviews[(bank, topic)],
+                "share": round(self.topic_reviews[(bank, topic)] / n_reviews, 4),
+                "terms": terms,
+            })
+        columns = ["bank", "topic", "reviews", "share", "terms"]
+        if not rows:
+            return pd.DataFrame(columns=columns)
+        return pd.DataFrame(rows, columns=columns).sort_values(["bank", "reviews"], ascending=[True, False], ignore_index=True)
+
+    def save(self, path: str = TOPIC_STATE):
+        """Advance the watermark to the latest review date folded in and write the state to path."""
+        if self.latest is not None:
+            self.watermark = self.latest
+            self.seen = SeenHashes(None)
+            self.seen.add_new(np.fromiter(self.latest_hashes, dtype=np.uint64, count=len(self.latest_hashes)))
+            self.seen.save()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(f"{path}.tmp", "wb") as f:
+            pickle.dump(vars(self), f)  # attributes only, so a state saved by the CLI loads anywhere
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path: str = TOPIC_STATE, **kwargs) -> "TopicModel":
+        """The model saved at path, or a new one built with kwargs if there is none.
+
+        A state saved before the watermark existed holds every review's hash
+        and is not loaded; the model is refitted from scratch instead.
+        """
+        if not os.path.exists(path):
+            return cls(**kwargs)
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if "watermark" not in state:
+            return cls(**kwargs)
+        model = cls.__new__(cls)
+        vars(model).update(state)
+        return model
+
+def update_topics(
+    input_path: str = "data/processed/preprocessed_reviews.parquet",
+    state_path: str = TOPIC_STATE,
+    terms_csv: Optional[str] = TOPIC_TERMS_CSV,
+    chunk_size: int = 50_000,
+    n_topics: int = N_TOPICS,
+) -> TopicModel:
+    """Fold reviews not seen by earlier runs into the saved topic model and report top terms per bank.
+
+    Only rows dated on or after the model's watermark are read from a Parquet
+    input; row groups whose date statistics lie entirely before it are skipped.
+    """
+    model = TopicModel.load(state_path, n_topics=n_topics)
+    columns = ["bank", "review", "date", "tokens"]
+    if input_path.endswith(".csv") or model.watermark is None:
+        chunks = iter_reviews(input_path, chunk_size=chunk_size, columns=columns)
+    else:
+        dataset = ds.dataset(input_path, format="parquet")
+        since = ds.field("date") >= pa.scalar(model.watermark.date(), pa.date32()).cast(dataset.schema.field("date").type)
+        chunks = (from_arrow(pa.Table.from_batches([batch]))
+                  for batch in dataset.to_batches(columns=columns, filter=since, batch_size=chunk_size) if batch.num_rows)
+    with metrics.stage("topics") as stage:
+        stage.rows_in = stage.rows_out = 0
+        for chunk in chunks:
+            stage.rows_in += len(chunk)
+            stage.rows_out += model.partial_fit(chunk)
+    model.save(state_path)
+    if terms_csv:
+        terms = model.top_terms()
+        terms.assign(terms=terms["terms"].str.join(" ")).to_csv(terms_csv, index=False)
+    return model
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update discovered topics from new preprocessed reviews.")
+    parser.add_argument("--input", default="data/processed/preprocessed_reviews.parquet")
+    parser.add_argument("--state", default=TOPIC_STATE)
+    parser.add_argument("--output", default=TOPIC_TERMS_CSV)
+    parser.add_argument("--topics", type=int, default=N_TOPICS, help="Topics for a new model")
+    args = parser.parse_args()
+
+    model = update_topics(args.input, args.state, args.output, n_topics=args.topics)
+    print(f"Topic model is up to date through {model.watermark:%Y-%m-%d}; top terms saved to {args.output}")
+    print(f"Metrics written to {metrics.export('topic_discovery')}")
@@ -0,0 +1,153 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Protocol
+from scripts.common.metrics import metrics
+from scripts.common.rate_limit import RateLimiter
+
+DEFAULT_TRANSLATION_CACHE_PATH = "data/cache/translations.sqlite"
+
+# SQLite caps the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+class Translator(Protocol):
+    """Anything with a deep_translator-style translate(text) method."""
+
+    def translate(self, text: str) -> str:
+        ...
+
+class TranslationCache:
+    """SQLite store of successful translations keyed by (source, target, text)."""
+
+    def __init__(self, path: str = DEFAULT_TRANSLATION_CACHE_PATH, source: str = "am", target: str = "en"):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.source = source
+        self.target = target
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                text TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                PRIMARY KEY (source, target, text)
+            )
+        """)
+        self.connection.commit()
+
+    def lookup(self, texts: List[str]) -> Dict[str, str]:
+        """Return the cached translation for every text that has one."""
+        found: Dict[str, str] = {}
+        for start in range(0, len(texts), _LOOKUP_CHUNK):
+            chunk = texts[start:start + _LOOKUP_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = self.connection.execute(
+                f"SELECT text, translation FROM translations "
+                f"WHERE source = ? AND target = ? AND text IN ({placeholders})",
+                [self.source, self.target, *chunk],
+            ).fetchall()
+            found.update(dict(rows))
+        return found
+
+    def store(self, translations: Dict[str, str]):
+        """Persist successful translations."""
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO translations (source, target, text, translation) VALUES (?, ?, ?, ?)",
+            [(self.source, self.target, text, translation) for text, translation in translations.items()],
+        )
+        self.connection.commit()
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        self.connection.close()
+
+async def _translate_one(
+    text: str,
+    translator: Translator,
+    semaphore: asyncio.Semaphore,
+    limiter: Optional[RateLimiter],
+    retries: int,
+    backoff: float,
+) -> Optional[str]:
+    """Translate one text with bounded concurrency, rate limiting and exponential backoff."""
+    for attempt in range(retries + 1):
+        async with semaphore:
+            if limiter is not None:
+                await limiter.acquire_async()
+            try:
+                metrics.increment("translation_requests_total")
+                with metrics.timer("translation_seconds"):
+                    translation = await asyncio.to_thread(translator.translate, text)
+                if isinstance(translation, str):
+                    return translation
+                error = f"empty result {translation!r}"
+            except Exception as e:
+                error = e
+        if attempt < retries:
+            metrics.increment("translation_retries_total")
+            await asyncio.sleep(backoff * 2 ** attempt)
+    metrics.increment("translation_failures_total")
+    print(f"Translation error after {retries + 1} attempts: {error}")
+    return None
+
+async def _translate_all(
+    texts: List[str],
+    translator: Translator,
+    max_concurrency: int,
+    rate_per_second: Optional[float],
+    retries: int,
+    backoff: float,
+) -> List[Optional[str]]:
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = RateLimiter(rate_per_second) if rate_per_second else None
+    return await asyncio.gather(*(
+        _translate_one(text, translator, semaphore, limiter, retries, backoff) for text in texts
+    ))
+
+def _run(coroutine):
+    """Run a coroutine to completion, even when called from inside a running loop (e.g. Jupyter)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+def translate_texts(
+    texts: Iterable[str],
+    translator: Translator,
+    cache: Optional[TranslationCache] = None,
+    max_concurrency: int = 8,
+    rate_per_second: Optional[float] = 5.0,
+    retries: int = 3,
+    backoff: float = 1.0,
+) -> Dict[str, Optional[str]]:
+    """Translate texts concurrently, returning {text: translation or None on failure}.
+
+    Each distinct text is translated at most once; texts found in cache are
+    not sent to the translator, and new successful translations are stored.
+    """
+    unique_texts = list(dict.fromkeys(texts))
+    results: Dict[str, Optional[str]] = {}
+    if cache is not None:
+        results.update(cache.lookup(unique_texts))
+    pending = [text for text in unique_texts if text not in results]
+    if cache is not None:
+        metrics.increment("translation_cache_hits_total", len(unique_texts) - len(pending))
+        metrics.increment("translation_cache_misses_total", len(pending))
+
+    if pending:
+        translations = _run(_translate_all(
+            pending, translator, max_concurrency, rate_per_second, retries, backoff
+        ))
+        new = {text: translation for text, translation in zip(pending, translations) if translation is not None}
+        if cache is not None and new:
+            cache.store(new)
+        results.update(zip(pending, translations))
+    return results
@@ -2,9 +2,11 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
+import argparse
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from scripts.common.storage import read_reviews
 
 def plot_sentiment_distribution(df: pd.DataFrame):
     """Plot sentiment distribution by bank."""
@@ -25,12 +27,38 @@ def plot_theme_counts(df: pd.DataFrame):
     plt.savefig("figures/theme_counts.png")
     plt.close()
 
+def plot_rating_distribution(df: pd.DataFrame):
+    """Plot star rating distribution by bank."""
+    plt.figure(figsize=(10, 6))
+    sns.countplot(data=df, x="bank", hue="rating")
+    plt.title("Rating Distribution by Bank")
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    plt.savefig("figures/rating_distribution.png")
+    plt.close()
+
 if __name__ == "__main__":
-    sentiment_csv = "data/processed/sentiment_reviews.csv"
+    parser = argparse.ArgumentParser(description="Plot sentiment, theme and rating distributions by bank.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--sqlite", help="Plot ratings from this SQLite reviews database")
+    source.add_argument("--oracle", action="store_true", help="Plot ratings from the Oracle reviews database")
+    parser.add_argument("--bank", nargs="+", help="Banks to plot from the database (default: all)")
+    parser.add_argument("--start", help="First review date to plot from the database (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last review date to plot from the database, inclusive")
+    args = parser.parse_args()
+
+    sentiment_path = "data/processed/sentiment_reviews.parquet"
     theme_csv = "data/processed/theme_aggregates.csv"
-    df_sentiment = pd.read_csv(sentiment_csv)
+    df_sentiment = read_reviews(sentiment_path, columns=["bank", "distilbert_label"])
     df_themes = pd.read_csv(theme_csv)
     print(f"Visualizing data for banks: {df_sentiment['bank'].unique().tolist()}")
     plot_sentiment_distribution(df_sentiment)
     plot_theme_counts(df_themes)
+    if args.sqlite or args.oracle:
+        # The reviews table has ratings but no sentiment labels or themes, so only ratings come from it
+        from scripts.database.reader import ReviewReader
+        reader = ReviewReader.sqlite(args.sqlite) if args.sqlite else ReviewReader.oracle()
+        plot_rating_distribution(reader.read_reviews(banks=args.bank, start=args.start, end=args.end,
+                                                     columns=["bank", "rating"]))
+        reader.close()
     print("Saved plots to figures/")
\ No newline at end of file
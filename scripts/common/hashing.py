@@ -0,0 +1,40 @@
+import os
+from typing import Optional, Set
+import numpy as np
+import pandas as pd
+
+def review_hashes(df: pd.DataFrame) -> np.ndarray:
+    """64-bit hash of each row's (review, date, bank), stable across runs and processes."""
+    return pd.util.hash_pandas_object(df[["review", "date", "bank"]], index=False).to_numpy()
+
+class SeenHashes:
+    """Hashes of reviews already processed, kept as one sorted uint64 array (8 bytes per review).
+
+    Hashes first seen in this run are held in a set and merged into the
+    sorted array once, by save(), rather than once per chunk.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.hashes = np.load(path) if path and os.path.exists(path) else np.empty(0, dtype=np.uint64)
+        self._new: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.hashes) + len(self._new)
+
+    def add_new(self, hashes: np.ndarray) -> np.ndarray:
+        """Mask of hashes seen neither before nor earlier in this array; those are then marked seen."""
+        positions = np.minimum(np.searchsorted(self.hashes, hashes), max(len(self.hashes) - 1, 0))
+        known = self.hashes[positions] == hashes if len(self.hashes) else np.zeros(len(hashes), dtype=bool)
+        new = ~pd.Series(hashes).duplicated().to_numpy() & ~known
+        if self._new:
+            new &= ~pd.Series(hashes).isin(self._new).to_numpy()
+        self._new.update(hashes[new].tolist())
+        return new
+
+    def save(self):
+        self.hashes = np.union1d(self.hashes, np.fromiter(self._new, dtype=np.uint64, count=len(self._new)))
+        self._new.clear()
+        if self.path:
+            np.save(f"{self.path}.tmp.npy", self.hashes)
+            os.replace(f"{self.path}.tmp.npy", self.path)
@@ -0,0 +1,376 @@
+import cProfile
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+# A stage, counter or latency series is identified by its name plus sorted label pairs
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+Profiler = Callable[[str], ContextManager[None]]
+
+PERCENTILES = (50, 90, 99)
+PROFILE_ENV = "PIPELINE_PROFILE"  # "cprofile" or "py-spy"
+PROFILE_DIR_ENV = "PIPELINE_PROFILE_DIR"
+METRICS_DIR_ENV = "PIPELINE_METRICS_DIR"
+METRICS_PROMETHEUS_DIR_ENV = "PIPELINE_METRICS_PROM_DIR"  # e.g. node_exporter's textfile collector directory
+DEFAULT_METRICS_DIR = "data/processed/metrics"
+CLEAR_REFS = "/proc/self/clear_refs"  # writing "5" restarts the RSS high-water mark (Linux)
+PROC_STATUS = "/proc/self/status"
+
+# Process peak RSS (MiB) from before the kernel's high-water mark was last reset
+_rss_floor_mb = 0.0
+
+def _key(name: str, labels: Dict[str, object]) -> Key:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+def _os_peak_rss_mb() -> Optional[float]:
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+    try:
+        import psutil
+    except ImportError:
+        return None
+    memory = psutil.Process().memory_info()
+    return getattr(memory, "peak_wset", memory.rss) / (1024 * 1024)  # peak working set on Windows
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MiB; None where it cannot be read."""
+    readings = [peak for peak in (_os_peak_rss_mb(), high_water_rss_mb()) if peak is not None]
+    return max(readings + [_rss_floor_mb]) if readings else None
+
+def high_water_rss_mb() -> Optional[float]:
+    """Peak RSS since the last reset_peak_rss(), in MiB; None where /proc is not available."""
+    try:
+        with open(PROC_STATUS) as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def reset_peak_rss() -> bool:
+    """Restart the kernel's RSS high-water mark at the current RSS; False where that is not supported.
+
+    The peak so far is remembered, so peak_rss_mb() still covers the whole process.
+    """
+    global _rss_floor_mb
+    before = peak_rss_mb()
+    try:
+        with open(CLEAR_REFS, "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    _rss_floor_mb = max(_rss_floor_mb, before or 0.0)
+    return True
+
+@dataclass
+class StageRun:
+    """Handle yielded by Metrics.stage; set rows_out once the stage knows it."""
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+
+@dataclass
+class StageStats:
+    """Totals over every run of a stage. CPU time is process-wide, so it overlaps for concurrent stages.
+
+    peak_rss_mb is the highest RSS reached during any run (None where it cannot be measured).
+    """
+    calls: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    rows_in: int = 0
+    rows_out: int = 0
+    peak_rss_mb: Optional[float] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "wall_seconds": round(self.wall_seconds, 6),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rows_per_sec": round(self.rows_out / self.wall_seconds, 2) if self.wall_seconds > 0 else None,
+            "peak_rss_mb": None if self.peak_rss_mb is None else round(self.peak_rss_mb, 2),
+        }
+
+class Reservoir:
+    """Fixed-size uniform sample of observations, so percentiles stay cheap on long runs."""
+
+    def __init__(self, size: int = 10_000, seed: int = 0):
+        self.size = size
+        self.count = 0
+        self.total = 0.0
+        self.samples: List[float] = []
+        self._random = random.Random(seed)
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if len(self.samples) < self.size:
+            self.samples.append(value)
+            return
+        slot = self._random.randrange(self.count)
+        if slot < self.size:
+            self.samples[slot] = value
+
+    def summary(self) -> dict:
+        summary = {"count": self.count, "sum": round(self.total, 6)}
+        if self.samples:
+            values = np.percentile(self.samples, PERCENTILES)
+            summary.update({f"p{p}": round(float(v), 6) for p, v in zip(PERCENTILES, values)})
+        return summary
+
+def cprofile_hook(directory: str) -> Profiler:
+    """Profiler that writes one pstats file per stage run to directory (open with snakeviz or pstats)."""
+    counter = iter(range(sys.maxsize))
+
+    @contextmanager
+    def profile(stage: str) -> Iterator[None]:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another stage is already being profiled on a concurrent thread
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            os.makedirs(directory, exist_ok=True)
+            profiler.dump_stats(os.path.join(directory, f"{stage}-{next(counter)}.prof"))
+    return profile
+
+def py_spy_hook(directory: str, executable: str = "py-spy") -> Profiler:
+    """Profiler that attaches py-spy to this process for the stage and writes a speedscope file.
+
+    Sampling happens outside the interpreter, so it also sees native code and
+    worker threads; py-spy must be installed and allowed to ptrace.
+    """
+    counter = iter(range(sys.maxsize))
+
+    @contextmanager
+    def profile(stage: str) -> Iterator[None]:
+        os.makedirs(directory, exist_ok=True)
+        output = os.path.join(directory, f"{stage}-{next(counter)}.speedscope.json")
+        process = subprocess.Popen([
+            executable, "record", "--pid", str(os.getpid()), "--format", "speedscope",
+            "--output", output, "--subprocesses", "--nonblocking",
+        ])
+        try:
+            yield
+        finally:
+            process.send_signal(signal.SIGINT)  # py-spy writes its output on interrupt
+            process.wait()
+    return profile
+
+def profiler_from_env() -> Optional[Profiler]:
+    """Profiler selected by PIPELINE_PROFILE (cprofile or py-spy), writing to PIPELINE_PROFILE_DIR."""
+    kind = os.environ.get(PROFILE_ENV, "").lower()
+    directory = os.environ.get(PROFILE_DIR_ENV, "data/profiles")
+    if kind == "cprofile":
+        return cprofile_hook(directory)
+    if kind == "py-spy":
+        return py_spy_hook(directory)
+    if kind:
+        raise ValueError(f"{PROFILE_ENV} must be 'cprofile' or 'py-spy', got {kind!r}")
+    return None
+
+class Metrics:
+    """Thread-safe collector of stage timings, counters and latency percentiles.
+
+    Stages record wall time, CPU time, rows in/out and their peak RSS;
+    repeated runs of a stage (one per chunk or per app) are summed, and the
+    largest peak is kept. On Linux the RSS high-water mark is reset when a
+    stage starts with no other stage running, so its peak covers only that
+    stage; a stage that starts while another runs reports the peak since the
+    earlier one started, an upper bound. With a profiler every stage run is
+    also profiled. Export with to_json or to_prometheus.
+    """
+
+    def __init__(self, profiler: Optional[Profiler] = None, reservoir_size: int = 10_000):
+        self.profiler = profiler
+        self.reservoir_size = reservoir_size
+        self._lock = threading.Lock()
+        self.stages: Dict[Key, StageStats] = {}
+        self.counters: Dict[Key, float] = {}
+        self.latencies: Dict[Key, Reservoir] = {}
+        self._active = 0
+        self._measured = False  # whether the running stages' high-water mark was reset
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None, **labels) -> Iterator[StageRun]:
+        """Time a block as one run of stage name; rows_out defaults to rows_in."""
+        run = StageRun(rows_in=rows_in)
+        with self._lock:
+            if self._active == 0:
+                self._measured = reset_peak_rss()
+            self._active += 1
+        with ExitStack() as profiling:
+            if self.profiler is not None:
+                profiling.enter_context(self.profiler(name))
+            cpu_start = time.process_time()
+            start = time.perf_counter()
+            try:
+                yield run
+            finally:
+                wall = time.perf_counter() - start
+                cpu = time.process_time() - cpu_start
+                with self._lock:
+                    self._active -= 1
+                    peak = high_water_rss_mb() if self._measured else None
+                    stats = self.stages.setdefault(_key(name, labels), StageStats())
+                    stats.calls += 1
+                    stats.wall_seconds += wall
+                    stats.cpu_seconds += cpu
+                    stats.rows_in += run.rows_in or 0
+                    stats.rows_out += run.rows_out if run.rows_out is not None else run.rows_in or 0
+                    if peak is not None:
+                        stats.peak_rss_mb = max(stats.peak_rss_mb or 0.0, peak)
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """Add value to a counter."""
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record one latency observation."""
+        key = _key(name, labels)
+        with self._lock:
+            reservoir = self.latencies.get(key)
+            if reservoir is None:
+                reservoir = self.latencies[key] = Reservoir(self.reservoir_size)
+            reservoir.add(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Observe the duration of a block as a latency."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def hit_rate(self, hits: str, misses: str, **labels) -> Optional[float]:
+        """hits / (hits + misses) for two counters, or None before any lookup."""
+        with self._lock:
+            hit_count = self.counters.get(_key(hits, labels), 0)
+            miss_count = self.counters.get(_key(misses, labels), 0)
+        total = hit_count + miss_count
+        return hit_count / total if total else None
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.counters.clear()
+            self.latencies.clear()
+
+    def snapshot(self) -> dict:
+        """All metrics as plain dicts: stages (with their peak RSS), counters, latency percentiles and process-wide peak RSS."""
+        def entry(key: Key, values: dict) -> dict:
+            name, labels = key
+            return {"name": name, "labels": dict(labels), **values}
+
+        peak = peak_rss_mb()
+        with self._lock:
+            return {
+                "stages": [entry(key, stats.as_dict()) for key, stats in self.stages.items()],
+                "counters": [entry(key, {"value": value}) for key, value in self.counters.items()],
+                "latencies": [entry(key, reservoir.summary()) for key, reservoir in self.latencies.items()],
+                "process": {"peak_rss_mb": None if peak is None else round(peak, 2)},
+            }
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        """Serialize snapshot() as JSON, writing it to path when given."""
+        text = json.dumps({"created": time.time(), **self.snapshot()}, indent=2)
+        if path:
+            _write(path, text)
+        return text
+
+    def to_prometheus(self, path: Optional[str] = None, prefix: str = "pipeline") -> str:
+        """Render metrics in the Prometheus text exposition format (e.g. for node_exporter's textfile collector)."""
+        snapshot = self.snapshot()
+        lines: List[str] = []
+
+        def family(name: str, kind: str, samples: List[Tuple[dict, float]]):
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples)
+
+        stage_fields = ["calls", "wall_seconds", "cpu_seconds", "rows_in", "rows_out", "peak_rss_mb"]
+        for field in stage_fields:
+            family(f"{prefix}_stage_{field}", "gauge", [
+                ({"stage": stage["name"], **stage["labels"]}, stage[field])
+                for stage in snapshot["stages"] if stage[field] is not None
+            ])
+        if snapshot["process"]["peak_rss_mb"] is not None:
+            family(f"{prefix}_process_peak_rss_mb", "gauge", [({}, snapshot["process"]["peak_rss_mb"])])
+        for name in sorted({counter["name"] for counter in snapshot["counters"]}):
+            family(f"{prefix}_{name}", "counter", [
+                (counter["labels"], counter["value"]) for counter in snapshot["counters"] if counter["name"] == name
+            ])
+        for name in sorted({latency["name"] for latency in snapshot["latencies"]}):
+            metric = f"{prefix}_{name}"
+            lines.append(f"# TYPE {metric} summary")
+            for latency in (item for item in snapshot["latencies"] if item["name"] == name):
+                for p in PERCENTILES:
+                    if f"p{p}" in latency:
+                        quantile = {**latency["labels"], "quantile": str(p / 100)}
+                        lines.append(f"{metric}{_labels(quantile)} {_number(latency[f'p{p}'])}")
+                lines.append(f"{metric}_sum{_labels(latency['labels'])} {_number(latency['sum'])}")
+                lines.append(f"{metric}_count{_labels(latency['labels'])} {_number(latency['count'])}")
+        text = "\n".join(lines) + "\n"
+        if path:
+            _write(path, text)
+        return text
+
+    def export(self, run: str, json_path: Optional[str] = None, prometheus_path: Optional[str] = None) -> str:
+        """Write a script's metrics as <run>.json and, when a Prometheus directory is configured, <run>.prom.
+
+        Directories default to $PIPELINE_METRICS_DIR (else data/processed/metrics)
+        and $PIPELINE_METRICS_PROM_DIR. Returns the JSON path.
+        """
+        json_path = json_path or os.path.join(os.environ.get(METRICS_DIR_ENV, DEFAULT_METRICS_DIR), f"{run}.json")
+        if prometheus_path is None and os.environ.get(METRICS_PROMETHEUS_DIR_ENV):
+            prometheus_path = os.path.join(os.environ[METRICS_PROMETHEUS_DIR_ENV], f"{run}.prom")
+        self.to_json(json_path)
+        if prometheus_path:
+            self.to_prometheus(prometheus_path)
+        return json_path
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in sorted(labels.items())) + "}"
+
+def _number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+def _write(path: str, text: str):
+    """Write atomically so scrapers never read a half-written file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+# Shared collector the pipeline modules record into
+metrics = Metrics(profiler=profiler_from_env())
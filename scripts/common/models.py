@@ -0,0 +1,64 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+from scripts.common.metrics import metrics
+
+class ModelRegistry:
+    """Process-wide store of expensive models, each built on first use and then shared.
+
+    Modules register a factory at import time, which costs nothing; get()
+    builds the model once (concurrent first callers wait for the same load)
+    and every later call returns the same instance. warm_up() loads models
+    ahead of time, in parallel, so a job does not stall on its first review.
+    """
+
+    def __init__(self):
+        self.factories: Dict[str, Callable[[], object]] = {}
+        self.loaded: Dict[str, object] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], object]):
+        """Register (or replace) how to build a model; a replaced model is unloaded."""
+        with self._lock:
+            self.factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+            self.loaded.pop(name, None)
+
+    def get(self, name: str):
+        """The model registered as name, loading it on first use."""
+        try:
+            return self.loaded[name]
+        except KeyError:
+            pass
+        if name not in self.factories:
+            raise KeyError(f"No model registered as {name!r}; known models: {sorted(self.factories)}")
+        with self._locks[name]:
+            if name not in self.loaded:
+                with metrics.stage("model_load", model=name):
+                    self.loaded[name] = self.factories[name]()
+            return self.loaded[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self.loaded
+
+    def unload(self, name: str):
+        """Drop a loaded model so the next get() rebuilds it (e.g. after a config change)."""
+        with self._locks.get(name, self._lock):
+            self.loaded.pop(name, None)
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, max_workers: int = 4) -> Dict[str, float]:
+        """Load models (all registered ones by default) in parallel; returns seconds spent per model."""
+        names = list(self.factories if names is None else names)
+
+        def load(name: str) -> float:
+            start = time.perf_counter()
+            self.get(name)
+            return time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(names)))) as executor:
+            return dict(zip(names, executor.map(load, names)))
+
+# Shared registry; analysis modules register their models here
+models = ModelRegistry()
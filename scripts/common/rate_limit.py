@@ -0,0 +1,37 @@
+import asyncio
+import threading
+import time
+
+class RateLimiter:
+    """Spaces out calls to at most rate_per_second, shared across threads and coroutines.
+
+    Each caller reserves the next free time slot under a lock and then sleeps
+    until it arrives, so concurrent callers never burst past the limit.
+    """
+
+    def __init__(self, rate_per_second: float):
+        if rate_per_second <= 0:
+            raise ValueError(f"rate_per_second must be positive, got {rate_per_second}")
+        self.interval = 1.0 / rate_per_second
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Claim the next slot and return how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+            return slot - now
+
+    def acquire(self):
+        """Block the calling thread until it may make the next call."""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        """Suspend the calling coroutine until it may make the next call."""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
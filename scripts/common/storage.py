@@ -0,0 +1,153 @@
+import ast
+import os
+from typing import Iterator, List, Optional, Sequence
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Arrow types for the columns the pipeline stages share; other columns are inferred
+REVIEW_TYPES = {
+    "bank": pa.dictionary(pa.int32(), pa.string()),
+    "rating": pa.int8(),
+    "date": pa.date32(),
+    "tokens": pa.list_(pa.string()),
+    "themes": pa.list_(pa.string()),
+}
+LIST_COLUMNS = ("tokens", "themes")
+ROW_GROUP_SIZE = 50_000  # fixed-size row groups, so a file rewritten with rows appended keeps its leading groups
+
+def _parse_list(value) -> Optional[List[str]]:
+    """Turn the "['a', 'b']" strings CSV round-trips leave behind back into lists."""
+    if isinstance(value, str):
+        return list(ast.literal_eval(value)) if value.startswith("[") else [value]
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    return list(value)
+
+def normalize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce known review columns to their pipeline dtypes (category bank, int8 rating, dates, lists)."""
+    df = df.copy()
+    if "bank" in df:
+        df["bank"] = df["bank"].astype("category")
+    if "rating" in df and df["rating"].notna().all():
+        df["rating"] = df["rating"].astype("int8")
+    if "date" in df:
+        df["date"] = pd.to_datetime(df["date"], format="ISO8601").dt.normalize()
+    for column in LIST_COLUMNS:
+        if column in df:
+            df[column] = df[column].map(_parse_list)
+    return df
+
+def to_arrow(df: pd.DataFrame) -> pa.Table:
+    """Convert a review DataFrame to an Arrow table using REVIEW_TYPES for known columns."""
+    table = pa.Table.from_pandas(normalize_dtypes(df), preserve_index=False)
+    for i, name in enumerate(table.column_names):
+        arrow_type = REVIEW_TYPES.get(name)
+        if arrow_type is None or table.column(i).type == arrow_type:
+            continue
+        if name == "rating" and not pa.types.is_integer(table.column(i).type):
+            continue  # ratings with gaps stay nullable floats
+        table = table.set_column(i, pa.field(name, arrow_type), table.column(i).cast(arrow_type))
+    return table
+
+def from_arrow(table: pa.Table) -> pd.DataFrame:
+    """Convert an Arrow table to pandas with datetime64 dates and list columns as Python lists."""
+    df = table.to_pandas(date_as_object=False)
+    for column in LIST_COLUMNS:
+        if column in table.column_names:
+            df[column] = table.column(column).to_pylist()
+    return df
+
+def write_reviews(df: pd.DataFrame, path: str):
+    """Write a stage's reviews to Parquet, or to CSV when path ends in .csv."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".csv"):
+        df.to_csv(path, index=False)
+        return
+    pq.write_table(to_arrow(df), path, row_group_size=ROW_GROUP_SIZE)
+
+def read_reviews(path: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Read reviews written by write_reviews, loading only the requested columns.
+
+    CSV inputs are accepted too; their list columns are parsed back into lists
+    and known columns get the same dtypes as Parquet inputs.
+    """
+    if path.endswith(".csv"):
+        header = pd.read_csv(path, nrows=0).columns
+        usecols = None if columns is None else [column for column in columns if column in header]
+        return normalize_dtypes(pd.read_csv(path, usecols=usecols))
+    if columns is not None:
+        available = pq.read_schema(path).names
+        columns = [column for column in columns if column in available]
+    return from_arrow(pq.read_table(path, columns=columns))
+
+def iter_reviews(path: str, chunk_size: int = 10_000, columns: Optional[Sequence[str]] = None) -> Iterator[pd.DataFrame]:
+    """Yield reviews in chunks of at most chunk_size rows without loading the whole file."""
+    if path.endswith(".csv"):
+        header = pd.read_csv(path, nrows=0).columns
+        usecols = None if columns is None else [column for column in columns if column in header]
+        for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunk_size):
+            yield normalize_dtypes(chunk)
+        return
+    parquet_file = pq.ParquetFile(path)
+    if columns is not None:
+        columns = [column for column in columns if column in parquet_file.schema_arrow.names]
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        yield from_arrow(pa.Table.from_batches([batch]))
+
+class ReviewWriter:
+    """Append review chunks to one Parquet file as they are produced.
+
+    The first chunk fixes the schema (all-null columns are typed as strings);
+    later chunks are cast to it so row groups stay consistent. With
+    append=True an existing file keeps its schema and rows: once the first new
+    chunk arrives, its row groups are read back and rewritten into a temporary
+    file that replaces it on close. Parquet files cannot be extended in place,
+    so an append costs a pass over the existing file; a run that writes
+    nothing leaves it untouched.
+    """
+
+    def __init__(self, path: str, append: bool = False):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.rows = 0
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._existing: Optional[str] = path if append and os.path.exists(path) else None
+
+    def _open(self, table: pa.Table):
+        if self._existing is None:
+            schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ])
+            self._writer = pq.ParquetWriter(self.path, schema)
+            return
+        existing = pq.ParquetFile(self._existing)
+        self._writer = pq.ParquetWriter(f"{self.path}.tmp", existing.schema_arrow)
+        for i in range(existing.num_row_groups):
+            self._writer.write_table(existing.read_row_group(i))
+
+    def write(self, df: pd.DataFrame):
+        table = to_arrow(df)
+        if self._writer is None:
+            self._open(table)
+        self._writer.write_table(table.select(self._writer.schema.names).cast(self._writer.schema))
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            if self._existing is not None:
+                os.replace(f"{self.path}.tmp", self.path)
+                self._existing = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is not None and self._existing is not None and self._writer is not None:
+            self._writer.close()  # keep the existing file as it was rather than half-appended
+            self._writer = None
+            os.remove(f"{self.path}.tmp")
+        self.close()
@@ -0,0 +1,459 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import hashlib
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import oracledb
+import pandas as pd
+from scripts.common.metrics import metrics
+
+Connection = Union["oracledb.Connection", sqlite3.Connection]
+
+# Connection defaults shared by the loader and the reader
+ORACLE_USER = os.environ.get("ORACLE_USER", "bank_reviews")
+ORACLE_PASSWORD = os.environ.get("ORACLE_PASSWORD", "Biruk1221")
+ORACLE_DSN = os.environ.get("ORACLE_DSN", "localhost:1521/XEPDB1")
+
+# SQLite stand-in for the Oracle schema; constraints mirror create_tables.sql so bad rows fail the same way
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS banks (
+    bank_id INTEGER PRIMARY KEY,
+    bank_name TEXT NOT NULL UNIQUE,
+    created_date TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    review_id INTEGER PRIMARY KEY,
+    bank_id INTEGER NOT NULL REFERENCES banks(bank_id),
+    review_text TEXT CHECK (length(review_text) <= 1000),
+    rating INTEGER CHECK (rating BETWEEN 1 AND 5),
+    review_date TEXT,
+    created_date TEXT DEFAULT CURRENT_TIMESTAMP,
+    review_fingerprint TEXT
+);
+CREATE TABLE IF NOT EXISTS load_watermarks (
+    source TEXT PRIMARY KEY,
+    last_review_date TEXT,
+    loaded_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+SQLITE_INDEXES = """
+CREATE UNIQUE INDEX IF NOT EXISTS ux_reviews_fingerprint ON reviews (review_fingerprint);
+CREATE INDEX IF NOT EXISTS ix_reviews_bank_date ON reviews (bank_id, review_date);
+"""
+
+ORACLE_FINGERPRINT_INDEX = "CREATE UNIQUE INDEX ux_reviews_fingerprint ON reviews (review_fingerprint)"
+
+# Idempotent Oracle DDL: each statement is skipped when its object already exists
+ORACLE_SCHEMA = [
+    """
+    CREATE TABLE banks (
+        bank_id NUMBER GENERATED ALWAYS AS IDENTITY,
+        bank_name VARCHAR2(100) NOT NULL,
+        created_date DATE DEFAULT SYSDATE,
+        PRIMARY KEY (bank_id)
+    )
+    """,
+    """
+    CREATE TABLE reviews (
+        review_id NUMBER GENERATED ALWAYS AS IDENTITY,
+        bank_id NUMBER,
+        review_text VARCHAR2(1000),
+        rating NUMBER,
+        review_date DATE,
+        created_date DATE DEFAULT SYSDATE,
+        review_fingerprint VARCHAR2(32),
+        PRIMARY KEY (review_id),
+        FOREIGN KEY (bank_id) REFERENCES banks(bank_id)
+    )
+    """,
+    "ALTER TABLE reviews ADD (review_fingerprint VARCHAR2(32))",
+    "CREATE UNIQUE INDEX ux_banks_name ON banks (bank_name)",
+    ORACLE_FINGERPRINT_INDEX,
+    "CREATE INDEX ix_reviews_bank_date ON reviews (bank_id, review_date)",
+    """
+    CREATE TABLE load_watermarks (
+        source VARCHAR2(100) PRIMARY KEY,
+        last_review_date DATE,
+        loaded_at DATE DEFAULT SYSDATE
+    )
+    """,
+]
+
+# ORA-00955 name already used, ORA-01408 column list already indexed, ORA-01430 column already exists
+_ORACLE_EXISTS_ERRORS = {955, 1408, 1430}
+
+@dataclass
+class LoadResult:
+    """Outcome of a bulk load.
+
+    inserted counts rows written (inserted, or updated by an upsert), unchanged
+    counts upserted rows that already matched, and failed holds (row offset,
+    error message) for rows the database rejected.
+    """
+    inserted: int = 0
+    unchanged: int = 0
+    failed: List[Tuple[int, str]] = field(default_factory=list)
+
+def connect_oracle(
+    user: str = ORACLE_USER,
+    password: str = ORACLE_PASSWORD,
+    dsn: str = ORACLE_DSN,
+) -> "oracledb.Connection":
+    """Open a thin-mode oracledb connection to Oracle XE."""
+    return oracledb.connect(user=user, password=password, dsn=dsn)
+
+def connect_sqlite(path: str = ":memory:") -> sqlite3.Connection:
+    """Open a SQLite database with the reviews schema, for local runs and benchmarks."""
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA foreign_keys = ON")
+    create_schema(connection)
+    return connection
+
+def is_sqlite(connection: Connection) -> bool:
+    return isinstance(connection, sqlite3.Connection)
+
+def _has_fingerprint_index(connection: Connection) -> bool:
+    cursor = connection.cursor()
+    if is_sqlite(connection):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ux_reviews_fingerprint'")
+    else:
+        cursor.execute("SELECT 1 FROM user_indexes WHERE index_name = 'UX_REVIEWS_FINGERPRINT'")
+    found = cursor.fetchone() is not None
+    cursor.close()
+    return found
+
+def create_schema(connection: Connection):
+    """Create tables and indexes that do not exist yet; safe to run on every load.
+
+    Before the unique fingerprint index is first created, rows from earlier
+    loads are fingerprinted and their duplicates removed, so it can be built.
+    """
+    if is_sqlite(connection):
+        connection.executescript(SQLITE_SCHEMA)
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(reviews)")}
+        if "review_fingerprint" not in columns:
+            connection.execute("ALTER TABLE reviews ADD COLUMN review_fingerprint TEXT")
+        if not _has_fingerprint_index(connection):
+            backfill_fingerprints(connection)
+        connection.executescript(SQLITE_INDEXES)
+        return
+    cursor = connection.cursor()
+    for statement in ORACLE_SCHEMA:
+        if statement == ORACLE_FINGERPRINT_INDEX and not _has_fingerprint_index(connection):
+            backfill_fingerprints(connection)
+        try:
+            cursor.execute(statement)
+        except oracledb.DatabaseError as e:
+            (error,) = e.args
+            if error.code not in _ORACLE_EXISTS_ERRORS:
+                raise
+    cursor.close()
+
+def _normalize_dates(dates: Iterable) -> List[Optional[str]]:
+    normalized = pd.to_datetime(pd.Series(list(dates), dtype=object)).dt.strftime("%Y-%m-%d")
+    return normalized.where(normalized.notna(), None).tolist()
+
+def review_fingerprint(bank: str, text: str, date: Optional[str]) -> str:
+    """Stable 32-char hex fingerprint of (bank, review text, YYYY-MM-DD date)."""
+    payload = "\x1f".join(["" if value is None else str(value) for value in (bank, text, date)])
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+def backfill_fingerprints(connection: Connection, batch_size: int = 5000) -> int:
+    """Fingerprint rows loaded before review_fingerprint existed, so upserts recognise them.
+
+    Older loads could insert the same review more than once. Of the rows
+    sharing a fingerprint only the lowest review_id is kept; the others are
+    deleted before any fingerprint is written, so the unique index holds.
+    Returns the number of rows fingerprinted.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT r.review_id, b.bank_name, r.review_text, r.review_date
+        FROM reviews r JOIN banks b ON b.bank_id = r.bank_id
+        WHERE r.review_fingerprint IS NULL
+    """)
+    rows = cursor.fetchall()
+    if not rows:
+        cursor.close()
+        return 0
+    dates = _normalize_dates(row[3] for row in rows)
+    fingerprinted = [
+        (review_fingerprint(bank, text, date), review_id)
+        for (review_id, bank, text, _), date in zip(rows, dates)
+    ]
+    cursor.execute("""
+        SELECT review_fingerprint, MIN(review_id) FROM reviews
+        WHERE review_fingerprint IS NOT NULL GROUP BY review_fingerprint
+    """)
+    existing = dict(cursor.fetchall())
+    keep = dict(existing)  # fingerprint -> lowest review_id
+    for fingerprint, review_id in fingerprinted:
+        keep[fingerprint] = min(keep.get(fingerprint, review_id), review_id)
+    deletes = [(review_id,) for fingerprint, review_id in fingerprinted if keep[fingerprint] != review_id]
+    deletes += [(review_id,) for fingerprint, review_id in existing.items() if keep[fingerprint] != review_id]
+    updates = [(fingerprint, review_id) for fingerprint, review_id in fingerprinted if keep[fingerprint] == review_id]
+
+    placeholders = _params(connection, 2)
+    delete_sql = f"DELETE FROM reviews WHERE review_id = {placeholders[0]}"
+    update_sql = f"UPDATE reviews SET review_fingerprint = {placeholders[0]} WHERE review_id = {placeholders[1]}"
+    for sql, params in ((delete_sql, deletes), (update_sql, updates)):
+        for start in range(0, len(params), batch_size):
+            cursor.executemany(sql, params[start:start + batch_size])
+            connection.commit()
+    cursor.close()
+    metrics.increment("db_rows_duplicate_total", len(deletes), operation="backfill")
+    return len(updates)
+
+def get_watermark(connection: Connection, source: str) -> Optional[str]:
+    """Latest review date (YYYY-MM-DD) already loaded from source, or None."""
+    cursor = connection.cursor()
+    cursor.execute(
+        f"SELECT last_review_date FROM load_watermarks WHERE source = {_params(connection, 1)[0]}", (source,)
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    if row is None or row[0] is None:
+        return None
+    return _normalize_dates([row[0]])[0]
+
+def set_watermark(connection: Connection, source: str, last_review_date: str):
+    """Record the latest review date loaded from source."""
+    cursor = connection.cursor()
+    if is_sqlite(connection):
+        cursor.execute(
+            """
+            INSERT INTO load_watermarks (source, last_review_date, loaded_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(source) DO UPDATE SET
+                last_review_date = excluded.last_review_date, loaded_at = excluded.loaded_at
+            """,
+            (source, last_review_date),
+        )
+    else:
+        cursor.execute(
+            """
+            MERGE INTO load_watermarks w
+            USING (SELECT :1 AS source, TO_DATE(:2, 'YYYY-MM-DD') AS last_review_date FROM dual) s
+            ON (w.source = s.source)
+            WHEN MATCHED THEN UPDATE SET w.last_review_date = s.last_review_date, w.loaded_at = SYSDATE
+            WHEN NOT MATCHED THEN INSERT (source, last_review_date) VALUES (s.source, s.last_review_date)
+            """,
+            (source, last_review_date),
+        )
+    connection.commit()
+    cursor.close()
+
+def _params(connection: Connection, count: int) -> List[str]:
+    """Positional bind placeholders in the connection's paramstyle."""
+    if is_sqlite(connection):
+        return ["?"] * count
+    return [f":{i}" for i in range(1, count + 1)]
+
+def _next_id(cursor, table: str, column: str) -> int:
+    cursor.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}")
+    return int(cursor.fetchone()[0])
+
+def ensure_banks(connection: Connection, bank_names: Iterable[str], assign_ids: bool = False) -> Dict[str, int]:
+    """Insert banks that are not in the banks table yet and return {bank_name: bank_id}.
+
+    Set assign_ids for schemas without identity columns (create_tables.sql).
+    """
+    cursor = connection.cursor()
+    cursor.execute("SELECT bank_id, bank_name FROM banks")
+    mapping = {row[1]: row[0] for row in cursor.fetchall()}
+    missing = [name for name in dict.fromkeys(bank_names) if name not in mapping]
+    if missing:
+        if assign_ids:
+            start = _next_id(cursor, "banks", "bank_id")
+            placeholders = ", ".join(_params(connection, 2))
+            cursor.executemany(
+                f"INSERT INTO banks (bank_id, bank_name) VALUES ({placeholders})",
+                [(start + i, name) for i, name in enumerate(missing)],
+            )
+        else:
+            placeholders = ", ".join(_params(connection, 1))
+            cursor.executemany(
+                f"INSERT INTO banks (bank_name) VALUES ({placeholders})", [(name,) for name in missing]
+            )
+        connection.commit()
+        cursor.execute("SELECT bank_id, bank_name FROM banks")
+        mapping = {row[1]: row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return mapping
+
+def _column(df: pd.DataFrame, name: str) -> List:
+    """Column as plain Python values with NaN as None, which both drivers can bind."""
+    values = df[name].astype(object)
+    return values.where(values.notna(), None).tolist()
+
+def _review_rows(df: pd.DataFrame, bank_ids: Dict[str, int], date_column: str) -> List[Tuple]:
+    dates = pd.to_datetime(df[date_column]).dt.strftime("%Y-%m-%d")
+    return list(zip(
+        [bank_ids.get(bank) for bank in df["bank"]],
+        _column(df, "review"),
+        _column(df, "rating"),
+        dates.where(dates.notna(), None).tolist(),
+    ))
+
+def _insert_sql(connection: Connection, assign_ids: bool) -> str:
+    columns = ["bank_id", "review_text", "rating", "review_date"]
+    if assign_ids:
+        columns.insert(0, "review_id")
+    values = _params(connection, len(columns))
+    if not is_sqlite(connection):
+        values[-1] = f"TO_DATE({values[-1]}, 'YYYY-MM-DD')"
+    return f"INSERT INTO reviews ({', '.join(columns)}) VALUES ({', '.join(values)})"
+
+def _insert_sqlite_batch(connection: sqlite3.Connection, sql: str, batch: List[Tuple], offset: int, result: LoadResult):
+    """executemany one batch; if any row fails, retry row by row to emulate Oracle batcherrors."""
+    try:
+        result.inserted += connection.executemany(sql, batch).rowcount
+    except sqlite3.Error:
+        connection.rollback()
+        for i, row in enumerate(batch):
+            try:
+                result.inserted += connection.execute(sql, row).rowcount
+            except sqlite3.Error as e:
+                result.failed.append((offset + i, str(e)))
+    connection.commit()
+
+def load_reviews(
+    connection: Connection,
+    df: pd.DataFrame,
+    batch_size: int = 5000,
+    date_column: str = "date",
+    assign_ids: bool = False,
+) -> LoadResult:
+    """Bulk insert reviews with array-bound executemany, committing once per batch.
+
+    On Oracle, batcherrors collects rejected rows without aborting the rest of
+    the batch; the SQLite stand-in reproduces that by retrying a failed batch
+    row by row. Rejected rows are reported in LoadResult.failed by their
+    position in df.
+    """
+    bank_ids = ensure_banks(connection, df["bank"].dropna(), assign_ids=assign_ids)
+    rows = _review_rows(df, bank_ids, date_column)
+    result = LoadResult()
+
+    cursor = connection.cursor()
+    if assign_ids:
+        start_id = _next_id(cursor, "reviews", "review_id")
+        rows = [(start_id + i, *row) for i, row in enumerate(rows)]
+    sql = _insert_sql(connection, assign_ids)
+
+    with metrics.stage("db_load", rows_in=len(rows)) as stage:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            if is_sqlite(connection):
+                _insert_sqlite_batch(connection, sql, batch, start, result)
+                continue
+            cursor.executemany(sql, batch, batcherrors=True)
+            errors = cursor.getbatcherrors()
+            result.failed.extend((start + error.offset, error.message) for error in errors)
+            result.inserted += len(batch) - len(errors)
+            connection.commit()
+        stage.rows_out = result.inserted
+    metrics.increment("db_rows_failed_total", len(result.failed), operation="db_load")
+    cursor.close()
+    return result
+
+def _upsert_sql(connection: Connection, assign_ids: bool) -> str:
+    """Insert new fingerprints and refresh the rating of existing ones when it changed."""
+    columns = ["review_fingerprint", "bank_id", "review_text", "rating", "review_date"]
+    if assign_ids:
+        columns.insert(0, "review_id")
+    if is_sqlite(connection):
+        return f"""
+            INSERT INTO reviews ({', '.join(columns)}) VALUES ({', '.join(_params(connection, len(columns)))})
+            ON CONFLICT(review_fingerprint) DO UPDATE SET rating = excluded.rating
+            WHERE reviews.rating IS NOT excluded.rating
+        """
+    values = _params(connection, len(columns))
+    values[-1] = f"TO_DATE({values[-1]}, 'YYYY-MM-DD')"
+    source = ", ".join(f"{value} AS {column}" for value, column in zip(values, columns))
+    return f"""
+        MERGE INTO reviews r
+        USING (SELECT {source} FROM dual) s
+        ON (r.review_fingerprint = s.review_fingerprint)
+        WHEN MATCHED THEN UPDATE SET r.rating = s.rating
+            WHERE DECODE(r.rating, s.rating, 0, 1) = 1
+        WHEN NOT MATCHED THEN INSERT ({', '.join(columns)})
+            VALUES ({', '.join(f"s.{column}" for column in columns)})
+    """
+
+def upsert_reviews(
+    connection: Connection,
+    df: pd.DataFrame,
+    batch_size: int = 5000,
+    date_column: str = "date",
+    assign_ids: bool = False,
+    source: str = "cleaned_reviews",
+    incremental: bool = True,
+) -> LoadResult:
+    """Idempotently merge reviews keyed by their (bank, text, date) fingerprint.
+
+    Only new fingerprints are inserted and existing ones are updated when the
+    rating changed, so re-running a load never duplicates rows. A fingerprint
+    repeated within df is merged once, with its last row. In incremental
+    mode rows dated before the source's watermark are skipped; rows on the
+    watermark day are re-merged because that day may have been loaded partially.
+    """
+    create_schema(connection)
+    backfill_fingerprints(connection, batch_size)
+
+    df = df.dropna(subset=["bank"]).reset_index(drop=True)
+    dates = pd.Series(_normalize_dates(df[date_column]), dtype=object)
+    if incremental:
+        watermark = get_watermark(connection, source)
+        if watermark is not None:
+            keep = (dates >= watermark).fillna(False).to_numpy(dtype=bool)
+            df, dates = df[keep].reset_index(drop=True), dates[keep].reset_index(drop=True)
+
+    result = LoadResult()
+    if df.empty:
+        return result
+
+    bank_ids = ensure_banks(connection, df["bank"], assign_ids=assign_ids)
+    texts = _column(df, "review")
+    fingerprints = [review_fingerprint(bank, text, date) for bank, text, date in zip(df["bank"], texts, dates)]
+    # One row per fingerprint, the last one winning: Oracle's MERGE rejects a fingerprint repeated in one batch
+    keep = ~pd.Series(fingerprints).duplicated(keep="last").to_numpy()
+    metrics.increment("db_rows_duplicate_total", int((~keep).sum()), operation="db_upsert")
+    rows = [row for row, kept in zip(zip(
+        fingerprints,
+        [bank_ids[bank] for bank in df["bank"]],
+        texts,
+        _column(df, "rating"),
+        dates.tolist(),
+    ), keep) if kept]
+    cursor = connection.cursor()
+    if assign_ids:
+        # Candidate ids for rows that turn out to be new; matched rows leave gaps, which is harmless
+        start_id = _next_id(cursor, "reviews", "review_id")
+        rows = [(start_id + i, *row) for i, row in enumerate(rows)]
+    sql = _upsert_sql(connection, assign_ids)
+
+    with metrics.stage("db_upsert", rows_in=len(rows)) as stage:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            if is_sqlite(connection):
+                _insert_sqlite_batch(connection, sql, batch, start, result)
+                continue
+            cursor.executemany(sql, batch, batcherrors=True)
+            errors = cursor.getbatcherrors()
+            result.failed.extend((start + error.offset, error.message) for error in errors)
+            result.inserted += cursor.rowcount
+            connection.commit()
+        stage.rows_out = len(rows) - len(result.failed)  # merged, whether inserted, updated or unchanged
+    metrics.increment("db_rows_failed_total", len(result.failed), operation="db_upsert")
+    result.unchanged = len(rows) - result.inserted - len(result.failed)
+    cursor.close()
+
+    loaded_dates = dates.dropna()
+    if not loaded_dates.empty:
+        set_watermark(connection, source, loaded_dates.max())
+    return result
@@ -0,0 +1,227 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import argparse
+import queue
+import sqlite3
+import urllib.request
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Dict, Iterator, Optional, Sequence, Tuple, Union
+import oracledb
+import pandas as pd
+import pyarrow as pa
+from scripts.common.metrics import metrics
+from scripts.common.storage import normalize_dtypes, to_arrow
+from scripts.database.loader import ORACLE_DSN, ORACLE_PASSWORD, ORACLE_USER, Connection, is_sqlite
+
+# Output column -> SQL expression; names match the review files so stages can read either source
+COLUMNS = {
+    "review_id": "r.review_id",
+    "bank": "b.bank_name",
+    "review": "r.review_text",
+    "rating": "r.rating",
+    "date": "r.review_date",
+}
+ARRAYSIZE = 10_000  # rows per round trip and per yielded chunk
+
+DateLike = Union[str, date, datetime]
+
+class SQLitePool:
+    """Fixed-size pool of read-only SQLite connections with the acquire/release interface of an oracledb pool.
+
+    The database must already exist (e.g. written by loader.load_reviews);
+    connections are opened with mode=ro, so a wrong path fails instead of
+    creating an empty database.
+    """
+
+    def __init__(self, path: str, size: int = 4):
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"No SQLite database at {path}")
+        self.path = path
+        uri = f"file:{urllib.request.pathname2url(os.path.abspath(path))}?mode=ro"
+        self._idle: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(size):
+            self._idle.put(sqlite3.connect(uri, uri=True, check_same_thread=False))
+
+    def acquire(self) -> sqlite3.Connection:
+        return self._idle.get()
+
+    def release(self, connection: sqlite3.Connection):
+        self._idle.put(connection)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get().close()
+
+Pool = Union["oracledb.ConnectionPool", SQLitePool]
+
+def oracle_pool(
+    user: str = ORACLE_USER,
+    password: str = ORACLE_PASSWORD,
+    dsn: str = ORACLE_DSN,
+    min_connections: int = 1,
+    max_connections: int = 4,
+) -> "oracledb.ConnectionPool":
+    """Thin-mode oracledb session pool sized for a few concurrent readers."""
+    return oracledb.create_pool(user=user, password=password, dsn=dsn,
+                                min=min_connections, max=max_connections, increment=1)
+
+def _date_bind(value: DateLike, sqlite: bool):
+    """Dates are YYYY-MM-DD text in SQLite and DATE columns in Oracle."""
+    timestamp = pd.Timestamp(value)
+    return timestamp.strftime("%Y-%m-%d") if sqlite else timestamp.to_pydatetime()
+
+class ReviewReader:
+    """Read-side access to the reviews/banks tables through a connection pool.
+
+    Filters on bank, date range and rating run in the database, with banks
+    resolved to ids first so the (bank_id, review_date) index drives the scan.
+    Rows are fetched arraysize at a time (with matching prefetch on Oracle)
+    and yielded as DataFrame or Arrow chunks with the same column names and
+    dtypes as the review files, so stages can read just the slice they need.
+    """
+
+    def __init__(self, pool: Pool, arraysize: int = ARRAYSIZE):
+        self.pool = pool
+        self.arraysize = arraysize
+
+    @classmethod
+    def sqlite(cls, path: str, size: int = 4, arraysize: int = ARRAYSIZE) -> "ReviewReader":
+        return cls(SQLitePool(path, size), arraysize)
+
+    @classmethod
+    def oracle(cls, arraysize: int = ARRAYSIZE, **pool_options) -> "ReviewReader":
+        return cls(oracle_pool(**pool_options), arraysize)
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        connection = self.pool.acquire()
+        try:
+            yield connection
+        finally:
+            self.pool.release(connection)
+
+    def bank_ids(self, banks: Optional[Sequence[str]] = None, connection: Optional[Connection] = None) -> Dict[str, int]:
+        """Bank name -> bank_id, for the given banks (all banks by default).
+
+        Pass the connection a caller already holds, so it does not wait on the pool for a second one.
+        """
+        if connection is None:
+            with self.connection() as connection:
+                return self.bank_ids(banks, connection)
+        cursor = connection.cursor()
+        rows = cursor.execute("SELECT bank_name, bank_id FROM banks").fetchall()
+        cursor.close()
+        ids = dict(rows)
+        return ids if banks is None else {bank: ids[bank] for bank in banks if bank in ids}
+
+    def _where(
+        self,
+        connection: Connection,
+        banks: Optional[Sequence[str]],
+        start: Optional[DateLike],
+        end: Optional[DateLike],
+        ratings: Optional[Sequence[int]],
+    ) -> Tuple[str, Dict[str, object]]:
+        sqlite = is_sqlite(connection)
+        clauses, binds = [], {}
+        if banks is not None:
+            ids = list(self.bank_ids(banks, connection).values()) or [-1]
+            clauses.append(f"r.bank_id IN ({', '.join(f':bank{i}' for i in range(len(ids)))})")
+            binds.update({f"bank{i}": bank_id for i, bank_id in enumerate(ids)})
+        if start is not None:
+            clauses.append("r.review_date >= :start_date")
+            binds["start_date"] = _date_bind(start, sqlite)
+        if end is not None:
+            clauses.append("r.review_date < :end_date")
+            binds["end_date"] = _date_bind(pd.Timestamp(end) + pd.Timedelta(days=1), sqlite)  # end is inclusive
+        if ratings is not None:
+            clauses.append(f"r.rating IN ({', '.join(f':rating{i}' for i in range(len(ratings)))})")
+            binds.update({f"rating{i}": int(rating) for i, rating in enumerate(ratings)})
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", binds
+
+    def iter_reviews(
+        self,
+        banks: Optional[Sequence[str]] = None,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        ratings: Optional[Sequence[int]] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """Yield matching reviews (dates from start to end inclusive) in chunks of arraysize rows."""
+        columns = list(columns or COLUMNS)
+        unknown = [column for column in columns if column not in COLUMNS]
+        if unknown:
+            raise KeyError(f"Unknown columns {unknown}; available: {list(COLUMNS)}")
+        with self.connection() as connection:
+            sqlite = is_sqlite(connection)
+            where, binds = self._where(connection, banks, start, end, ratings)
+            join = " JOIN banks b ON b.bank_id = r.bank_id" if "bank" in columns else ""
+            sql = f"SELECT {', '.join(COLUMNS[column] for column in columns)} FROM reviews r{join}{where}"
+            cursor = connection.cursor()
+            cursor.arraysize = self.arraysize
+            if not sqlite:
+                cursor.prefetchrows = self.arraysize + 1  # first round trip returns a full chunk
+            cursor.execute(sql, binds)
+            try:
+                while True:
+                    with metrics.timer("db_fetch_seconds"):
+                        rows = cursor.fetchmany(self.arraysize)
+                    if not rows:
+                        break
+                    metrics.increment("db_rows_read_total", len(rows))
+                    yield normalize_dtypes(pd.DataFrame.from_records(rows, columns=columns))
+            finally:
+                cursor.close()
+
+    def iter_arrow(self, **filters) -> Iterator[pa.Table]:
+        """iter_reviews as Arrow tables typed like the Parquet review files."""
+        for chunk in self.iter_reviews(**filters):
+            yield to_arrow(chunk)
+
+    def read_reviews(self, **filters) -> pd.DataFrame:
+        """All matching reviews as one DataFrame; see iter_reviews for the filters."""
+        with metrics.stage("db_read") as stage:
+            chunks = list(self.iter_reviews(**filters))
+            df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=filters.get("columns") or list(COLUMNS))
+            stage.rows_in = stage.rows_out = len(df)
+        return df
+
+    def count(self, banks=None, start=None, end=None, ratings=None) -> int:
+        """Number of matching reviews, counted in the database."""
+        with self.connection() as connection:
+            where, binds = self._where(connection, banks, start, end, ratings)
+            cursor = connection.cursor()
+            (count,) = cursor.execute(f"SELECT COUNT(*) FROM reviews r{where}", binds).fetchone()
+            cursor.close()
+        return count
+
+    def close(self):
+        self.pool.close()
+
+if __name__ == "__main__":
+    from scripts.common.storage import ReviewWriter
+
+    parser = argparse.ArgumentParser(description="Export a filtered slice of the reviews table to Parquet or CSV.")
+    parser.add_argument("--sqlite", help="Read this SQLite database instead of Oracle")
+    parser.add_argument("--bank", nargs="+")
+    parser.add_argument("--start", help="First review date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last review date, inclusive")
+    parser.add_argument("--rating", type=int, nargs="+")
+    parser.add_argument("--columns", nargs="+", choices=list(COLUMNS))
+    parser.add_argument("--output", default="data/processed/db_reviews.parquet")
+    args = parser.parse_args()
+
+    reader = ReviewReader.sqlite(args.sqlite) if args.sqlite else ReviewReader.oracle()
+    filters = {"banks": args.bank, "start": args.start, "end": args.end, "ratings": args.rating, "columns": args.columns}
+    if args.output.endswith(".csv"):
+        reader.read_reviews(**filters).to_csv(args.output, index=False)
+    else:
+        with ReviewWriter(args.output) as writer:
+            for chunk in reader.iter_reviews(**filters):
+                writer.write(chunk)
+    reader.close()
+    print(f"Saved reviews to {args.output}")
+    print(f"Metrics written to {metrics.export('read_reviews')}")
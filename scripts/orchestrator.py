@@ -0,0 +1,298 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import ast
+import hashlib
+import json
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Set
+from scripts.common.metrics import metrics
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RAW_DATA_DIR = "data/raw"
+PROCESSED_DATA_DIR = "data/processed"
+STATE_PATH = f"{PROCESSED_DATA_DIR}/.pipeline_state.json"
+
+CLEANED_CSV = f"{PROCESSED_DATA_DIR}/cleaned_reviews.csv"
+CLEANED = f"{PROCESSED_DATA_DIR}/cleaned_reviews.parquet"
+PREPROCESSED = f"{PROCESSED_DATA_DIR}/preprocessed_reviews.parquet"
+SENTIMENT = f"{PROCESSED_DATA_DIR}/sentiment_reviews.parquet"
+SENTIMENT_AGGREGATES = f"{PROCESSED_DATA_DIR}/sentiment_aggregates.csv"
+THEMATIC = f"{PROCESSED_DATA_DIR}/thematic_reviews.parquet"
+THEME_AGGREGATES = f"{PROCESSED_DATA_DIR}/theme_aggregates.csv"
+TOPIC_TERMS = f"{PROCESSED_DATA_DIR}/topic_terms.csv"
+DAILY_AGGREGATES = f"{PROCESSED_DATA_DIR}/aggregates.sqlite"
+
+@dataclass
+class Stage:
+    """A pipeline step with the files it reads and writes, the code it runs and its config.
+
+    The stage is skipped when the fingerprint of its inputs, code files and
+    config matches the last successful run and all its outputs still exist.
+    List code with project_modules so modules it imports are covered too.
+    """
+    name: str
+    run: Callable[[], None]
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    code: List[str] = field(default_factory=list)
+    config: dict = field(default_factory=dict)
+
+class Orchestrator:
+    """Runs stages in dependency order, in parallel where possible, rebuilding only stale ones."""
+
+    def __init__(self, stages: Sequence[Stage], state_path: str = STATE_PATH, max_workers: int = 4):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self.state = {"fingerprints": {}, "digests": {}}
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                self.state = json.load(f)
+
+        producers = {output: stage.name for stage in stages for output in stage.outputs}
+        self.dependencies: Dict[str, Set[str]] = {
+            stage.name: {producers[path] for path in stage.inputs if path in producers} - {stage.name}
+            for stage in stages
+        }
+
+    def file_digest(self, path: str) -> Optional[str]:
+        """Content hash of a file, memoized by (size, mtime) so unchanged files are not re-read."""
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        with self._lock:
+            cached = self.state["digests"].get(path)
+        if cached and cached["stamp"] == stamp:
+            return cached["digest"]
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        with self._lock:
+            self.state["digests"][path] = {"stamp": stamp, "digest": digest.hexdigest()}
+        return digest.hexdigest()
+
+    def fingerprint(self, stage: Stage) -> str:
+        """Hash of a stage's input contents, code files and config."""
+        payload = {
+            "inputs": {path: self.file_digest(path) for path in sorted(stage.inputs)},
+            "code": {path: self.file_digest(path) for path in sorted(stage.code)},
+            "config": stage.config,
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+    def is_fresh(self, stage: Stage, fingerprint: str) -> bool:
+        with self._lock:
+            recorded = self.state["fingerprints"].get(stage.name)
+        return recorded == fingerprint and all(os.path.exists(path) for path in stage.outputs)
+
+    def _save_state(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.state, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.state_path)
+
+    def _execute(self, stage: Stage, force: bool) -> bool:
+        """Run a stage unless it is fresh; returns whether it ran."""
+        fingerprint = self.fingerprint(stage)
+        if not force and self.is_fresh(stage, fingerprint):
+            print(f"[{stage.name}] up to date, skipping")
+            return False
+        print(f"[{stage.name}] running")
+        with metrics.stage("dag", target=stage.name):
+            stage.run()
+        with self._lock:
+            self.state["fingerprints"][stage.name] = fingerprint
+        self._save_state()
+        return True
+
+    def _selected(self, targets: Optional[Sequence[str]]) -> Set[str]:
+        """Targets plus everything they depend on (all stages when targets is empty)."""
+        if not targets:
+            return set(self.stages)
+        selected: Set[str] = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage: {name}")
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.dependencies[name])
+        return selected
+
+    def run(self, targets: Optional[Sequence[str]] = None, force: bool = False) -> Dict[str, bool]:
+        """Run the selected stages, starting each as soon as its dependencies finish.
+
+        Returns {stage name: whether it ran}. Raises if a stage fails; stages
+        that already finished keep their recorded fingerprints.
+        """
+        selected = self._selected(targets)
+        remaining = {name: self.dependencies[name] & selected for name in selected}
+        results: Dict[str, bool] = {}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while remaining or running:
+                ready = [name for name, deps in remaining.items() if not deps - set(results)]
+                if not ready and not running:
+                    raise ValueError(f"Dependency cycle among stages: {sorted(remaining)}")
+                for name in ready:
+                    del remaining[name]
+                    running[executor.submit(self._execute, self.stages[name], force)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+        return results
+
+def _module_path(relative: str) -> str:
+    return os.path.join(PROJECT_ROOT, relative)
+
+def _module_file(module: str) -> Optional[str]:
+    """Source file of a project module (e.g. scripts.common.metrics), or None for third-party modules."""
+    base = os.path.join(PROJECT_ROOT, *module.split("."))
+    for path in (f"{base}.py", os.path.join(base, "__init__.py")):
+        if os.path.isfile(path):
+            return path
+    return None
+
+def project_modules(*paths: str) -> List[str]:
+    """The given module files plus every project module they import, directly or indirectly.
+
+    Imports are read from the source, including those inside functions, so
+    a stage's fingerprint changes when any code it can run changes.
+    """
+    found: Set[str] = set()
+    pending = list(paths)
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.add(path)
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        modules = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                modules.append(node.module)
+                modules.extend(f"{node.module}.{alias.name}" for alias in node.names)  # from package import module
+        for module in modules:
+            module_path = _module_file(module) if module.split(".")[0] == "scripts" else None
+            if module_path:
+                pending.append(module_path)
+    return sorted(found)
+
+def build_stages() -> List[Stage]:
+    """The review pipeline as a DAG; analysis modules are imported only when their stage runs."""
+
+    def clean():
+        from scripts.task1_data_collection.preprocess_reviews import preprocess_reviews
+        preprocess_reviews()
+
+    def preprocess():
+        from scripts.analysis.preprocess_nlp import preprocess_reviews
+        from scripts.analysis.translation import TranslationCache
+        from scripts.common.storage import read_reviews, write_reviews
+        translation_cache = TranslationCache()
+        df = preprocess_reviews(read_reviews(CLEANED), translation_cache=translation_cache)
+        translation_cache.close()
+        write_reviews(df, PREPROCESSED)
+
+    def sentiment():
+        from scripts.analysis.sentiment_analysis import analyze_sentiment
+        from scripts.analysis.sentiment_cache import SentimentCache
+        from scripts.common.storage import read_reviews, write_reviews
+        cache = SentimentCache()
+        df = analyze_sentiment(read_reviews(PREPROCESSED), cache=cache)
+        cache.close()
+        write_reviews(df, SENTIMENT)
+
+    def sentiment_aggregates():
+        from scripts.analysis.sentiment_analysis import aggregate_sentiment
+        from scripts.common.storage import read_reviews
+        columns = ["bank", "rating", "vader_label", "vader_score", "distilbert_label", "distilbert_score"]
+        aggregate_sentiment(read_reviews(SENTIMENT, columns=columns)).to_csv(SENTIMENT_AGGREGATES, index=False)
+
+    def thematic():
+        from scripts.analysis.thematic_analysis import thematic_analysis
+        from scripts.common.storage import read_reviews, write_reviews
+        write_reviews(thematic_analysis(read_reviews(SENTIMENT)), THEMATIC)
+
+    def theme_aggregates():
+        from scripts.analysis.thematic_analysis import aggregate_themes
+        from scripts.common.storage import read_reviews
+        aggregate_themes(read_reviews(THEMATIC, columns=["bank", "themes"])).to_csv(THEME_AGGREGATES, index=False)
+
+    def daily_aggregates():
+        from scripts.analysis.aggregate_store import AggregateStore
+        store = AggregateStore(DAILY_AGGREGATES)
+        # Merges only appended row groups, and rebuilds when earlier reviews were re-labelled
+        store.sync(THEMATIC)
+        store.close()
+
+    def topics():
+        from scripts.analysis.topic_discovery import update_topics
+        update_topics(PREPROCESSED, terms_csv=TOPIC_TERMS)
+
+    def visualize():
+        import pandas as pd
+        from scripts.analysis.visualize_results import plot_sentiment_distribution, plot_theme_counts
+        from scripts.common.storage import read_reviews
+        plot_sentiment_distribution(read_reviews(SENTIMENT, columns=["bank", "distilbert_label"]))
+        plot_theme_counts(pd.read_csv(THEME_AGGREGATES))
+
+    # Model identity and theme keywords are stage config; these imports load no models
+    from scripts.analysis.inference_backends import MODEL_NAME, MODEL_REVISION
+    from scripts.analysis.sentiment_analysis import INFERENCE_CONFIG
+    from scripts.analysis.thematic_analysis import themes as theme_keywords
+
+    from scripts.task1_data_collection.preprocess_reviews import discover_raw_files
+
+    raw_files = discover_raw_files(os.path.join(RAW_DATA_DIR, "*_reviews_raw.csv"))
+    storage = _module_path("scripts/common/storage.py")
+    return [
+        Stage("clean", clean, inputs=raw_files, outputs=[CLEANED_CSV, CLEANED],
+              code=project_modules(_module_path("scripts/task1_data_collection/preprocess_reviews.py"), storage)),
+        Stage("preprocess", preprocess, inputs=[CLEANED], outputs=[PREPROCESSED],
+              code=project_modules(_module_path("scripts/analysis/preprocess_nlp.py"),
+                                   _module_path("scripts/analysis/translation.py"), storage),
+              config={"spacy_model": "en_core_web_sm", "translation": "am->en"}),
+        Stage("sentiment", sentiment, inputs=[PREPROCESSED], outputs=[SENTIMENT],
+              code=project_modules(_module_path("scripts/analysis/sentiment_analysis.py"), storage),
+              config={"model": MODEL_NAME, "revision": MODEL_REVISION, "backend": INFERENCE_CONFIG["backend"]}),
+        Stage("sentiment_aggregates", sentiment_aggregates, inputs=[SENTIMENT], outputs=[SENTIMENT_AGGREGATES],
+              code=project_modules(_module_path("scripts/analysis/sentiment_analysis.py"))),
+        Stage("themes", thematic, inputs=[SENTIMENT], outputs=[THEMATIC],
+              code=project_modules(_module_path("scripts/analysis/thematic_analysis.py"), storage),
+              config={"themes": theme_keywords}),
+        Stage("theme_aggregates", theme_aggregates, inputs=[THEMATIC], outputs=[THEME_AGGREGATES],
+              code=project_modules(_module_path("scripts/analysis/thematic_analysis.py"))),
+        Stage("daily_aggregates", daily_aggregates, inputs=[THEMATIC], outputs=[DAILY_AGGREGATES],
+              code=project_modules(_module_path("scripts/analysis/aggregate_store.py"), storage)),
+        Stage("topics", topics, inputs=[PREPROCESSED], outputs=[TOPIC_TERMS],
+              code=project_modules(_module_path("scripts/analysis/topic_discovery.py"))),
+        Stage("visualize", visualize, inputs=[SENTIMENT, THEME_AGGREGATES],
+              outputs=["figures/sentiment_distribution.png", "figures/theme_counts.png"],
+              code=project_modules(_module_path("scripts/analysis/visualize_results.py"))),
+    ]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run pipeline stages whose inputs, code or config changed.")
+    parser.add_argument("stages", nargs="*", help="Stages to bring up to date (default: all)")
+    parser.add_argument("--force", action="store_true", help="Re-run stages even if they are up to date")
+    parser.add_argument("--workers", type=int, default=4, help="Stages to run in parallel")
+    args = parser.parse_args()
+    results = Orchestrator(build_stages(), max_workers=args.workers).run(args.stages, force=args.force)
+    print(f"Ran: {[name for name, ran in results.items() if ran]}")
+    print(f"Metrics written to {metrics.export('orchestrator')}")
@@ -0,0 +1,87 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from typing import Iterable, Optional
+import pandas as pd
+from scripts.analysis.aggregate_store import AggregateStore
+from scripts.analysis.near_duplicates import NearDuplicateIndex, flag_near_duplicates
+from scripts.analysis.preprocess_nlp import AMHARIC_CSV, preprocess_reviews
+from scripts.analysis.sentiment_analysis import analyze_sentiment
+from scripts.analysis.sentiment_cache import SentimentCache
+from scripts.analysis.thematic_analysis import ThemeIndex, aggregate_themes, thematic_analysis, themes
+from scripts.analysis.translation import TranslationCache
+from scripts.common.metrics import metrics
+from scripts.common.models import models
+from scripts.common.storage import ReviewWriter, iter_reviews
+
+def run_pipeline(
+    input_path: str = "data/processed/cleaned_reviews.parquet",
+    output_path: str = "data/processed/thematic_reviews.parquet",
+    theme_aggregates_csv: Optional[str] = "data/processed/theme_aggregates.csv",
+    amharic_csv: Optional[str] = AMHARIC_CSV,
+    chunk_size: int = 10_000,
+    n_process: int = 1,
+    sentiment_cache: Optional[SentimentCache] = None,
+    translation_cache: Optional[TranslationCache] = None,
+    theme_index: Optional[ThemeIndex] = None,
+    near_duplicates: Optional[NearDuplicateIndex] = None,
+    collapse_near_duplicates: bool = False,
+    reviews: Optional[Iterable[pd.DataFrame]] = None,
+    aggregates: Optional[AggregateStore] = None,
+) -> int:
+    """Stream reviews through preprocess -> sentiment -> themes one chunk at a time.
+
+    Each chunk is processed in place and appended to output_path as soon as it
+    is done, so peak memory depends on chunk_size rather than corpus size. Theme
+    counts are summed per chunk into theme_aggregates_csv, and reviews that
+    fail translation are collected in amharic_csv (None skips it). With a
+    NearDuplicateIndex, near-duplicate reviews are flagged before any model
+    runs, or dropped when collapse_near_duplicates=True. reviews, e.g. a
+    ReviewReader slice, replaces input_path as the source of chunks. With an
+    AggregateStore, each written chunk is merged into the daily aggregates.
+    Returns the number of reviews written.
+    """
+    theme_index = theme_index or ThemeIndex(themes)
+    theme_counts = None
+    if amharic_csv and os.path.exists(amharic_csv):
+        os.remove(amharic_csv)  # chunks append their failed translations
+
+    with ReviewWriter(output_path) as writer:
+        chunks = reviews if reviews is not None else iter_reviews(input_path, chunk_size=chunk_size)
+        for chunk in chunks:
+            metrics.increment("pipeline_chunks_total")
+            if near_duplicates is not None:
+                chunk = flag_near_duplicates(chunk, near_duplicates, collapse=collapse_near_duplicates, copy=False)
+            chunk = preprocess_reviews(
+                chunk, n_process=n_process, translation_cache=translation_cache,
+                amharic_csv=amharic_csv, amharic_append=True, copy=False
+            )
+            chunk = analyze_sentiment(chunk, cache=sentiment_cache, n_process=n_process, copy=False)
+            chunk = thematic_analysis(chunk, index=theme_index, copy=False)
+            writer.write(chunk)
+            if aggregates is not None:
+                aggregates.merge(chunk)
+
+            counts = aggregate_themes(chunk).astype({"bank": str}).set_index(["bank", "themes"])["count"]
+            theme_counts = counts if theme_counts is None else theme_counts.add(counts, fill_value=0)
+            print(f"Processed {writer.rows} reviews")
+
+    if theme_aggregates_csv and theme_counts is not None:
+        theme_counts.astype(int).rename("count").reset_index().to_csv(theme_aggregates_csv, index=False)
+    return writer.rows
+
+if __name__ == "__main__":
+    print(f"Loaded models in {models.warm_up(['spacy', 'vader', 'distilbert'])} seconds")
+    sentiment_cache = SentimentCache()
+    translation_cache = TranslationCache()
+    total = run_pipeline(
+        sentiment_cache=sentiment_cache,
+        translation_cache=translation_cache,
+        n_process=max(1, (os.cpu_count() or 1) - 1),
+    )
+    print(f"Saved {total} reviews to data/processed/thematic_reviews.parquet")
+    print(f"Sentiment cache: {sentiment_cache.stats()}")
+    print(f"Metrics written to {metrics.export('pipeline')}")
+    sentiment_cache.close()
+    translation_cache.close()
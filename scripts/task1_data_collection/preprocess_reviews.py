@@ -1,64 +1,192 @@
-import pandas as pd
+import sys
 import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import argparse
+import glob
+import hashlib
+import json
+import shutil
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from scripts.common.hashing import SeenHashes, review_hashes
+from scripts.common.metrics import metrics
+from scripts.common.storage import ReviewWriter
 
 # Directories
 RAW_DATA_DIR = "data/raw" #
 PROCESSED_DATA_DIR = "data/processed"
 os.makedirs(PROCESSED_DATA_DIR, exist_ok=True)
 
-def preprocess_reviews():
-    """Preprocess raw review data and save as a single cleaned CSV."""
-    # List of raw CSV files
-    bank_files = [
-        f"{RAW_DATA_DIR}/{bank}_reviews_raw.csv"
-        for bank in [
-            "commercial_bank_of_ethiopia",
-            "bank_of_abyssinia",
-            "dashen_bank"
-        ]
-    ]
-
-    # Load and combine raw CSVs
-    dfs = []
-    for file in bank_files:
-        if os.path.exists(file):
-            df = pd.read_csv(file)
-            dfs.append(df)
-            print(f"Loaded {len(df)} reviews from {file}")
-        else:
-            print(f"File not found: {file}")
-
-    if not dfs:
-        print("No data files found. Please run scrape_reviews.py first.")
-        return
+RAW_GLOB = "*_reviews_raw.csv" # One raw CSV per app, as written by scrape_reviews.py
+COMBINED_RAW = "all_reviews_raw.csv" # Concatenation of the per-app files; skipped to avoid reading rows twice
+CLEANED_CSV = f"{PROCESSED_DATA_DIR}/cleaned_reviews.csv"
+CLEANED_PARQUET = f"{PROCESSED_DATA_DIR}/cleaned_reviews.parquet"
+SEEN_HASHES = f"{PROCESSED_DATA_DIR}/cleaned_hashes.npy" # Sorted uint64 hashes of every cleaned review
+STATE_PATH = f"{PROCESSED_DATA_DIR}/clean_state.json" # Bytes of each raw file already cleaned, with a digest of them
+FINGERPRINT_BYTES = 65_536 # Bytes hashed at the start of a raw file and just before its offset
+
+CLEANED_COLUMNS = ["bank", "review", "rating", "date", "source", "review_id"]
+RAW_DTYPES = {"bank": str, "review": str, "rating": "float32", "date": str, "source": str, "review_id": str}
+RAW_DATE_FORMAT = "%Y-%m-%d %H:%M:%S" # How pandas writes the scraper's review timestamps
+CHUNK_SIZE = 50_000
+
+def discover_raw_files(pattern: Optional[str] = None, manifest: Optional[str] = None) -> List[str]:
+    """Raw CSVs to clean: the paths listed in a manifest (one per line), or those matching a glob.
+
+    Relative manifest entries are resolved against the manifest's directory.
+    """
+    if manifest is not None:
+        with open(manifest) as f:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        base = os.path.dirname(manifest)
+        return [entry if os.path.isabs(entry) else os.path.join(base, entry) for entry in entries]
+    paths = sorted(glob.glob(pattern or os.path.join(RAW_DATA_DIR, RAW_GLOB)))
+    return [path for path in paths if os.path.basename(path) != COMBINED_RAW]
 
-    combined_df = pd.concat(dfs, ignore_index=True)
+def parse_dates(values: pd.Series) -> pd.Series:
+    """YYYY-MM-DD strings; the fixed raw format first, ISO 8601 inference only for rows it rejects."""
+    dates = pd.to_datetime(values, format=RAW_DATE_FORMAT, errors="coerce")
+    rejected = dates.isna() & values.notna()
+    if rejected.any():
+        dates[rejected] = pd.to_datetime(values[rejected], format="ISO8601", errors="coerce")
+    return dates.dt.strftime("%Y-%m-%d")
 
-    # Remove duplicates based on review text, date, and bank
-    initial_count = len(combined_df)
-    combined_df = combined_df.drop_duplicates(subset=["review", "date", "bank"], keep="first")
-    print(f"Removed {initial_count - len(combined_df)} duplicates")
+def _load_state(path: str) -> Dict[str, dict]:
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
 
-    # Handle missing data
-    combined_df = combined_df.dropna(subset=["review", "rating"])
-    print(f"Removed {initial_count - len(combined_df)} rows with missing review or rating")
+def _save_state(path: str, state: Dict[str, dict]):
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(f"{path}.tmp", path)
 
-    # Normalize dates to YYYY-MM-DD
-    combined_df["date"] = pd.to_datetime(combined_df["date"]).dt.strftime("%Y-%m-%d")
+def prefix_digest(path: str, offset: int) -> str:
+    """Digest of the first and last FINGERPRINT_BYTES of a file's first offset bytes.
 
-    # Ensure rating is integer
-    combined_df["rating"] = combined_df["rating"].astype(int)
+    Appending rows leaves it unchanged; a rewritten file (e.g. a full re-scrape)
+    changes its header or earliest rows, or the row ending at offset.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+        tail = max(0, offset - FINGERPRINT_BYTES)
+        f.seek(tail)
+        digest.update(f.read(offset - tail))
+    return digest.hexdigest()
 
-    # Verify data quality
-    print(f"\nProcessed Data Info:")
-    print(f"Total reviews: {len(combined_df)}")
-    print(f"Missing values:\n{combined_df.isnull().sum()}")
-    print(f"Reviews per bank:\n{combined_df.groupby('bank').size()}")
+def resume_offset(path: str, state: Optional[dict]) -> int:
+    """Bytes of path already cleaned, or 0 if the file was rewritten since."""
+    if not isinstance(state, dict):
+        return 0  # no state, or a bare offset from an older run that cannot be checked
+    offset = state["offset"]
+    if offset > os.path.getsize(path) or prefix_digest(path, offset) != state["digest"]:
+        return 0  # rewritten; already-cleaned rows are dropped as duplicates
+    return offset
 
-    # Save cleaned data
-    output_path = f"{PROCESSED_DATA_DIR}/cleaned_reviews.csv"
-    combined_df.to_csv(output_path, index=False)
-    print(f"Cleaned data saved to {output_path}")
+def read_raw_chunks(path: str, offset: int = 0, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Read a raw CSV in chunks with fixed dtypes, starting at a byte offset left by an earlier run."""
+    header = pd.read_csv(path, nrows=0).columns.tolist()
+    dtypes = {column: dtype for column, dtype in RAW_DTYPES.items() if column in header}
+    with open(path, "rb") as f:
+        if offset:
+            f.seek(offset)
+        options = {"names": header, "header": None} if offset else {}
+        yield from pd.read_csv(f, dtype=dtypes, chunksize=chunk_size, **options)
+
+def clean_chunk(chunk: pd.DataFrame, seen: SeenHashes) -> Tuple[pd.DataFrame, int, int]:
+    """Drop incomplete rows and reviews already seen. Returns (cleaned rows, missing dropped, duplicates dropped)."""
+    rows = len(chunk)
+    chunk = chunk.dropna(subset=["review", "rating"])
+    missing = rows - len(chunk)
+    chunk = chunk.assign(date=parse_dates(chunk["date"]), rating=chunk["rating"].astype("int8"))
+    new = seen.add_new(review_hashes(chunk))
+    return chunk[new].reindex(columns=CLEANED_COLUMNS), missing, int((~new).sum())
+
+def preprocess_reviews(
+    files: Optional[List[str]] = None,
+    incremental: bool = True,
+    chunk_size: int = CHUNK_SIZE,
+    output_csv: str = CLEANED_CSV,
+    output_parquet: str = CLEANED_PARQUET,
+    hashes_path: str = SEEN_HASHES,
+    state_path: str = STATE_PATH,
+) -> int:
+    """Clean raw review CSVs into the cleaned CSV and Parquet outputs. Returns the reviews added.
+
+    Files are read in chunks. Rows without a review or rating are dropped, and
+    dates become YYYY-MM-DD. A review whose (review, date, bank) hash was
+    already seen is dropped, whether it was seen in this run or in an earlier one.
+    With incremental=True, only bytes appended to each raw file since the last
+    run are read, and new rows are appended to the outputs. So a run costs
+    roughly the volume of new data. A raw file rewritten since the last run
+    is read again from the start. A missing output, or incremental=False,
+    rebuilds everything from the start.
+    """
+    files = discover_raw_files() if files is None else files
+    if not files:
+        print("No data files found. Please run scrape_reviews.py first.")
+        return 0
+    incremental = incremental and os.path.exists(output_csv) and os.path.exists(output_parquet)
+    if not incremental:
+        for path in (output_csv, output_parquet, hashes_path, state_path):
+            if os.path.exists(path):
+                os.remove(path)
+    state = _load_state(state_path)
+    seen = SeenHashes(hashes_path)
+    missing = duplicates = 0
+    pending_csv = f"{output_csv}.new"  # appended to output_csv only once the run completes
+    if os.path.exists(pending_csv):
+        os.remove(pending_csv)
+
+    with metrics.stage("clean") as stage, ReviewWriter(output_parquet, append=True) as writer:
+        stage.rows_in = 0
+        for path in files:
+            if not os.path.exists(path):
+                print(f"File not found: {path}")
+                continue
+            size = os.path.getsize(path)
+            offset = resume_offset(path, state.get(path))
+            if offset == size:
+                continue
+            rows = 0
+            for chunk in read_raw_chunks(path, offset, chunk_size):
+                rows += len(chunk)
+                cleaned, chunk_missing, chunk_duplicates = clean_chunk(chunk, seen)
+                missing += chunk_missing
+                duplicates += chunk_duplicates
+                if len(cleaned):
+                    cleaned.to_csv(pending_csv, mode="a", header=False, index=False)
+                    writer.write(cleaned)
+            state[path] = {"offset": size, "digest": prefix_digest(path, size)}
+            stage.rows_in += rows
+            print(f"Loaded {rows} new reviews from {path}")
+        stage.rows_out = writer.rows
+    if os.path.exists(pending_csv):
+        if not os.path.exists(output_csv):
+            pd.DataFrame(columns=CLEANED_COLUMNS).to_csv(output_csv, index=False)
+        with open(pending_csv, "rb") as source, open(output_csv, "ab") as target:
+            shutil.copyfileobj(source, target)
+        os.remove(pending_csv)
+    seen.save()
+    _save_state(state_path, state)
+
+    print(f"Removed {duplicates} duplicates")
+    print(f"Removed {missing} rows with missing review or rating")
+    print(f"Added {writer.rows} reviews; {len(seen)} cleaned reviews in total")
+    return writer.rows
 
 if __name__ == "__main__":
-    preprocess_reviews()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Clean raw review CSVs into data/processed/cleaned_reviews.*")
+    parser.add_argument("--glob", help=f"Raw CSVs to clean (default: {RAW_DATA_DIR}/{RAW_GLOB})")
+    parser.add_argument("--manifest", help="Text file listing raw CSVs, one per line")
+    parser.add_argument("--full", action="store_true", help="Rebuild the outputs from every raw row")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    preprocess_reviews(discover_raw_files(args.glob, args.manifest), incremental=not args.full, chunk_size=args.chunk_size)
+    print(f"Cleaned data saved to {CLEANED_CSV} and {CLEANED_PARQUET}")
+    print(f"Metrics written to {metrics.export('preprocess_reviews')}")
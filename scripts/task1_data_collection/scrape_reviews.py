@@ -1,8 +1,18 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
 from google_play_scraper import reviews, Sort
+from google_play_scraper.features.reviews import _ContinuationToken
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import json
+import threading
 import pandas as pd
-import os
+from scripts.common.metrics import metrics
+from scripts.common.rate_limit import RateLimiter
 
-# Define banks and their app IDs 
+# Define banks and their app IDs
 banks = [
     {"name": "Commercial Bank of Ethiopia", "app_id": "com.combanketh.mobilebanking"},
     {"name": "Bank of Abyssinia", "app_id": "com.boa.boaMobileBanking"},
@@ -13,51 +23,268 @@ banks = [
 RAW_DATA_DIR = "data/raw" # Define the directory for raw data
 os.makedirs(RAW_DATA_DIR, exist_ok=True) # Create the directory if it doesn't exist
 
+STATE_PATH = f"{RAW_DATA_DIR}/scrape_state.json" # Per-app continuation tokens and high-water marks
+PAGE_SIZE = 200 # Reviews requested per page
+PLAY_STORE_HOST = "play.google.com" # All apps are served by one host, so they share its rate limit
+
+# Same signature as google_play_scraper.reviews, so tests can inject a local fake
+FetchReviews = Callable[..., Tuple[List[dict], Optional[_ContinuationToken]]]
+
+def raw_csv_path(bank_name: str) -> str:
+    """Path of a bank's raw review CSV."""
+    return f"{RAW_DATA_DIR}/{bank_name.lower().replace(' ', '_')}_reviews_raw.csv"
+
+def to_record(bank_name: str, review: dict) -> dict:
+    """Convert a google_play_scraper review into a raw CSV row."""
+    return {
+        "bank": bank_name,
+        "review": review["content"],
+        "rating": review["score"],
+        "date": review["at"],
+        "source": "Google Play",
+        "review_id": review.get("reviewId")
+    }
+
+def high_water_mark(page: List[dict]) -> Optional[dict]:
+    """Newest timestamp in a page plus every review id sharing it, to detect already-seen reviews."""
+    if not page:
+        return None
+    newest = max(review["at"] for review in page)
+    return {
+        "at": newest.isoformat(),
+        "review_ids": [review.get("reviewId") for review in page if review["at"] == newest]
+    }
+
+def is_seen(review: dict, mark: dict) -> bool:
+    """Whether a review is at or before the high-water mark."""
+    at = review["at"].isoformat()
+    return at < mark["at"] or (at == mark["at"] and review.get("reviewId") in mark["review_ids"])
+
+def token_to_state(token: _ContinuationToken) -> dict:
+    """Serialize a continuation token so an interrupted scrape can resume."""
+    return {slot: getattr(token, slot) for slot in _ContinuationToken.__slots__}
+
+def token_from_state(state: dict) -> _ContinuationToken:
+    """Rebuild a continuation token saved by token_to_state."""
+    return _ContinuationToken(**{slot: state[slot] for slot in _ContinuationToken.__slots__})
+
+class ScrapeState:
+    """Thread-safe JSON store of per-app continuation tokens and high-water marks."""
+
+    def __init__(self, path: str = STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.apps: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.apps = json.load(f)
+
+    def get(self, app_id: str) -> Optional[dict]:
+        with self._lock:
+            return self.apps.get(app_id)
+
+    def update(self, app_id: str, **fields):
+        """Merge fields into an app's state and write the file atomically."""
+        with self._lock:
+            self.apps.setdefault(app_id, {}).update(fields)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.apps, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+def fetch_review_pages(
+    app_id: str,
+    fetch: FetchReviews = reviews,
+    page_size: int = PAGE_SIZE,
+    max_reviews: Optional[int] = None,
+    continuation_token: Optional[_ContinuationToken] = None,
+    limiter: Optional[RateLimiter] = None,
+    sort: Sort = Sort.NEWEST,
+) -> Iterator[Tuple[List[dict], Optional[_ContinuationToken]]]:
+    """Yield (page, continuation token) until the history or max_reviews is exhausted."""
+    fetched = 0
+    while max_reviews is None or fetched < max_reviews:
+        count = page_size if max_reviews is None else min(page_size, max_reviews - fetched)
+        if limiter is not None:
+            limiter.acquire()
+        with metrics.timer("scrape_page_seconds", app=app_id):
+            page, continuation_token = fetch(
+                app_id,
+                lang="en",
+                country="et",
+                sort=sort,
+                count=count,
+                continuation_token=continuation_token
+            )
+        metrics.increment("scrape_pages_total", app=app_id)
+        metrics.increment("scrape_reviews_total", len(page), app=app_id)
+        fetched += len(page)
+        yield page, continuation_token
+        if not page or continuation_token is None or continuation_token.token is None:
+            break
+
 # Function to scrape reviews from Google Play Store
-def scrape_reviews(bank_name, app_id, count=400):
+def scrape_reviews(bank_name, app_id, count=400, fetch: FetchReviews = reviews):
     """Scrape reviews for a given app from Google Play Store."""
     try: # Attempt to scrape reviews
-        result = reviews(
-            app_id,
-            lang="en",
-            country="et",
-            sort=Sort.NEWEST,
-            count=count
-        )[0]
-        reviews_data = [
-            {
-                "bank": bank_name,
-                "review": review["content"],
-                "rating": review["score"],
-                "date": review["at"],
-                "source": "Google Play"
-            }
-            for review in result
-        ]
+        reviews_data = []
+        for page, _ in fetch_review_pages(app_id, fetch=fetch, max_reviews=count): # Follow continuation tokens up to count
+            reviews_data.extend(to_record(bank_name, review) for review in page)
         return reviews_data
     except Exception as e:
         print(f"Error scraping {bank_name}: {e}")
         return []
+
+def scrape_app(
+    bank: dict,
+    state: ScrapeState,
+    fetch: FetchReviews = reviews,
+    limiter: Optional[RateLimiter] = None,
+    page_size: int = PAGE_SIZE,
+    max_reviews: Optional[int] = None,
+    resume: bool = True,
+) -> int:
+    """Page through one app's reviews, appending each page to its raw CSV.
+
+    The continuation token is saved after every page, so with resume=True an
+    interrupted scrape continues where it stopped instead of starting over.
+    Returns the number of reviews in the raw CSV for this scrape.
+    """
+    app_id = bank["app_id"]
+    output_path = raw_csv_path(bank["name"])
+    saved = state.get(app_id) if resume else None
+    if saved and not saved.get("complete") and saved.get("token") and os.path.exists(output_path):
+        token = token_from_state(saved["token"])
+        scraped = saved.get("scraped", 0)
+        print(f"Resuming {bank['name']} after {scraped} reviews...")
+    else:
+        token = None
+        scraped = 0
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+    remaining = None if max_reviews is None else max(max_reviews - scraped, 0)
+    fresh = token is None
+    try:
+        for page, token in fetch_review_pages(
+            app_id, fetch=fetch, page_size=page_size, max_reviews=remaining,
+            continuation_token=token, limiter=limiter
+        ):
+            if fresh and page: # The first NEWEST page of a fresh scrape holds the high-water mark
+                state.update(app_id, high_water=high_water_mark(page))
+                fresh = False
+            if page:
+                df = pd.DataFrame([to_record(bank["name"], review) for review in page])
+                df.to_csv(output_path, mode="a", header=not os.path.exists(output_path), index=False)
+                scraped += len(page)
+            state.update(
+                app_id,
+                token=token_to_state(token) if token is not None else None,
+                scraped=scraped,
+                complete=False
+            )
+    except Exception as e:
+        print(f"Error scraping {bank['name']} after {scraped} reviews (resumable): {e}")
+        return scraped
+
+    state.update(app_id, token=None, scraped=scraped, complete=True)
+    return scraped
+
+def scrape_app_incremental(
+    bank: dict,
+    state: ScrapeState,
+    fetch: FetchReviews = reviews,
+    limiter: Optional[RateLimiter] = None,
+    page_size: int = PAGE_SIZE,
+) -> int:
+    """Fetch NEWEST pages only until reaching the high-water mark, appending new reviews to the raw CSV.
+
+    Cost is proportional to the number of new reviews rather than the history
+    size. Apps without a completed full scrape fall back to scrape_app, which
+    resumes an unfinished one. Returns the number of new reviews appended.
+    """
+    app_id = bank["app_id"]
+    saved = state.get(app_id) or {}
+    mark = saved.get("high_water")
+    if not saved.get("complete") or not mark or not os.path.exists(raw_csv_path(bank["name"])):
+        return scrape_app(bank, state, fetch, limiter, page_size)
+
+    new_reviews = []
+    try:
+        for page, _ in fetch_review_pages(app_id, fetch=fetch, page_size=page_size, limiter=limiter):
+            unseen = [review for review in page if not is_seen(review, mark)]
+            new_reviews.extend(unseen)
+            if len(unseen) < len(page): # Reached reviews from an earlier run
+                break
+    except Exception as e:
+        print(f"Error refreshing {bank['name']} after {len(new_reviews)} new reviews: {e}")
+        return 0
+
+    if new_reviews:
+        output_path = raw_csv_path(bank["name"])
+        columns = pd.read_csv(output_path, nrows=0).columns # Match the store's existing column order
+        df = pd.DataFrame([to_record(bank["name"], review) for review in new_reviews])
+        df.reindex(columns=columns).to_csv(output_path, mode="a", header=False, index=False)
+        state.update(
+            app_id,
+            high_water=high_water_mark(new_reviews),
+            scraped=saved.get("scraped", 0) + len(new_reviews)
+        )
+    return len(new_reviews)
+
+def scrape_all(
+    banks: List[dict] = banks,
+    fetch: FetchReviews = reviews,
+    max_workers: int = 4,
+    rate_per_second: float = 2.0,
+    page_size: int = PAGE_SIZE,
+    max_reviews: Optional[int] = None,
+    resume: bool = True,
+    state_path: str = STATE_PATH,
+    incremental: bool = False,
+) -> Dict[str, int]:
+    """Scrape every app concurrently, sharing one rate limit per host. Returns {bank name: reviews}.
+
+    With incremental=True only reviews newer than each app's high-water mark
+    are fetched and the counts are of new reviews.
+    """
+    state = ScrapeState(state_path)
+    limiters = {PLAY_STORE_HOST: RateLimiter(rate_per_second)}
+    with metrics.stage("scrape") as stage, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            bank["name"]: (
+                executor.submit(scrape_app_incremental, bank, state, fetch, limiters[PLAY_STORE_HOST], page_size)
+                if incremental else
+                executor.submit(
+                    scrape_app, bank, state, fetch, limiters[PLAY_STORE_HOST], page_size, max_reviews, resume
+                )
+            )
+            for bank in banks
+        }
+        counts = {name: future.result() for name, future in futures.items()}
+        stage.rows_out = sum(counts.values())
+    return counts
+
 # Main function to scrape reviews for all banks and save to CSV
 def main():
     """Scrape reviews for all banks and save to CSV."""
+    print(f"Scraping reviews for {len(banks)} apps...") # Log the number of apps being processed
+    counts = scrape_all(banks, incremental=True) # Fetch only new reviews; full (resumable) scrape on first run
     all_reviews = []
     for bank in banks: # Iterate through each bank
-        print(f"Scraping reviews for {bank['name']}...") # Log the bank being processed
-        reviews_data = scrape_reviews(bank["name"], bank["app_id"], count=400) # Scrape reviews for the bank
-        if reviews_data: # If reviews were successfully scraped
-            df = pd.DataFrame(reviews_data) # Convert to DataFrame
-            df.to_csv(f"{RAW_DATA_DIR}/{bank['name'].lower().replace(' ', '_')}_reviews_raw.csv", index=False) # Save individual bank reviews to CSV
-            all_reviews.extend(reviews_data) # Add to combined list
-            print(f"Saved {len(reviews_data)} reviews for {bank['name']}") # Log the number of reviews saved
+        print(f"Added {counts[bank['name']]} new reviews for {bank['name']}") # Log the number of reviews saved
+        if os.path.exists(raw_csv_path(bank["name"])): # If the bank has an accumulated store
+            all_reviews.append(pd.read_csv(raw_csv_path(bank["name"]))) # Add to combined list
         else:
             print(f"No reviews scraped for {bank['name']}") # If no reviews were scraped, log it
 
     # Save combined raw reviews
     if all_reviews: # If there are any reviews collected
-        combined_df = pd.DataFrame(all_reviews) # Convert to DataFrame
+        combined_df = pd.concat(all_reviews, ignore_index=True) # Combine per-bank DataFrames
         combined_df.to_csv(f"{RAW_DATA_DIR}/all_reviews_raw.csv", index=False) # Save all reviews to a combined CSV
-        print(f"Saved {len(all_reviews)} total reviews") # Log the total number of reviews saved
+        print(f"Saved {len(combined_df)} total reviews") # Log the total number of reviews saved
+    metrics_path = metrics.export("scrape_reviews") # Per-stage timings and counters for this run
+    print(f"Metrics written to {metrics_path}")
 # Run the main function
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,86 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+import pytest
+from scripts.analysis.aggregate_store import AggregateStore
+from scripts.common import storage
+from scripts.common.storage import write_reviews
+
+@pytest.fixture
+def store(tmp_path):
+    store = AggregateStore(str(tmp_path / "aggregates.sqlite"))
+    yield store
+    store.close()
+
+def _batch(dates, labels, themes=None, reviews=None):
+    n = len(dates)
+    return pd.DataFrame({
+        "bank": ["Dashen Bank"] * n,
+        "review": reviews or [f"{label} review {i}" for i, label in enumerate(labels)],
+        "date": dates,
+        "rating": [5] * n,
+        "distilbert_label": labels,
+        "distilbert_score": [0.9] * n,
+        "themes": themes or [["General"]] * n,
+    })
+
+def test_merge_is_incremental_and_idempotent(store):
+    first = _batch(["2025-06-01", "2025-06-01"], ["positive", "negative"])
+    assert store.merge(first, batch_id="day-1")
+    assert not store.merge(first, batch_id="day-1")
+    assert store.merge(_batch(["2025-06-01"], ["positive"], [["Loan Services"]], ["Easy loans"]))
+    # A later, larger chunk of the same file only adds the reviews not counted yet
+    grown = pd.concat([first, _batch(["2025-06-01"], ["positive"], reviews=["Fast"])], ignore_index=True)
+    assert store.merge(grown)
+
+    summary = store.window_summary(days=7).iloc[0]
+    assert (summary["reviews"], summary["positive"], summary["negative"]) == (4, 3, 1)
+    assert summary["net_sentiment"] == pytest.approx(2 / 4)
+    assert summary["mean_score"] == pytest.approx(0.9)
+    assert store.theme_counts(days=7).set_index("theme")["reviews"].to_dict() == {"General": 3, "Loan Services": 1}
+
+def test_rolling_windows_span_calendar_days(store):
+    store.merge(_batch(["2025-06-01", "2025-06-03", "2025-06-10"], ["positive", "negative", "positive"]))
+    trend = store.rolling_sentiment(window_days=7).set_index("day")
+    assert trend.loc["2025-06-02", "reviews"] == 1
+    assert trend.loc["2025-06-07", "reviews"] == 2
+    assert trend.loc["2025-06-08", "reviews"] == 1  # 2025-06-01 has left the window
+    assert trend.loc["2025-06-09", "net_sentiment"] == pytest.approx(-1.0)
+    assert trend.loc["2025-06-10", "net_sentiment"] == pytest.approx(1.0)
+    assert store.rolling_sentiment(window_days=30, start="2025-06-10")["reviews"].tolist() == [3]
+
+def test_rebuild_replaces_aggregates_in_one_transaction(store, tmp_path):
+    store.merge(_batch(["2025-06-01"], ["positive"]))
+    reader = AggregateStore(str(tmp_path / "aggregates.sqlite"))
+
+    def batches():
+        yield _batch(["2025-06-02"], ["negative"])
+        # Mid-rebuild, another connection still sees the complete old aggregates
+        assert reader.window_summary(days=7)["reviews"].tolist() == [1]
+        assert reader.last_day() == "2025-06-01"
+        yield _batch(["2025-06-03"], ["negative"])
+
+    assert store.rebuild(batches()) == 2
+    assert reader.window_summary(days=7)["negative"].tolist() == [2]
+    reader.close()
+
+def test_sync_merges_appended_rows_and_rebuilds_relabelled_files(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "ROW_GROUP_SIZE", 2)
+    path = str(tmp_path / "thematic.parquet")
+    reviews = _batch(["2025-06-01", "2025-06-01", "2025-06-02"], ["positive", "negative", "positive"])
+    write_reviews(reviews, path)
+    assert store.sync(path) == 2
+    assert store.sync(path) == 0
+
+    appended = pd.concat([reviews, _batch(["2025-06-02"], ["negative"], reviews=["Slow"])], ignore_index=True)
+    write_reviews(appended, path)
+    assert store.sync(path) == 1  # only the grown last row group
+    assert store.window_summary(days=7)[["reviews", "negative"]].values.tolist() == [[4, 2]]
+
+    relabelled = appended.assign(distilbert_label=["positive"] * 4)
+    write_reviews(relabelled, path)
+    assert store.sync(path) == 2  # an earlier row changed, so everything is rebuilt
+    summary = store.window_summary(days=7).iloc[0]
+    assert (summary["reviews"], summary["positive"], summary["negative"]) == (4, 4, 0)
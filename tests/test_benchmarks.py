@@ -0,0 +1,42 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.run_benchmarks import compare, run_suite
+from benchmarks.synthetic import REAL_BANKS, add_sentiment_columns, generate_reviews
+from scripts.analysis.preprocess_nlp import AMHARIC_REGEX, is_amharic
+
+def test_generate_reviews_is_seeded():
+    first = generate_reviews(500, n_banks=10, seed=7)
+    assert first.equals(generate_reviews(500, n_banks=10, seed=7))
+    assert not first["review"].equals(generate_reviews(500, n_banks=10, seed=8)["review"])
+    assert len(first) == 500
+    assert set(REAL_BANKS) <= set(first["bank"])
+    assert first["bank"].nunique() == 10
+    assert first["rating"].between(1, 5).all()
+    assert first["review_id"].is_unique
+
+def test_generate_reviews_language_mix():
+    df = generate_reviews(2000, seed=1, language_mix={"english": 0.5, "geez": 0.25, "transliterated": 0.25})
+    geez = df["review"].str.contains(AMHARIC_REGEX)
+    amharic = df["review"].map(is_amharic)
+    assert 0.15 < geez.mean() < 0.35
+    assert 0.35 < (amharic & ~geez).mean() + geez.mean() < 0.65
+
+def test_run_suite_reports_throughput_and_memory():
+    report = run_suite(["aggregate_sentiment", "load_reviews_sqlite"], [300], n_banks=5, isolate=False)
+    assert report["meta"]["seed"] == 0
+    assert [(result["stage"], result["rows"]) for result in report["results"]] == [
+        ("aggregate_sentiment", 300), ("load_reviews_sqlite", 300)
+    ]
+    for result in report["results"]:
+        assert result["rows_per_sec"] > 0
+        assert result["peak_rss_mb"] > 0
+
+    comparison = compare(report, report)
+    assert [row["speedup"] for row in comparison] == [1.0, 1.0]
+
+def test_add_sentiment_columns_labels_match_scores():
+    df = add_sentiment_columns(generate_reviews(200))
+    assert (df.loc[df["vader_score"] >= 0.05, "vader_label"] == "positive").all()
+    assert (df.loc[df["vader_score"] <= -0.05, "vader_label"] == "negative").all()
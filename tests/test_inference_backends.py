@@ -0,0 +1,84 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from scripts.analysis.inference_backends import (
+    _load_model, cache_revision, load_pipeline, parity_check, quantize_torch
+)
+
+@pytest.fixture
+def tiny_model_dir(tmp_path):
+    """A randomly initialised two-label DistilBERT saved locally, so nothing is downloaded."""
+    import torch
+    from transformers import BertTokenizerFast, DistilBertConfig, DistilBertForSequenceClassification
+    torch.manual_seed(0)
+    words = ["good", "bad", "app", "bank", "slow", "fast", "transfer", "great", "worst", "money"]
+    (tmp_path / "vocab.txt").write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *words]))
+    BertTokenizerFast(vocab_file=str(tmp_path / "vocab.txt")).save_pretrained(str(tmp_path))
+    config = DistilBertConfig(
+        vocab_size=len(words) + 5, dim=32, n_layers=1, n_heads=2, hidden_dim=64,
+        id2label={0: "NEGATIVE", 1: "POSITIVE"}, label2id={"NEGATIVE": 0, "POSITIVE": 1},
+    )
+    DistilBertForSequenceClassification(config).save_pretrained(str(tmp_path))
+    return str(tmp_path)
+
+def fake_pipe(labels):
+    return lambda texts, **kwargs: [{"label": labels[text], "score": 0.9} for text in texts]
+
+def test_parity_check_reports_agreement_and_drift():
+    reference = fake_pipe({"a": "POSITIVE", "b": "NEGATIVE"})
+    candidate = fake_pipe({"a": "POSITIVE", "b": "POSITIVE"})
+    report = parity_check(["a", "b", ""], candidate, reference, batch_size=1)
+    assert report["texts"] == 2
+    assert report["label_agreement"] == 0.5
+    assert report["max_score_drift"] == pytest.approx(0.8)
+    assert report["mean_score_drift"] == pytest.approx(0.4)
+
+def test_cache_revision_separates_backends():
+    commit = "0123456789abcdef0123456789abcdef01234567"
+    assert cache_revision("pytorch", revision=commit) == commit
+    backends = ["pytorch", "pytorch-int8", "onnx", "onnx-int8"]
+    assert len({cache_revision(backend, revision=commit) for backend in backends}) == 4
+
+def test_cache_revision_follows_local_weights(tiny_model_dir):
+    import torch
+    from transformers import DistilBertForSequenceClassification
+    before = cache_revision("pytorch", tiny_model_dir)
+    assert cache_revision("pytorch", tiny_model_dir) == before
+    assert cache_revision("pytorch-int8", tiny_model_dir) == f"{before}+pytorch-int8"
+
+    model = DistilBertForSequenceClassification.from_pretrained(tiny_model_dir)
+    with torch.no_grad():
+        model.classifier.bias.add_(1.0)
+    model.save_pretrained(tiny_model_dir)
+    assert cache_revision("pytorch", tiny_model_dir) != before
+
+def test_load_pipeline_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        load_pipeline("tensorrt")
+    with pytest.raises(ValueError):
+        load_pipeline("onnx")  # needs a local model directory
+
+def test_quantize_torch_replaces_linear_layers(tiny_model_dir):
+    import torch
+    model, tokenizer = _load_model(tiny_model_dir)
+    quantized = quantize_torch(model)
+    assert not any(type(module) is torch.nn.Linear for module in quantized.modules())
+    inputs = tokenizer(["good app", "worst bank transfer"], padding=True, return_tensors="pt")
+    with torch.no_grad():
+        reference = torch.softmax(model(**inputs).logits, dim=-1)
+        candidate = torch.softmax(quantized(**inputs).logits, dim=-1)
+    assert torch.allclose(reference, candidate, atol=0.05)
+
+def test_onnx_int8_matches_pytorch(tiny_model_dir):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnx")
+    from scripts.analysis.inference_backends import OnnxSentimentPipeline, quantize_onnx
+    quantize_onnx(tiny_model_dir)
+    texts = ["good app", "worst bank transfer", "slow money"]
+    for quantized in [False, True]:
+        report = parity_check(
+            texts, OnnxSentimentPipeline(tiny_model_dir, quantized=quantized), load_pipeline("pytorch", tiny_model_dir)
+        )
+        assert report["max_score_drift"] < 0.05
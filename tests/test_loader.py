@@ -0,0 +1,93 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sqlite3
+import pandas as pd
+import pytest
+from scripts.database.loader import connect_sqlite, get_watermark, load_reviews, upsert_reviews
+
+@pytest.fixture
+def connection():
+    connection = connect_sqlite()
+    yield connection
+    connection.close()
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame({
+        "bank": ["Dashen Bank", "Bank of Abyssinia", "Dashen Bank", "Dashen Bank"],
+        "review": ["Great app", "Too slow", "x" * 1001, "Works fine"],
+        "rating": [5, 2, 4, 9],
+        "date": ["2025-06-01", "2025-06-02", "2025-06-03", "2025-06-04"],
+    })
+
+def test_load_reviews_collects_bad_rows_without_aborting(connection, sample_df):
+    result = load_reviews(connection, sample_df, batch_size=3)
+    assert result.inserted == 2
+    assert [offset for offset, _ in result.failed] == [2, 3]
+    rows = connection.execute(
+        "SELECT b.bank_name, r.review_text, r.rating, r.review_date FROM reviews r "
+        "JOIN banks b ON b.bank_id = r.bank_id ORDER BY r.review_id"
+    ).fetchall()
+    assert rows == [
+        ("Dashen Bank", "Great app", 5, "2025-06-01"),
+        ("Bank of Abyssinia", "Too slow", 2, "2025-06-02"),
+    ]
+
+def test_load_reviews_reuses_existing_banks(connection, sample_df):
+    load_reviews(connection, sample_df.iloc[:2], assign_ids=True)
+    load_reviews(connection, sample_df.iloc[:2], assign_ids=True)
+    assert connection.execute("SELECT COUNT(*) FROM banks").fetchone()[0] == 2
+    assert connection.execute("SELECT MAX(review_id) FROM reviews").fetchone()[0] == 4
+
+def test_upsert_reviews_is_idempotent(connection, sample_df):
+    valid = sample_df.iloc[:2]
+    first = upsert_reviews(connection, valid)
+    second = upsert_reviews(connection, valid, incremental=False)
+    assert (first.inserted, second.inserted, second.unchanged) == (2, 0, 2)
+    assert connection.execute("SELECT COUNT(*) FROM reviews").fetchone()[0] == 2
+
+def test_upsert_reviews_merges_a_repeated_fingerprint_once(connection, sample_df):
+    repeated = pd.concat([sample_df.iloc[:2], sample_df.iloc[:1].assign(rating=3)], ignore_index=True)
+    result = upsert_reviews(connection, repeated, batch_size=10)
+    assert (result.inserted, result.unchanged, result.failed) == (2, 0, [])
+    ratings = connection.execute("SELECT review_text, rating FROM reviews ORDER BY review_text").fetchall()
+    assert ratings == [("Great app", 3), ("Too slow", 2)]
+
+def test_upsert_reviews_updates_changed_rows_and_skips_before_watermark(connection, sample_df):
+    upsert_reviews(connection, sample_df.iloc[:2])
+    assert get_watermark(connection, "cleaned_reviews") == "2025-06-02"
+    changed = sample_df.iloc[:2].assign(rating=[4, 1])
+    result = upsert_reviews(connection, changed)
+    # Only the row on the watermark day is re-merged
+    assert (result.inserted, result.unchanged) == (1, 0)
+    ratings = connection.execute("SELECT rating FROM reviews ORDER BY review_id").fetchall()
+    assert ratings == [(5,), (1,)]
+
+def test_upsert_reviews_backfills_existing_rows(connection, sample_df):
+    load_reviews(connection, sample_df.iloc[:1])
+    result = upsert_reviews(connection, sample_df.iloc[:2])
+    assert result.inserted == 1
+    assert connection.execute("SELECT COUNT(*) FROM reviews").fetchone()[0] == 2
+
+def test_schema_upgrade_removes_duplicate_legacy_rows(tmp_path):
+    path = str(tmp_path / "legacy.sqlite")
+    legacy = sqlite3.connect(path)  # a table written by the old loader: no fingerprints, reruns left duplicates
+    legacy.executescript("""
+        CREATE TABLE banks (bank_id INTEGER PRIMARY KEY, bank_name TEXT NOT NULL UNIQUE);
+        CREATE TABLE reviews (review_id INTEGER PRIMARY KEY, bank_id INTEGER, review_text TEXT,
+                              rating INTEGER, review_date TEXT);
+        INSERT INTO banks VALUES (1, 'Dashen Bank');
+        INSERT INTO reviews VALUES (7, 1, 'Great app', 5, '2025-06-01'), (3, 1, 'Great app', 5, '2025-06-01'),
+                                   (5, 1, 'Too slow', 2, '2025-06-02'), (9, 1, 'Great app', 5, '2025-06-01');
+    """)
+    legacy.close()
+
+    connection = connect_sqlite(path)
+    assert connection.execute("SELECT review_id FROM reviews ORDER BY review_id").fetchall() == [(3,), (5,)]
+    result = upsert_reviews(connection, pd.DataFrame({
+        "bank": ["Dashen Bank"], "review": ["Great app"], "rating": [5], "date": ["2025-06-01"]
+    }))
+    assert (result.inserted, result.unchanged) == (0, 1)
+    connection.close()
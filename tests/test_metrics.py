@@ -0,0 +1,80 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from scripts.common.metrics import Metrics, cprofile_hook, metrics, reset_peak_rss
+from scripts.database.loader import connect_sqlite, upsert_reviews
+
+def test_stage_accumulates_runs():
+    collector = Metrics()
+    for rows in [10, 20]:
+        with collector.stage("tokenize", rows_in=rows) as stage:
+            stage.rows_out = rows - 1
+    (stats,) = collector.snapshot()["stages"]
+    assert stats["name"] == "tokenize"
+    assert (stats["calls"], stats["rows_in"], stats["rows_out"]) == (2, 30, 28)
+    assert stats["wall_seconds"] >= 0
+    peak = collector.snapshot()["process"]["peak_rss_mb"]
+    assert peak is None or peak > 0
+    assert stats["peak_rss_mb"] is None or 0 < stats["peak_rss_mb"] <= peak
+
+@pytest.mark.skipif(not reset_peak_rss(), reason="the RSS high-water mark can only be reset on Linux")
+def test_stage_peak_rss_covers_only_that_stage():
+    collector = Metrics()
+    with collector.stage("allocate"):
+        block = np.ones(64 * 1024 * 1024, dtype=np.uint8)  # 64 MiB, touched so it is resident
+        del block
+    with collector.stage("small"):
+        pass
+    stages = {stage["name"]: stage for stage in collector.snapshot()["stages"]}
+    assert stages["allocate"]["peak_rss_mb"] - stages["small"]["peak_rss_mb"] > 48
+    assert collector.snapshot()["process"]["peak_rss_mb"] >= stages["allocate"]["peak_rss_mb"]
+
+def test_latency_percentiles_and_hit_rate():
+    collector = Metrics()
+    for i in range(1, 101):
+        collector.observe("inference_seconds", i / 1000, model="m")
+    collector.increment("cache_hits_total", 3)
+    collector.increment("cache_misses_total", 1)
+    (latency,) = collector.snapshot()["latencies"]
+    assert latency["labels"] == {"model": "m"}
+    assert latency["count"] == 100
+    assert abs(latency["p50"] - 0.0505) < 1e-9
+    assert latency["p99"] <= 0.1
+    assert collector.hit_rate("cache_hits_total", "cache_misses_total") == 0.75
+
+def test_prometheus_and_json_export(tmp_path):
+    collector = Metrics()
+    with collector.stage("scrape", app='com."quoted"'):
+        collector.increment("scrape_pages_total", app="a")
+        collector.observe("scrape_page_seconds", 0.5)
+    json_path = collector.export("nightly", prometheus_path=str(tmp_path / "nightly.prom"),
+                                 json_path=str(tmp_path / "nightly.json"))
+    with open(json_path) as f:
+        assert json.load(f)["counters"][0]["value"] == 1
+    text = (tmp_path / "nightly.prom").read_text()
+    assert '# TYPE pipeline_scrape_pages_total counter' in text
+    assert 'pipeline_scrape_pages_total{app="a"} 1' in text
+    assert 'pipeline_stage_calls{app="com.\\"quoted\\"",stage="scrape"} 1' in text
+    assert 'pipeline_scrape_page_seconds{quantile="0.5"} 0.5' in text
+    assert 'pipeline_scrape_page_seconds_count 1' in text
+
+def test_cprofile_hook_writes_stats(tmp_path):
+    collector = Metrics(profiler=cprofile_hook(str(tmp_path)))
+    with collector.stage("themes"):
+        sum(range(1000))
+    assert os.listdir(tmp_path) == ["themes-0.prof"]
+
+def test_loader_records_db_stage():
+    metrics.reset()
+    connection = connect_sqlite()
+    upsert_reviews(connection, pd.DataFrame({
+        "bank": ["Dashen Bank"] * 3, "review": ["a", "b", "c"], "rating": [5, 4, 3], "date": ["2025-01-01"] * 3,
+    }))
+    stages = {stage["name"]: stage for stage in metrics.snapshot()["stages"]}
+    assert stages["db_upsert"]["rows_out"] == 3
+    assert stages["db_upsert"]["rows_per_sec"] > 0
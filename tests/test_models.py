@@ -0,0 +1,54 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import subprocess
+import threading
+import pytest
+from scripts.common.models import ModelRegistry
+
+def test_model_loads_once_on_first_use():
+    registry = ModelRegistry()
+    loads = []
+    started = threading.Event()
+
+    def factory():
+        loads.append(1)
+        started.wait(1)
+        return object()
+
+    registry.register("model", factory)
+    assert not registry.is_loaded("model")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("model"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started.set()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert all(result is results[0] for result in results)
+
+def test_unload_and_warm_up():
+    registry = ModelRegistry()
+    registry.register("a", object)
+    registry.register("b", object)
+    first = registry.get("a")
+    registry.unload("a")
+    assert registry.get("a") is not first
+    assert set(registry.warm_up()) == {"a", "b"}
+    assert registry.is_loaded("b")
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+def test_analysis_modules_import_without_loading_models():
+    code = (
+        "import sys\n"
+        "import scripts.analysis.thematic_analysis, scripts.analysis.sentiment_analysis, scripts.analysis.preprocess_nlp\n"
+        "print(sorted(name for name in ['spacy', 'torch', 'transformers', 'sklearn', 'deep_translator']"
+        " if name in sys.modules))\n"
+    )
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    env = {**os.environ, "PYTHONPATH": root}
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, cwd=root)
+    assert output.stdout.strip() == "[]", output.stderr
@@ -0,0 +1,61 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+import pytest
+from scripts.analysis.near_duplicates import NearDuplicateIndex, flag_near_duplicates, minhash_signatures
+
+SPAM = "Best bank app ever!!! Download now and get free airtime, visit the link in my profile today"
+
+@pytest.fixture
+def index(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "index.sqlite"))
+    yield index
+    index.close()
+
+def _reviews(texts, start=0):
+    return pd.DataFrame({
+        "bank": ["Dashen Bank"] * len(texts),
+        "review": texts,
+        "date": [f"2025-06-{i + 1:02d}" for i in range(start, start + len(texts))],
+    })
+
+def test_signatures_estimate_jaccard():
+    signatures, valid = minhash_signatures([SPAM, SPAM.lower() + " ", "Transfers fail every morning", ""])
+    assert valid.tolist() == [True, True, True, False]
+    assert np.array_equal(signatures[0], signatures[1])
+    assert np.mean(signatures[0] == signatures[2]) < 0.2
+
+def test_streaming_batches_cluster_edited_copies(index):
+    first = flag_near_duplicates(_reviews([SPAM, "Transfers fail every morning since the update"]), index)
+    assert first["near_duplicate"].tolist() == [False, False]
+
+    edited = SPAM.replace("today", "now!!")
+    second = flag_near_duplicates(_reviews([edited, "Loan was approved quickly", ""], start=2), index)
+    assert second["near_duplicate"].tolist() == [True, False, False]
+    assert second["duplicate_cluster"].iloc[0] == first["duplicate_cluster"].iloc[0]
+    assert second["duplicate_cluster"].iloc[2] == -1
+
+    replay = flag_near_duplicates(_reviews([SPAM, "Transfers fail every morning since the update"]), index)
+    assert replay["near_duplicate"].tolist() == [False, False]
+    assert index.clusters()["size"].tolist() == [2]
+
+    collapsed = flag_near_duplicates(_reviews([edited, "Loan was approved quickly", ""], start=2), index, collapse=True)
+    assert collapsed["review"].tolist() == ["Loan was approved quickly", ""]
+
+def test_clusters_stay_within_a_bank_and_skip_short_texts(index):
+    reviews = pd.DataFrame({
+        "bank": ["Commercial Bank of Ethiopia", "Dashen Bank", "Bank of Abyssinia", "Dashen Bank", "Dashen Bank",
+                 "Dashen Bank"],
+        "review": ["Good app", "Good app", "Good app!", "good app", SPAM, SPAM.upper()],
+        "date": ["2025-06-01", "2025-06-02", "2025-06-03", "2025-06-04", "2025-06-05", "2025-06-06"],
+    })
+    flagged = flag_near_duplicates(reviews, index)
+    assert flagged["near_duplicate"].tolist() == [False, False, False, False, False, True]
+    assert flagged["duplicate_cluster"].tolist()[:4] == [-1, -1, -1, -1]
+
+    other_bank = flag_near_duplicates(reviews.iloc[[4]].assign(bank="Bank of Abyssinia", date="2025-06-07"), index)
+    assert not other_bank["near_duplicate"].iloc[0]
+    assert other_bank["duplicate_cluster"].iloc[0] != flagged["duplicate_cluster"].iloc[4]
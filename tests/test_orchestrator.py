@@ -0,0 +1,65 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from scripts.orchestrator import PROJECT_ROOT, Orchestrator, Stage, project_modules
+
+@pytest.fixture
+def toy_stages(tmp_path):
+    """source -> upper -> (count, shout); count and shout are independent."""
+    calls = []
+    paths = {name: str(tmp_path / f"{name}.txt") for name in ["source", "upper", "count", "shout"]}
+    with open(paths["source"], "w") as f:
+        f.write("hello")
+
+    def step(name, source, transform):
+        def run():
+            calls.append(name)
+            with open(paths[source]) as src, open(paths[name], "w") as dst:
+                dst.write(transform(src.read()))
+        return run
+
+    config = {"suffix": "!"}
+    stages = [
+        Stage("upper", step("upper", "source", str.upper), inputs=[paths["source"]], outputs=[paths["upper"]]),
+        Stage("count", step("count", "upper", lambda text: str(len(text))),
+              inputs=[paths["upper"]], outputs=[paths["count"]]),
+        Stage("shout", step("shout", "upper", lambda text: text + config["suffix"]),
+              inputs=[paths["upper"]], outputs=[paths["shout"]], config=config),
+    ]
+    return stages, calls, paths, str(tmp_path / "state.json")
+
+def test_runs_in_dependency_order_then_skips(toy_stages):
+    stages, calls, paths, state_path = toy_stages
+    assert Orchestrator(stages, state_path).run() == {"upper": True, "count": True, "shout": True}
+    assert calls[0] == "upper"
+    assert Orchestrator(stages, state_path).run() == {"upper": False, "count": False, "shout": False}
+
+def test_config_change_reruns_only_that_stage(toy_stages):
+    stages, calls, paths, state_path = toy_stages
+    Orchestrator(stages, state_path).run()
+    calls.clear()
+    stages[2].config["suffix"] = "?"
+    Orchestrator(stages, state_path).run()
+    assert calls == ["shout"]
+    with open(paths["shout"]) as f:
+        assert f.read() == "HELLO?"
+
+def test_input_change_reruns_downstream(toy_stages):
+    stages, calls, paths, state_path = toy_stages
+    Orchestrator(stages, state_path).run()
+    calls.clear()
+    with open(paths["source"], "w") as f:
+        f.write("bye")
+    Orchestrator(stages, state_path).run(["count"])
+    assert calls == ["upper", "count"]
+
+def test_project_modules_follow_imports_transitively():
+    modules = {os.path.relpath(path, PROJECT_ROOT).replace(os.sep, "/")
+               for path in project_modules(os.path.join(PROJECT_ROOT, "scripts/analysis/sentiment_analysis.py"))}
+    assert {
+        "scripts/analysis/sentiment_analysis.py", "scripts/analysis/sentiment_cache.py",
+        "scripts/analysis/inference_backends.py", "scripts/common/models.py", "scripts/common/metrics.py",
+    } <= modules
+    assert all(module.startswith("scripts/") for module in modules)
@@ -0,0 +1,35 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+from scripts.common.models import models
+from scripts.common.storage import read_reviews, write_reviews
+from scripts.pipeline import run_pipeline
+
+def test_run_pipeline_streams_chunks(monkeypatch, tmp_path):
+    monkeypatch.setitem(
+        models.loaded, "distilbert",
+        lambda texts, **kwargs: [{"label": "POSITIVE", "score": 0.9} for _ in texts]
+    )
+    input_path = str(tmp_path / "cleaned.parquet")
+    output_path = str(tmp_path / "thematic.parquet")
+    aggregates_csv = str(tmp_path / "theme_aggregates.csv")
+    write_reviews(pd.DataFrame({
+        "bank": ["Dashen Bank", "Bank of Abyssinia", "Dashen Bank"] * 3,
+        "review": ["Loan approved", "ATM out of cash", "Nice app"] * 3,
+        "rating": [5, 2, 4] * 3,
+        "date": ["2025-06-01"] * 9,
+    }), input_path)
+
+    amharic_csv = tmp_path / "amharic.csv"
+    amharic_csv.write_text("review\nstale from an earlier run\n")
+
+    assert run_pipeline(input_path, output_path, aggregates_csv, amharic_csv=str(amharic_csv), chunk_size=4) == 9
+    assert not amharic_csv.exists()  # cleared at the start; no review here needed translating
+    df = read_reviews(output_path)
+    assert len(df) == 9
+    assert {"tokens", "vader_label", "distilbert_label", "themes"} <= set(df.columns)
+    aggregates = pd.read_csv(aggregates_csv).set_index(["bank", "themes"])["count"]
+    assert aggregates[("Dashen Bank", "Loan Services")] == 3
+    assert aggregates[("Bank of Abyssinia", "ATM Availability")] == 3
@@ -0,0 +1,31 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+from scripts.analysis.preprocess_nlp import preprocess_reviews, preprocess_text, preprocess_texts
+
+TEXTS = [
+    "The app crashes every time I try to login",
+    "",
+    None,
+    "Transfers were fast and the support team helped me quickly",
+]
+
+def test_preprocess_texts_matches_preprocess_text():
+    assert preprocess_texts(TEXTS, batch_size=2) == [preprocess_text(text) for text in TEXTS]
+
+def test_preprocess_reviews_adds_tokens():
+    df = pd.DataFrame({"bank": ["Dashen Bank"] * 2, "review": [TEXTS[0], TEXTS[3]]})
+    result = preprocess_reviews(df)
+    assert result["tokens"].tolist() == [preprocess_text(TEXTS[0]), preprocess_text(TEXTS[3])]
+
+def test_preprocess_reviews_translates_amharic_with_backend():
+    class EchoTranslator:
+        def translate(self, text):
+            return "great service"
+
+    df = pd.DataFrame({"bank": ["Dashen Bank"], "review": ["ሰላም betam"]})
+    result = preprocess_reviews(df, backend=EchoTranslator())
+    assert result["review"].tolist() == ["great service"]
+    assert "is_amharic" not in result.columns
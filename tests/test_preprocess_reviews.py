@@ -0,0 +1,76 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+from scripts.common.storage import read_reviews
+from scripts.task1_data_collection.preprocess_reviews import SeenHashes, clean_chunk, discover_raw_files, preprocess_reviews
+
+def _raw(rows):
+    return pd.DataFrame(rows, columns=["bank", "review", "rating", "date", "source", "review_id"])
+
+def _outputs(tmp_path):
+    return {
+        "output_csv": str(tmp_path / "cleaned.csv"),
+        "output_parquet": str(tmp_path / "cleaned.parquet"),
+        "hashes_path": str(tmp_path / "hashes.npy"),
+        "state_path": str(tmp_path / "state.json"),
+    }
+
+def test_incremental_runs_append_only_new_unique_reviews(tmp_path):
+    raw = str(tmp_path / "dashen_bank_reviews_raw.csv")
+    _raw([
+        ["Dashen Bank", "Great app", 5, "2025-06-01 10:00:00", "Google Play", "a"],
+        ["Dashen Bank", "Great app", 5, "2025-06-01 10:00:00", "Google Play", "a"],
+        ["Dashen Bank", None, 3, "2025-06-01 11:00:00", "Google Play", "b"],
+    ]).to_csv(raw, index=False)
+    outputs = _outputs(tmp_path)
+    assert preprocess_reviews([raw], **outputs) == 1
+
+    _raw([
+        ["Dashen Bank", "Great app", 5, "2025-06-01 10:00:00", "Google Play", "a"],
+        ["Dashen Bank", "Slow transfers", 2, "2025-06-03T08:30:00", "Google Play", "c"],
+    ]).to_csv(raw, mode="a", header=False, index=False)
+    assert preprocess_reviews([raw], **outputs) == 1
+    assert preprocess_reviews([raw], **outputs) == 0
+
+    csv = pd.read_csv(outputs["output_csv"])
+    assert csv["review"].tolist() == ["Great app", "Slow transfers"]
+    assert csv["date"].tolist() == ["2025-06-01", "2025-06-03"]
+    parquet = read_reviews(outputs["output_parquet"])
+    assert parquet["review"].tolist() == ["Great app", "Slow transfers"]
+    assert parquet["rating"].dtype == "int8"
+
+    assert preprocess_reviews([raw], incremental=False, **outputs) == 2
+
+    _raw([  # a full re-scrape rewrites the file with more, reordered rows
+        ["Dashen Bank", "Login fails", 1, "2025-06-05 09:00:00", "Google Play", "d"],
+        ["Dashen Bank", "Slow transfers", 2, "2025-06-03T08:30:00", "Google Play", "c"],
+        ["Dashen Bank", "Great app", 5, "2025-06-01 10:00:00", "Google Play", "a"],
+        ["Dashen Bank", "Useful for paying bills and checking balances", 4, "2025-06-01 09:00:00", "Google Play", "e"],
+        ["Dashen Bank", "Needs a dark mode", 3, "2025-05-30 18:00:00", "Google Play", "f"],
+    ]).to_csv(raw, index=False)
+    assert preprocess_reviews([raw], **outputs) == 3
+    assert pd.read_csv(outputs["output_csv"])["review"].tolist()[-3:] == [
+        "Login fails", "Useful for paying bills and checking balances", "Needs a dark mode"
+    ]
+
+def test_clean_chunk_counts_dropped_rows():
+    chunk = _raw([
+        ["Dashen Bank", "Great app", 5, "2025-06-01 10:00:00", "Google Play", "a"],
+        ["Dashen Bank", "Great app", 5, "2025-06-01 10:00:00", "Google Play", "a"],
+        ["Dashen Bank", None, 3, "2025-06-01 11:00:00", "Google Play", "b"],
+        ["Dashen Bank", "No rating", None, "2025-06-01 12:00:00", "Google Play", "c"],
+    ])
+    cleaned, missing, duplicates = clean_chunk(chunk, SeenHashes(None))
+    assert (len(cleaned), missing, duplicates) == (1, 2, 1)
+
+def test_discover_raw_files(tmp_path):
+    for name in ["a_reviews_raw.csv", "b_reviews_raw.csv", "all_reviews_raw.csv"]:
+        (tmp_path / name).write_text("bank,review,rating,date\n")
+    assert [os.path.basename(path) for path in discover_raw_files(str(tmp_path / "*_reviews_raw.csv"))] == [
+        "a_reviews_raw.csv", "b_reviews_raw.csv"
+    ]
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text("# raw files\nb_reviews_raw.csv\n")
+    assert discover_raw_files(manifest=str(manifest)) == [str(tmp_path / "b_reviews_raw.csv")]
@@ -0,0 +1,62 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sqlite3
+import threading
+import pandas as pd
+import pytest
+from scripts.database.loader import connect_sqlite, load_reviews
+from scripts.database.reader import ReviewReader
+
+@pytest.fixture
+def reader(tmp_path):
+    path = str(tmp_path / "reviews.sqlite")
+    connection = connect_sqlite(path)
+    load_reviews(connection, pd.DataFrame({
+        "bank": ["Dashen Bank", "Bank of Abyssinia", "Dashen Bank", "Dashen Bank", "Commercial Bank of Ethiopia"],
+        "review": ["Great app", "Too slow", "Crashes", "Works fine", "Good"],
+        "rating": [5, 2, 1, 4, 5],
+        "date": ["2025-06-01", "2025-06-02", "2025-06-03", "2025-06-04", "2025-06-05"],
+    }))
+    connection.close()
+    reader = ReviewReader.sqlite(path, size=2, arraysize=2)
+    yield reader
+    reader.close()
+
+def test_filters_run_in_the_database_and_stream_in_chunks(reader):
+    chunks = list(reader.iter_reviews(banks=["Dashen Bank", "Bank of Abyssinia"], start="2025-06-02", end="2025-06-04"))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    df = pd.concat(chunks, ignore_index=True).sort_values("date", ignore_index=True)
+    assert df["review"].tolist() == ["Too slow", "Crashes", "Works fine"]
+    assert reader.count(banks=["Dashen Bank"], ratings=[4, 5]) == 2
+    assert reader.read_reviews(banks=["No Such Bank"]).empty
+
+def test_column_projection_and_bank_date_index(reader):
+    df = reader.read_reviews(ratings=[5], columns=["bank", "rating"])
+    assert list(df.columns) == ["bank", "rating"]
+    assert sorted(df["bank"].astype(str)) == ["Commercial Bank of Ethiopia", "Dashen Bank"]
+    with reader.connection() as connection:
+        plan = " ".join(str(row) for row in connection.execute(
+            "EXPLAIN QUERY PLAN SELECT r.review_id FROM reviews r WHERE r.bank_id IN (1, 2) AND r.review_date >= '2025-06-02'"
+        ))
+    assert "ix_reviews_bank_date" in plan
+
+def test_sqlite_reader_is_read_only_and_needs_an_existing_database(reader, tmp_path):
+    missing = tmp_path / "mistyped.sqlite"
+    with pytest.raises(FileNotFoundError):
+        ReviewReader.sqlite(str(missing))
+    assert not missing.exists()
+    with reader.connection() as connection, pytest.raises(sqlite3.OperationalError, match="readonly"):
+        connection.execute("DELETE FROM reviews")
+
+def test_bank_filter_reuses_the_held_connection(reader):
+    single = ReviewReader.sqlite(reader.pool.path, size=1)
+    results = []
+    # A second acquire on a one-connection pool would block forever, so read on a daemon thread
+    thread = threading.Thread(target=lambda: results.append(single.read_reviews(banks=["Dashen Bank"])), daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert [len(df) for df in results] == [3]
+    assert single.count(banks=["Dashen Bank"]) == 3
+    single.close()
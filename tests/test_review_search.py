@@ -0,0 +1,88 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+import pytest
+from scripts.analysis.review_search import (
+    EXACT_FILTER_ROWS, EmbeddingStore, IVFIndex, index_reviews, review_keys, search_reviews
+)
+
+DIM = 64
+
+def fake_encode(texts):
+    """Bag-of-words vectors, so reviews sharing words are close."""
+    vectors = np.zeros((len(texts), DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            vectors[row, int(pd.util.hash_array(np.array([word], dtype=object))[0]) % DIM] += 1
+    return vectors
+
+def _reviews(n, start=0):
+    topics = ["otp code never arrives", "transfer to another bank failed", "loan approved quickly", "atm swallowed my card"]
+    return pd.DataFrame({
+        "review_id": [f"r{i}" for i in range(start, start + n)],
+        "review": [f"{topics[i % 4]} {i}" for i in range(start, start + n)],
+        "bank": ["Dashen Bank" if i % 2 else "Bank of Abyssinia" for i in range(start, start + n)],
+        "rating": [1 + i % 5 for i in range(start, start + n)],
+    })
+
+def test_store_persists_and_skips_known_ids(tmp_path):
+    store = EmbeddingStore(str(tmp_path), dim=DIM)
+    index = IVFIndex(store)
+    assert index_reviews(_reviews(40), store, index, encode=fake_encode) == 40
+    assert index_reviews(_reviews(50), store, index, encode=fake_encode) == 10
+
+    reopened = EmbeddingStore(str(tmp_path), dim=DIM)
+    assert len(reopened) == 50 and reopened.vectors.dtype == np.float16
+    results = search_reviews("otp code never arrives", IVFIndex(reopened), k=5, encode=fake_encode)
+    assert results["review_id"].map(lambda review_id: int(review_id[1:]) % 4 == 0).all()
+    assert results["score"].is_monotonic_decreasing
+
+def test_ivf_search_with_filters_and_incremental_adds(tmp_path):
+    store = EmbeddingStore(str(tmp_path), dim=DIM)
+    index = IVFIndex(store, nprobe=2)
+    index_reviews(_reviews(200), store, index, encode=fake_encode)
+    index.train(n_lists=4)
+    index_reviews(_reviews(20, start=200), store, index, encode=fake_encode)
+    assert len(index.assignments) == 220
+
+    results = search_reviews("atm swallowed my card", index, k=10, bank="Dashen Bank", rating=[2, 4], encode=fake_encode)
+    assert len(results) == 10
+    assert set(results["bank"]) == {"Dashen Bank"} and set(results["rating"]) <= {2, 4}
+    assert results["review_id"].map(lambda review_id: int(review_id[1:]) % 4 == 3).all()
+    assert search_reviews("atm", index, bank="Unknown Bank", encode=fake_encode).empty
+
+def test_filtered_search_finds_rows_outside_the_probed_lists(tmp_path):
+    store = EmbeddingStore(str(tmp_path), dim=DIM)
+    index = IVFIndex(store, nprobe=1)
+    index.train()  # nothing stored yet: a no-op, search stays exact
+    assert not index.is_trained
+    index_reviews(_reviews(200), store, index, encode=fake_encode)
+    index.train(n_lists=4)
+    small_bank = pd.DataFrame({
+        "review_id": ["s0", "s1"], "review": ["loan approved quickly s0", "loan approved quickly s1"],
+        "bank": ["Small Bank"] * 2, "rating": [1, 1],
+    })
+    index_reviews(small_bank, store, index, encode=fake_encode)
+    query = fake_encode(["atm swallowed my card"])[0]
+    small = store.bank_codes[:] == store.bank_code("Small Bank")
+    assert not small[index.candidates(query, nprobe=1)].any()  # the small bank's rows are not probed
+
+    for exact_filter_rows in (EXACT_FILTER_ROWS, 0):  # exact over matching rows, then widening nprobe
+        index.exact_filter_rows = exact_filter_rows
+        rows, _ = index.search(query, k=2, bank="Small Bank", rating=1)
+        assert sorted(store.ids[row] for row in rows) == ["s0", "s1"]
+
+def test_reviews_without_an_id_get_a_stable_key(tmp_path):
+    store = EmbeddingStore(str(tmp_path), dim=DIM)
+    index = IVFIndex(store)
+    reviews = _reviews(4).assign(review_id=["r0", None, float("nan"), ""], date=pd.to_datetime(["2025-06-01"] * 4))
+    assert index_reviews(reviews, store, index, encode=fake_encode) == 4
+    as_text = reviews.assign(date="2025-06-01")
+    assert index_reviews(as_text, store, index, encode=fake_encode) == 0
+    assert store.ids[0] == "r0" and all(key.startswith("h") for key in store.ids[1:])
+
+    with pytest.raises(ValueError):
+        review_keys(reviews.drop(columns="date"))
@@ -7,8 +7,32 @@ from pathlib import Path
 # Add project root to sys.path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
+from datetime import datetime
+from google_play_scraper.features.reviews import _ContinuationToken
+from scripts.task1_data_collection import scrape_reviews as scraper
 from scripts.task1_data_collection.scrape_reviews import scrape_reviews
 
+class FakePlayStore:
+    """Local stand-in for google_play_scraper.reviews with string offsets as tokens."""
+
+    def __init__(self, total, fail_at=None):
+        self.reviews = [
+            {"content": f"review {i}", "score": 1 + i % 5, "at": datetime(2025, 6, 1)}
+            for i in range(total)
+        ]
+        self.fail_at = fail_at
+        self.calls = 0
+
+    def __call__(self, app_id, lang="en", country="us", sort=None, count=100, continuation_token=None):
+        self.calls += 1
+        offset = int(continuation_token.token) if continuation_token else 0
+        if offset == self.fail_at:
+            raise ConnectionError("connection reset")
+        page = self.reviews[offset:offset + count]
+        end = offset + len(page)
+        token = str(end) if end < len(self.reviews) else None
+        return page, _ContinuationToken(token, lang, country, sort, count, None, None)
+
 def test_scrape_reviews():
     """Test the scrape_reviews function for CBE."""
     print("Testing scraping for Commercial Bank of Ethiopia...")
@@ -63,4 +87,46 @@ def test_cleaned_file():
         assert bank_counts.get("Dashen Bank", 0) >= 400, f"Dashen has {bank_counts.get('Dashen Bank', 0)} reviews, expected 400+"
         print(f"Success: Cleaned CSV valid with {len(df)} reviews: {bank_counts}")
     else:
-        pytest.skip("Cleaned CSV not found; run preprocess_reviews.py first")
\ No newline at end of file
+        pytest.skip("Cleaned CSV not found; run preprocess_reviews.py first")
+
+def test_scrape_reviews_follows_continuation_tokens():
+    store = FakePlayStore(total=450)
+    reviews_data = scrape_reviews("Dashen Bank", "com.dashen.dashensuperapp", count=400, fetch=store)
+    assert len(reviews_data) == 400
+    assert store.calls == 2
+    assert reviews_data[-1]["review"] == "review 399"
+
+def test_scrape_all_resumes_interrupted_scrape(tmp_path, monkeypatch):
+    monkeypatch.setattr(scraper, "RAW_DATA_DIR", str(tmp_path))
+    state_path = str(tmp_path / "state.json")
+    bank = {"name": "Dashen Bank", "app_id": "com.dashen.dashensuperapp"}
+    store = FakePlayStore(total=5, fail_at=4)
+    assert scraper.scrape_all([bank], fetch=store, page_size=2, rate_per_second=1000, state_path=state_path) == {"Dashen Bank": 4}
+
+    store.fail_at = None
+    store.calls = 0
+    assert scraper.scrape_all([bank], fetch=store, page_size=2, rate_per_second=1000, state_path=state_path) == {"Dashen Bank": 5}
+    assert store.calls == 1
+    df = pd.read_csv(scraper.raw_csv_path("Dashen Bank"))
+    assert df["review"].tolist() == [f"review {i}" for i in range(5)]
+
+def test_incremental_scrape_stops_at_last_seen_review(tmp_path, monkeypatch):
+    monkeypatch.setattr(scraper, "RAW_DATA_DIR", str(tmp_path))
+    state_path = str(tmp_path / "state.json")
+    bank = {"name": "Dashen Bank", "app_id": "com.dashen.dashensuperapp"}
+    store = FakePlayStore(total=6)
+    for i, review in enumerate(store.reviews):
+        review["reviewId"] = f"id-{i}"
+        review["at"] = datetime(2025, 6, 30 - i)
+    assert scraper.scrape_all([bank], fetch=store, page_size=2, rate_per_second=1000, incremental=True, state_path=state_path) == {"Dashen Bank": 6}
+
+    store.reviews[:0] = [
+        {"reviewId": "new-1", "content": "newer", "score": 5, "at": datetime(2025, 7, 2)},
+        {"reviewId": "new-0", "content": "new", "score": 4, "at": datetime(2025, 7, 1)},
+    ]
+    store.calls = 0
+    assert scraper.scrape_all([bank], fetch=store, page_size=2, rate_per_second=1000, incremental=True, state_path=state_path) == {"Dashen Bank": 2}
+    assert store.calls == 2
+    df = pd.read_csv(scraper.raw_csv_path("Dashen Bank"))
+    assert len(df) == 8
+    assert df["review_id"].tolist()[-2:] == ["new-1", "new-0"]
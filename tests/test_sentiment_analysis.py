@@ -4,7 +4,10 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pandas as pd
 import pytest
+from scripts.analysis import sentiment_analysis
 from scripts.analysis.sentiment_analysis import analyze_sentiment
+from scripts.analysis.sentiment_cache import SentimentCache
+from scripts.common.models import models
 
 @pytest.fixture
 def sample_df():
@@ -21,4 +24,66 @@ def test_analyze_sentiment(sample_df):
     assert "distilbert_label" in df.columns
     assert "distilbert_score" in df.columns
     assert df["vader_label"].iloc[0] in ["positive", "negative", "neutral"]
-    assert df["distilbert_label"].iloc[0] in ["positive", "negative"]
\ No newline at end of file
+    assert df["distilbert_label"].iloc[0] in ["positive", "negative"]
+
+def test_distilbert_batches_sorted_by_length(monkeypatch):
+    calls = []
+
+    def fake_pipe(texts, **kwargs):
+        calls.append(list(texts))
+        return [{"label": "POSITIVE", "score": float(len(t))} for t in texts]
+
+    monkeypatch.setitem(models.loaded, "distilbert", fake_pipe)
+    texts = ["a much longer review", "", "short", None, "medium text"]
+    results = sentiment_analysis.get_distilbert_sentiment_batch(texts, batch_size=2)
+    assert calls == [["short", "medium text"], ["a much longer review"]]
+    assert results[1] == ("neutral", 0.0)
+    assert results[3] == ("neutral", 0.0)
+    assert results[0] == ("positive", float(len(texts[0])))
+    assert results[4] == ("positive", float(len(texts[4])))
+
+def test_distilbert_batches_sorted_by_token_length(monkeypatch):
+    calls = []
+
+    def fake_pipe(texts, **kwargs):
+        calls.append(list(texts))
+        return [{"label": "POSITIVE", "score": 1.0} for _ in texts]
+
+    # One token per word: the long single word is the shortest input, as for a run of emoji or Ge'ez characters
+    fake_pipe.tokenizer = lambda texts, **kwargs: {"input_ids": [text.split() for text in texts]}
+    monkeypatch.setitem(models.loaded, "distilbert", fake_pipe)
+    sentiment_analysis.get_distilbert_sentiment_batch(["a b c d", "x y", "ሰላምሰላምሰላምሰላምሰላም"], batch_size=1)
+    assert calls == [["ሰላምሰላምሰላምሰላምሰላም"], ["x y"], ["a b c d"]]
+
+def test_analyze_sentiment_uses_cache(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_pipe(texts, **kwargs):
+        calls.extend(texts)
+        return [{"label": "NEGATIVE", "score": 0.8} for _ in texts]
+
+    monkeypatch.setitem(models.loaded, "distilbert", fake_pipe)
+    cache = SentimentCache(str(tmp_path / "cache.sqlite"))
+    df = pd.DataFrame({"review": ["App keeps crashing", "Slow transfers"]})
+    first = analyze_sentiment(df, cache=cache)
+    second = analyze_sentiment(df, cache=cache)
+    cache.close()
+    assert sorted(calls) == ["App keeps crashing", "Slow transfers"]
+    assert first[["vader_label", "distilbert_label"]].equals(second[["vader_label", "distilbert_label"]])
+    assert second["distilbert_label"].tolist() == ["negative", "negative"]
+
+def test_score_vader_matches_per_text_scoring():
+    texts = ["Great service and fast transactions", "App keeps crashing", "", None, "App keeps crashing", "It is a bank"]
+    compounds, codes = sentiment_analysis.score_vader(texts)
+    expected = [sentiment_analysis.get_vader_sentiment(text) for text in texts]
+    assert compounds.dtype == float and codes.dtype == "int8"
+    assert list(zip(sentiment_analysis.VADER_LABELS[codes], compounds)) == expected
+
+def test_score_vader_process_pool():
+    texts = [f"Transfer {i} was great" if i % 2 else f"Transfer {i} failed, terrible" for i in range(40)]
+    single = sentiment_analysis.score_vader(texts)
+    pooled = sentiment_analysis.score_vader(texts, n_process=2, chunk_size=7)
+    assert (single[0] == pooled[0]).all() and (single[1] == pooled[1]).all()
+    assert not any(name.startswith("vader_pool") for name in models.factories)  # worker pools are not models
+    sentiment_analysis.shutdown_vader_pools()
+    assert not sentiment_analysis._vader_pools
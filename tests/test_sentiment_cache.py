@@ -0,0 +1,32 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from scripts.analysis.sentiment_cache import SentimentCache, cache_key
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SentimentCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    yield cache
+    cache.close()
+
+def test_cache_key_normalizes_whitespace_and_includes_model():
+    assert cache_key("great  app ", "m", "r1") == cache_key("great app", "m", "r1")
+    assert cache_key("great app", "m", "r1") != cache_key("great app", "m", "r2")
+    assert cache_key("great app", "m", "r1") != cache_key("great app", "other", "r1")
+
+def test_lookup_counts_hits_and_misses(cache):
+    cache.store(["good"], [("positive", 0.9)], "m", "r")
+    assert cache.lookup(["good", "bad"], "m", "r") == [("positive", 0.9), None]
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+def test_evicts_least_recently_used(cache):
+    cache.store(["a"], [("positive", 0.1)], "m", "r")
+    cache.store(["b"], [("positive", 0.2)], "m", "r")
+    cache.lookup(["a"], "m", "r")
+    cache.store(["c"], [("negative", 0.3)], "m", "r")
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup(["a", "b", "c"], "m", "r") == [("positive", 0.1), None, ("negative", 0.3)]
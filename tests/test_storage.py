@@ -0,0 +1,48 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+import pytest
+from scripts.common.storage import ReviewWriter, read_reviews, write_reviews
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame({
+        "bank": ["Dashen Bank", "Bank of Abyssinia"],
+        "review": ["Loan approved fast", "App keeps crashing"],
+        "rating": [5, 1],
+        "date": ["2025-06-01", "2025-06-02"],
+        "tokens": [["loan", "approve", "fast"], ["app", "crash"]],
+        "themes": [["Loan Services"], ["General"]],
+    })
+
+def test_parquet_round_trip_keeps_dtypes_and_lists(sample_df, tmp_path):
+    path = str(tmp_path / "reviews.parquet")
+    write_reviews(sample_df, path)
+    df = read_reviews(path)
+    assert df["bank"].dtype == "category"
+    assert df["rating"].dtype == "int8"
+    assert pd.api.types.is_datetime64_any_dtype(df["date"])
+    assert df["tokens"].tolist() == sample_df["tokens"].tolist()
+    assert df["themes"].tolist() == sample_df["themes"].tolist()
+
+def test_column_projection(sample_df, tmp_path):
+    path = str(tmp_path / "reviews.parquet")
+    write_reviews(sample_df, path)
+    assert read_reviews(path, columns=["bank", "themes"]).columns.tolist() == ["bank", "themes"]
+
+def test_csv_list_columns_are_parsed_back(sample_df, tmp_path):
+    path = str(tmp_path / "reviews.csv")
+    write_reviews(sample_df, path)
+    df = read_reviews(path, columns=["themes", "tokens"])
+    assert df["themes"].tolist() == [["Loan Services"], ["General"]]
+    assert df["tokens"].tolist() == sample_df["tokens"].tolist()
+
+def test_review_writer_appends_to_existing_file(sample_df, tmp_path):
+    path = str(tmp_path / "reviews.parquet")
+    write_reviews(sample_df.head(1), path)
+    with ReviewWriter(path, append=True) as writer:
+        writer.write(sample_df.tail(1))
+    assert read_reviews(path)["review"].tolist() == ["Loan approved fast", "App keeps crashing"]
+    assert not os.path.exists(f"{path}.tmp")
@@ -4,7 +4,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pandas as pd
 import pytest
-from scripts.analysis.thematic_analysis import thematic_analysis
+from scripts.analysis.thematic_analysis import ThemeIndex, thematic_analysis
 
 @pytest.fixture
 def sample_df():
@@ -18,4 +18,23 @@ def test_thematic_analysis(sample_df):
     df = thematic_analysis(sample_df)
     assert "themes" in df.columns
     assert isinstance(df["themes"].iloc[0], list)
-    assert "Account Access" in df["themes"].iloc[0]
\ No newline at end of file
+    assert "Account Access" in df["themes"].iloc[0]
+
+def test_theme_index_matches_column_in_bulk():
+    df = pd.DataFrame({
+        "bank": ["Dashen Bank", "Bank of Abyssinia", "Dashen Bank", "Unknown Bank"],
+        "review": ["Loan approved at the branch", "", "Nice app", "Login failed"],
+    })
+    result = thematic_analysis(df)
+    assert result["themes"].tolist() == [
+        ["Loan Services", "Branch Services"],
+        [],
+        ["General"],
+        ["General"],
+    ]
+
+def test_word_boundary_matching():
+    index = ThemeIndex({"Bank": [{"name": "ATM", "keywords": ["atm"]}]}, word_boundary=True)
+    assert index.match_text("Nice atmosphere", "Bank") == ["General"]
+    assert index.match_text("The ATM was empty", "Bank") == ["ATM"]
+    assert ThemeIndex({"Bank": [{"name": "ATM", "keywords": ["atm"]}]}).match_text("Nice atmosphere", "Bank") == ["ATM"]
@@ -0,0 +1,47 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+from scripts.analysis.topic_discovery import TopicModel, update_topics
+from scripts.common.storage import write_reviews
+
+def _reviews(start, n):
+    topics = [["login", "fail", "password"], ["transfer", "slow", "payment"]]
+    return pd.DataFrame({
+        "bank": ["Dashen Bank"] * n,
+        "review": [f"review {i}" for i in range(start, start + n)],
+        "date": ["2025-06-01"] * n,
+        "tokens": [topics[i % 2] + ["app"] for i in range(start, start + n)],
+    })
+
+def test_partial_fit_uses_only_new_reviews_and_survives_reload(tmp_path):
+    model = TopicModel(n_topics=2)
+    assert model.partial_fit(_reviews(0, 1)) == 0  # held back until there are n_topics reviews
+    assert model.partial_fit(_reviews(0, 20)) == 20
+    path = str(tmp_path / "topics.pkl")
+    model.save(path)
+
+    model = TopicModel.load(path)
+    assert model.partial_fit(_reviews(10, 20)) == 10
+    terms = model.top_terms(n_terms=3)
+    assert terms["reviews"].sum() == 30
+    assert sorted(tuple(sorted(row)) for row in terms["terms"]) == [
+        ("fail", "login", "password"), ("payment", "slow", "transfer")
+    ]
+    predicted = model.predict(pd.Series([["login", "password"], [], ["slow", "transfer"]]))
+    assert predicted[1] == -1 and predicted[0] != predicted[2]
+
+def test_update_topics_reads_only_reviews_from_the_watermark_on(tmp_path):
+    path, state = str(tmp_path / "preprocessed.parquet"), str(tmp_path / "topics.pkl")
+    first = _reviews(0, 20).assign(date=[f"2025-06-{1 + i // 10:02d}" for i in range(20)])
+    write_reviews(first, path)
+    model = update_topics(path, state, terms_csv=None, n_topics=2)
+    assert model.watermark == pd.Timestamp("2025-06-02") and len(model.seen) == 10
+
+    later = _reviews(20, 5).assign(date=["2025-06-02"] * 2 + ["2025-06-03"] * 3)
+    late = _reviews(25, 1).assign(date=["2025-05-30"])  # dated before the watermark, so not folded in
+    write_reviews(pd.concat([first, later, late], ignore_index=True), path)
+    model = update_topics(path, state, terms_csv=None)
+    assert model.top_terms()["reviews"].sum() == 25
+    assert model.watermark == pd.Timestamp("2025-06-03") and len(model.seen) == 3
@@ -0,0 +1,45 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from scripts.analysis.translation import TranslationCache, translate_texts
+
+class FakeTranslator:
+    """Local stand-in for GoogleTranslator that can fail a set number of times."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = []
+
+    def translate(self, text: str) -> str:
+        self.calls.append(text)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("temporary outage")
+        return f"en:{text}"
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = TranslationCache(str(tmp_path / "translations.sqlite"))
+    yield cache
+    cache.close()
+
+def test_translates_each_distinct_text_once():
+    translator = FakeTranslator()
+    result = translate_texts(["ሰላም", "ሰላም", "betam"], translator, rate_per_second=None)
+    assert result == {"ሰላም": "en:ሰላም", "betam": "en:betam"}
+    assert sorted(translator.calls) == sorted(["ሰላም", "betam"])
+
+def test_retries_with_backoff_then_gives_up():
+    flaky = FakeTranslator(failures=1)
+    assert translate_texts(["ሰላም"], flaky, rate_per_second=None, backoff=0) == {"ሰላም": "en:ሰላም"}
+    broken = FakeTranslator(failures=10)
+    assert translate_texts(["ሰላም"], broken, rate_per_second=None, retries=2, backoff=0) == {"ሰላም": None}
+    assert len(broken.calls) == 3
+
+def test_cached_translations_are_not_repeated(cache):
+    translate_texts(["ሰላም"], FakeTranslator(), cache=cache, rate_per_second=None)
+    translator = FakeTranslator()
+    assert translate_texts(["ሰላም"], translator, cache=cache, rate_per_second=None) == {"ሰላም": "en:ሰላም"}
+    assert translator.calls == []